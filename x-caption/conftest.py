@@ -0,0 +1,21 @@
+"""Shared pytest setup for the x-caption test modules."""
+import pytest
+
+# Manual scripts that exercise a built app or real user data; run them directly.
+collect_ignore = ["test_built_app_paths.py", "test_export_limits.py"]
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Point every module that stores data in jobs.db at a temporary data directory."""
+    import native_fingerprint
+    import native_history
+    import native_result_cache
+    import native_storage
+
+    for module in (native_fingerprint, native_history, native_result_cache):
+        monkeypatch.setattr(module, "get_data_dir", lambda: tmp_path)
+    monkeypatch.setattr(native_storage, "default_db_path", lambda: tmp_path / "jobs.db")
+    monkeypatch.setattr(native_history, "LEGACY_HISTORY_FILE", tmp_path / "history.json")
+    yield tmp_path
+    native_storage.close_thread_connections()
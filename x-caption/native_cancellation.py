@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Per-job cancellation tokens and a registry of the subprocesses each job spawns."""
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import signal
+import subprocess
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class JobCanceled(RuntimeError):
+    """Raised inside a job once it has been terminated."""
+
+    def __init__(self, job_id: Optional[str] = None):
+        super().__init__(f"Job {job_id} was canceled" if job_id else "Job was canceled")
+        self.job_id = job_id
+
+
+def kill_process_tree(process: subprocess.Popen) -> None:
+    """Kill *process* and everything it started, without waiting for it to exit."""
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == "nt":
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            )
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except Exception:
+        with contextlib.suppress(Exception):
+            process.kill()
+
+
+class CancellationToken:
+    """Tracks whether a job was canceled and which child processes to kill when it is."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._processes: Set[subprocess.Popen] = set()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def canceled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise JobCanceled(self.job_id)
+
+    def register(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.add(process)
+        if self._event.is_set():
+            kill_process_tree(process)
+
+    def unregister(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.discard(process)
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            with contextlib.suppress(ValueError):
+                self._callbacks.remove(callback)
+
+    def cancel(self) -> None:
+        self._event.set()
+        with self._lock:
+            processes = list(self._processes)
+            callbacks = list(self._callbacks)
+        for process in processes:
+            kill_process_tree(process)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as exc:
+                logger.debug("Cancel callback for job %s failed: %s", self.job_id, exc)
+
+
+_tokens: Dict[str, CancellationToken] = {}
+_tokens_lock = threading.Lock()
+_local = threading.local()
+
+
+def begin(job_id: str) -> CancellationToken:
+    """Create the token for a job that is about to run."""
+    token = CancellationToken(job_id)
+    with _tokens_lock:
+        _tokens[job_id] = token
+    return token
+
+
+def end(job_id: str, token: Optional[CancellationToken] = None) -> None:
+    with _tokens_lock:
+        if token is None or _tokens.get(job_id) is token:
+            _tokens.pop(job_id, None)
+
+
+def cancel_job(job_id: str) -> bool:
+    """Cancel a running job; returns ``False`` when it is not running here."""
+    with _tokens_lock:
+        token = _tokens.get(job_id)
+    if token is None:
+        return False
+    logger.info("Canceling running job %s", job_id)
+    token.cancel()
+    return True
+
+
+def is_running(job_id: str) -> bool:
+    with _tokens_lock:
+        return job_id in _tokens
+
+
+@contextlib.contextmanager
+def bind(token: Optional[CancellationToken]) -> Iterator[Optional[CancellationToken]]:
+    """Make *token* the current token for this thread."""
+    previous = getattr(_local, "token", None)
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+
+def current() -> Optional[CancellationToken]:
+    return getattr(_local, "token", None)
+
+
+def check() -> None:
+    """Raise :class:`JobCanceled` if the current thread's job was canceled."""
+    token = current()
+    if token is not None:
+        token.check()
+
+
+def popen(cmd: List[str], **kwargs: Any) -> subprocess.Popen:
+    """Start *cmd* in its own process group and register it with the current job."""
+    check()
+    if os.name == "nt":
+        kwargs["creationflags"] = kwargs.get("creationflags", 0) | getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)
+    else:
+        kwargs.setdefault("start_new_session", True)
+    process = subprocess.Popen(cmd, **kwargs)
+    token = current()
+    if token is not None:
+        token.register(process)
+    return process
+
+
+def release(process: subprocess.Popen) -> None:
+    token = current()
+    if token is not None:
+        token.unregister(process)
+
+
+def run(cmd: List[str], *, capture_output: bool = False, text: bool = False, **kwargs: Any) -> subprocess.CompletedProcess:
+    """Cancellable ``subprocess.run``; raises :class:`JobCanceled` if the job was terminated."""
+    if capture_output:
+        kwargs.setdefault("stdout", subprocess.PIPE)
+        kwargs.setdefault("stderr", subprocess.PIPE)
+    process = popen(cmd, text=text, **kwargs)
+    try:
+        stdout, stderr = process.communicate()
+    finally:
+        release(process)
+    check()
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
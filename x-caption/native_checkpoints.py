@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Per-job checkpoints (rendered audio, chunk plan, finished chunks) for resuming interrupted jobs."""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+import native_storage
+from native_config import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+def _db_path() -> Path:
+    return get_data_dir() / "jobs.db"
+
+
+def checkpoint_dir(job_id: str) -> Path:
+    """Directory holding the files a job keeps across restarts."""
+    return get_data_dir() / "checkpoints" / job_id
+
+
+def _migrate_create_checkpoints(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS job_checkpoints (
+            job_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            data TEXT NOT NULL,
+            updated_at REAL,
+            PRIMARY KEY (job_id, name)
+        )
+        """
+    )
+
+
+_MIGRATIONS = (_migrate_create_checkpoints,)
+
+
+def _connect() -> sqlite3.Connection:
+    native_storage.migrate("job_checkpoints", _MIGRATIONS, _db_path())
+    return native_storage.connect(_db_path())
+
+
+@contextlib.contextmanager
+def _transaction() -> Iterator[sqlite3.Connection]:
+    _connect()
+    with native_storage.transaction(_db_path()) as conn:
+        yield conn
+
+
+def save(job_id: str, name: str, data: Dict[str, Any]) -> None:
+    try:
+        with _transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_checkpoints (job_id, name, data, updated_at) VALUES (?, ?, ?, ?)",
+                (job_id, name, json.dumps(data, ensure_ascii=False), time.time()),
+            )
+    except Exception as exc:
+        # A missing checkpoint only costs work on resume; never fail the job for it.
+        logger.warning("Failed to save checkpoint %s for job %s: %s", name, job_id, exc)
+
+
+def load(job_id: str, name: str) -> Optional[Dict[str, Any]]:
+    try:
+        row = _connect().execute(
+            "SELECT data FROM job_checkpoints WHERE job_id = ? AND name = ?",
+            (job_id, name),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    except Exception as exc:
+        logger.debug("Failed to load checkpoint %s for job %s: %s", name, job_id, exc)
+        return None
+
+
+def load_prefixed(job_id: str, prefix: str) -> Dict[str, Dict[str, Any]]:
+    """All checkpoints of *job_id* whose name starts with *prefix*, keyed by name."""
+    try:
+        rows = _connect().execute(
+            "SELECT name, data FROM job_checkpoints WHERE job_id = ? AND substr(name, 1, ?) = ?",
+            (job_id, len(prefix), prefix),
+        ).fetchall()
+    except Exception as exc:
+        logger.debug("Failed to load checkpoints for job %s: %s", job_id, exc)
+        return {}
+    return {name: json.loads(data) for name, data in rows}
+
+
+def keep_file(job_id: str, path: Path) -> Path:
+    """Move *path* into the job's checkpoint directory so it survives a restart."""
+    target_dir = checkpoint_dir(job_id)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    target = target_dir / Path(path).name
+    try:
+        shutil.move(str(path), target)
+    except OSError as exc:
+        logger.warning("Could not keep %s for job %s: %s", path, job_id, exc)
+        return Path(path)
+    return target
+
+
+def has_checkpoints(job_id: str) -> bool:
+    try:
+        row = _connect().execute("SELECT 1 FROM job_checkpoints WHERE job_id = ? LIMIT 1", (job_id,)).fetchone()
+    except Exception:
+        return False
+    return row is not None
+
+
+def clear(job_id: str) -> None:
+    """Drop a job's checkpoints and kept files once it can no longer resume."""
+    try:
+        with _transaction() as conn:
+            conn.execute("DELETE FROM job_checkpoints WHERE job_id = ?", (job_id,))
+    except Exception as exc:
+        logger.debug("Failed to clear checkpoints for job %s: %s", job_id, exc)
+    shutil.rmtree(checkpoint_dir(job_id), ignore_errors=True)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""Silence-aware chunking helpers for parallel whisper.cpp transcription."""
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import soundfile as sf
+
+logger = logging.getLogger(__name__)
+
+CHUNKING_ENV = "XCAPTION_CHUNKED_TRANSCRIPTION"
+CHUNK_MIN_SECONDS_ENV = "XCAPTION_CHUNK_MIN_SECONDS"
+CHUNK_TARGET_SECONDS_ENV = "XCAPTION_CHUNK_TARGET_SECONDS"
+
+DEFAULT_CHUNK_MIN_SECONDS = 600.0
+DEFAULT_CHUNK_TARGET_SECONDS = 300.0
+_MIN_CHUNK_SECONDS = 30.0
+_FRAME_SECONDS = 0.02
+_SILENCE_WINDOW_SECONDS = 0.3
+_SPLIT_SEARCH_SECONDS = 20.0
+_BLOCK_SECONDS = 30.0
+_MIN_THREADS_PER_ENGINE = 2
+_MAX_PARALLEL_ENGINES = 8
+
+
+@dataclass(frozen=True)
+class AudioChunk:
+    index: int
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name) or default)
+    except (TypeError, ValueError):
+        return default
+
+
+def chunking_mode() -> str:
+    raw_value = (os.environ.get(CHUNKING_ENV) or "auto").strip().lower()
+    if raw_value in {"0", "false", "no", "off", "none", "disable", "disabled"}:
+        return "off"
+    if raw_value in {"1", "true", "yes", "on", "always"}:
+        return "on"
+    return "auto"
+
+
+def plan_parallelism(duration: float, cpu_count: Optional[int] = None) -> Tuple[int, int, float]:
+    """Return ``(engines, threads_per_engine, target_chunk_seconds)`` for *duration*."""
+    cores = max(1, int(cpu_count or os.cpu_count() or 1))
+    engines = max(1, min(cores // _MIN_THREADS_PER_ENGINE, _MAX_PARALLEL_ENGINES))
+    threads = max(1, cores // engines)
+    target = _env_float(CHUNK_TARGET_SECONDS_ENV, DEFAULT_CHUNK_TARGET_SECONDS)
+    if duration > 0:
+        # Aim for at least one chunk per engine, but never below the minimum chunk size.
+        target = max(_MIN_CHUNK_SECONDS, min(target, duration / engines))
+    return engines, threads, target
+
+
+def should_chunk(duration: Optional[float], cpu_count: Optional[int] = None) -> bool:
+    mode = chunking_mode()
+    if mode == "off" or not duration:
+        return False
+    if mode == "on":
+        return duration >= 2 * _MIN_CHUNK_SECONDS
+    cores = max(1, int(cpu_count or os.cpu_count() or 1))
+    if cores < 2 * _MIN_THREADS_PER_ENGINE:
+        return False
+    return duration >= _env_float(CHUNK_MIN_SECONDS_ENV, DEFAULT_CHUNK_MIN_SECONDS)
+
+
+def frame_energies(path: Path, frame_seconds: float = _FRAME_SECONDS) -> Tuple[np.ndarray, float]:
+    """Return per-frame RMS energy (mono) and the frame length in seconds."""
+    info = sf.info(str(path))
+    frame_len = max(1, int(round(info.samplerate * frame_seconds)))
+    block_len = frame_len * max(1, int(_BLOCK_SECONDS / frame_seconds))
+    energies: List[np.ndarray] = []
+    for block in sf.blocks(str(path), blocksize=block_len, dtype="float32", always_2d=True):
+        mono = block.mean(axis=1)
+        usable = (mono.shape[0] // frame_len) * frame_len
+        if usable == 0:
+            continue
+        frames = mono[:usable].reshape(-1, frame_len)
+        energies.append(np.sqrt(np.mean(frames * frames, axis=1)))
+    if not energies:
+        return np.zeros(0, dtype=np.float32), frame_len / info.samplerate
+    return np.concatenate(energies).astype(np.float32), frame_len / info.samplerate
+
+
+def find_chunks(path: Path, target_seconds: float) -> List[AudioChunk]:
+    """Split *path* near every *target_seconds* at the quietest nearby window."""
+    duration = float(sf.info(str(path)).duration)
+    if duration <= target_seconds + _MIN_CHUNK_SECONDS:
+        return [AudioChunk(0, 0.0, duration)]
+
+    energies, frame_seconds = frame_energies(path)
+    window = max(1, int(round(_SILENCE_WINDOW_SECONDS / frame_seconds)))
+    if energies.size >= window:
+        smoothed = np.convolve(energies, np.ones(window, dtype=np.float32) / window, mode="same")
+    else:
+        smoothed = energies
+    search = int(round(_SPLIT_SEARCH_SECONDS / frame_seconds))
+
+    cuts: List[float] = []
+    last_cut = 0.0
+    target = target_seconds
+    while target < duration - _MIN_CHUNK_SECONDS:
+        center = int(round(target / frame_seconds))
+        lo = max(int(round((last_cut + _MIN_CHUNK_SECONDS) / frame_seconds)), center - search)
+        hi = min(smoothed.size, center + search)
+        if hi > lo:
+            cut = (lo + int(np.argmin(smoothed[lo:hi]))) * frame_seconds
+        else:
+            cut = target
+        if cut - last_cut >= _MIN_CHUNK_SECONDS and duration - cut >= _MIN_CHUNK_SECONDS:
+            cuts.append(cut)
+            last_cut = cut
+        target = max(target + target_seconds, last_cut + target_seconds)
+
+    bounds = [0.0, *cuts, duration]
+    return [AudioChunk(idx, bounds[idx], bounds[idx + 1]) for idx in range(len(bounds) - 1)]
+
+
+def write_chunk(source: Path, chunk: AudioChunk, output_path: Path) -> Path:
+    info = sf.info(str(source))
+    start_frame = int(round(chunk.start * info.samplerate))
+    stop_frame = min(info.frames, int(round(chunk.end * info.samplerate)))
+    data, samplerate = sf.read(str(source), start=start_frame, stop=stop_frame, dtype="int16", always_2d=True)
+    sf.write(str(output_path), data, samplerate, subtype="PCM_16", format="WAV")
+    return output_path
+
+
+def stitch_segments(
+    chunks: Sequence[AudioChunk],
+    chunk_segments: Sequence[Sequence[Dict[str, Any]]],
+) -> List[Dict[str, Any]]:
+    """Shift chunk-local segments onto the source timeline.
+
+    Chunks do not overlap, so nothing is deduplicated: repeated words at a
+    seam are real speech. The first segment of a chunk is trimmed to start
+    where the previous chunk's last segment ends.
+    """
+    stitched: List[Dict[str, Any]] = []
+    for chunk, segments in zip(chunks, chunk_segments):
+        seam = chunk.index > 0
+        for segment in segments:
+            updated = dict(segment)
+            start = float(segment.get("start", 0.0)) + chunk.start
+            end = min(float(segment.get("end", 0.0)) + chunk.start, chunk.end)
+            words = segment.get("words")
+            if isinstance(words, list) and words:
+                shifted = []
+                for word in words:
+                    if not isinstance(word, dict):
+                        continue
+                    new_word = dict(word)
+                    if word.get("start") is not None:
+                        new_word["start"] = float(word["start"]) + chunk.start
+                    if word.get("end") is not None:
+                        new_word["end"] = float(word["end"]) + chunk.start
+                    shifted.append(new_word)
+                updated["words"] = shifted
+
+            if seam and stitched and start < float(stitched[-1].get("end", 0.0)):
+                start = float(stitched[-1].get("end", 0.0))
+            if end <= start:
+                continue
+            updated["start"] = start
+            updated["end"] = end
+            stitched.append(updated)
+            seam = False
+
+    for idx, segment in enumerate(stitched):
+        segment["id"] = idx
+    return stitched
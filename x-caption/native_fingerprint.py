@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""Media identity: sampled fingerprints, a persistent hash cache and full SHA-256 read once per file version."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import native_storage
+from native_config import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+# Bytes hashed from each of the head, middle and tail; files up to three
+# blocks are hashed whole.
+_SAMPLE_BYTES = 1024 * 1024
+_READ_CHUNK = 4 * 1024 * 1024
+_FINGERPRINT_VERSION = "fp1"
+DEFAULT_MAX_ROWS = 20000
+
+# (real path, size, mtime_ns, inode): a file with the same key is assumed unchanged.
+StatKey = Tuple[str, int, int, int]
+
+_lock = threading.Lock()
+_inflight: Dict[StatKey, "Future[Optional[str]]"] = {}
+
+
+def _db_path() -> Path:
+    return get_data_dir() / "jobs.db"
+
+
+def _migrate_create_hashes(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS media_hashes (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            inode INTEGER NOT NULL,
+            fingerprint TEXT,
+            sha256 TEXT,
+            updated_at REAL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_media_hashes_updated
+        ON media_hashes(updated_at)
+        """
+    )
+
+
+_MIGRATIONS = (_migrate_create_hashes,)
+
+
+def _connect() -> sqlite3.Connection:
+    native_storage.migrate("media_hashes", _MIGRATIONS, _db_path())
+    return native_storage.connect(_db_path())
+
+
+def stat_key(path: Union[str, Path]) -> Optional[StatKey]:
+    try:
+        real = os.path.realpath(path)
+        stat = os.stat(real)
+    except OSError:
+        return None
+    return real, stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+def _cached(key: StatKey) -> Tuple[Optional[str], Optional[str]]:
+    try:
+        row = _connect().execute(
+            "SELECT fingerprint, sha256 FROM media_hashes WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+            key,
+        ).fetchone()
+    except Exception as exc:
+        logger.debug("Hash cache lookup failed for %s: %s", key[0], exc)
+        return None, None
+    return (row[0], row[1]) if row else (None, None)
+
+
+def _remember(key: StatKey, *, fingerprint: Optional[str] = None, sha256: Optional[str] = None) -> None:
+    try:
+        _connect()
+        with native_storage.transaction(_db_path()) as conn:
+            # A row for an older version of the file is replaced, not merged.
+            conn.execute(
+                """
+                INSERT INTO media_hashes (path, size, mtime_ns, inode, fingerprint, sha256, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    fingerprint = CASE WHEN size = excluded.size AND mtime_ns = excluded.mtime_ns
+                                            AND inode = excluded.inode
+                                       THEN COALESCE(excluded.fingerprint, fingerprint)
+                                       ELSE excluded.fingerprint END,
+                    sha256 = CASE WHEN size = excluded.size AND mtime_ns = excluded.mtime_ns
+                                       AND inode = excluded.inode
+                                  THEN COALESCE(excluded.sha256, sha256)
+                                  ELSE excluded.sha256 END,
+                    size = excluded.size,
+                    mtime_ns = excluded.mtime_ns,
+                    inode = excluded.inode,
+                    updated_at = excluded.updated_at
+                """,
+                (*key, fingerprint, sha256, time.time()),
+            )
+    except Exception as exc:
+        logger.debug("Failed to cache hashes for %s: %s", key[0], exc)
+
+
+def _compute_fingerprint(path: str, size: int) -> Optional[str]:
+    hasher = hashlib.sha256(f"{_FINGERPRINT_VERSION}:{size}:".encode("ascii"))
+    try:
+        with open(path, "rb") as handle:
+            if size <= 3 * _SAMPLE_BYTES:
+                hasher.update(handle.read())
+            else:
+                for offset in (0, (size - _SAMPLE_BYTES) // 2, size - _SAMPLE_BYTES):
+                    handle.seek(offset)
+                    hasher.update(handle.read(_SAMPLE_BYTES))
+    except OSError:
+        return None
+    return hasher.hexdigest()
+
+
+def _compute_sha256(path: str) -> Optional[str]:
+    hasher = hashlib.sha256()
+    try:
+        with open(path, "rb") as handle:
+            for chunk in iter(lambda: handle.read(_READ_CHUNK), b""):
+                hasher.update(chunk)
+    except OSError:
+        return None
+    return hasher.hexdigest()
+
+
+def fingerprint(path: Union[str, Path]) -> Optional[str]:
+    """Hash of the size and the head, middle and tail blocks: a few reads, whatever the file size.
+
+    Good for telling files apart quickly; use :func:`sha256` where an exact
+    content match matters (the result cache).
+    """
+    key = stat_key(path)
+    if key is None:
+        return None
+    cached, _ = _cached(key)
+    if cached:
+        return cached
+    value = _compute_fingerprint(key[0], key[1])
+    if value:
+        _remember(key, fingerprint=value)
+    return value
+
+
+def known_sha256(path: Union[str, Path]) -> Optional[str]:
+    """Full SHA-256 of *path* if it is already cached for this version of the file; never reads it."""
+    key = stat_key(path)
+    if key is None:
+        return None
+    _, cached = _cached(key)
+    return cached
+
+
+def sha256(path: Union[str, Path]) -> Optional[str]:
+    """Full SHA-256 of *path*, from the cache or read on the calling thread.
+
+    Only needed where the sampled :func:`fingerprint` is not enough: result
+    cache keys, and telling a copy from an edit when the samples match.
+    Concurrent callers for the same file share one read: the first reads it
+    and the others wait for its digest.
+    """
+    key = stat_key(path)
+    if key is None:
+        return None
+    _, cached = _cached(key)
+    if cached:
+        return cached
+    with _lock:
+        future = _inflight.get(key)
+        reader = future is None
+        if reader:
+            future = _inflight[key] = Future()
+    if not reader:
+        return future.result()
+
+    digest = None
+    try:
+        digest = _compute_sha256(key[0])
+        if digest is not None and stat_key(key[0]) != key:
+            # Rewritten while we read it.
+            digest = None
+        if digest:
+            _remember(key, sha256=digest)
+        return digest
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+        future.set_result(digest)
+
+
+def prune(max_rows: int = DEFAULT_MAX_ROWS) -> int:
+    """Drop the least recently hashed entries beyond *max_rows*; returns how many went."""
+    try:
+        _connect()
+        with native_storage.transaction(_db_path()) as conn:
+            cursor = conn.execute(
+                """
+                DELETE FROM media_hashes WHERE path IN (
+                    SELECT path FROM media_hashes ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (max(0, int(max_rows)),),
+            )
+            return cursor.rowcount or 0
+    except Exception as exc:
+        logger.debug("Failed to prune hash cache: %s", exc)
+        return 0
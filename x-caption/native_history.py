@@ -3,15 +3,20 @@
 
 from __future__ import annotations
 
+import base64
 import json
+import contextlib
 import logging
 import sqlite3
+import threading
 from datetime import datetime, timezone
 import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
-import hashlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
+import native_fingerprint
+import native_segments
+import native_storage
 from native_config import get_data_dir
 from native_job_queue import get_queue
 
@@ -32,21 +37,36 @@ FINISHED_STATES = {"finished", "completed"}
 FAILED_STATES = {"failed", "errored"}
 CANCELLED_STATES = {"canceled", "cancelled"}
 
+HISTORY_PAGE_SIZE = 200
+HISTORY_PAGE_MAX = 1000
+# How long a media validity result is served before it is checked again.
+_MEDIA_RECHECK_SECONDS = 60.0
+_MEDIA_RESULTS_MAX = 50000
+
 
 def _db_path() -> Path:
     data_dir = get_data_dir()
     return data_dir / "jobs.db"
 
 
+def ensure_schema() -> None:
+    """Run pending job_records migrations; after the first call in a process this is a no-op."""
+    native_storage.migrate("job_records", _MIGRATIONS, _db_path())
+
+
 def _connect() -> sqlite3.Connection:
-    path = _db_path()
-    path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(path))
-    _ensure_records_table(conn)
-    return conn
+    ensure_schema()
+    return native_storage.connect(_db_path())
 
 
-def _ensure_records_table(conn: sqlite3.Connection) -> None:
+@contextlib.contextmanager
+def _transaction() -> Iterator[sqlite3.Connection]:
+    ensure_schema()
+    with native_storage.transaction(_db_path()) as conn:
+        yield conn
+
+
+def _migrate_create_records(conn: sqlite3.Connection) -> None:
     conn.execute(
         """
         CREATE TABLE IF NOT EXISTS job_records (
@@ -72,6 +92,7 @@ def _ensure_records_table(conn: sqlite3.Connection) -> None:
         )
         """
     )
+    # Tables created before these columns existed.
     _ensure_columns(conn, {
         "media_hash": "TEXT",
         "media_size": "INTEGER",
@@ -86,6 +107,64 @@ def _ensure_records_table(conn: sqlite3.Connection) -> None:
     )
 
 
+def _migrate_recent_index(conn: sqlite3.Connection) -> None:
+    # Matches load_history's ORDER BY so the newest rows come straight off the index.
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_job_records_recent
+        ON job_records(COALESCE(updated_at, created_at))
+        """
+    )
+
+
+def _migrate_history_page(conn: sqlite3.Connection) -> None:
+    # Older rows only carried the media path inside transcript_json; copy it
+    # out once so listing never has to parse transcripts.
+    rows = conn.execute(
+        """
+        SELECT job_id, transcript_json FROM job_records
+        WHERE COALESCE(media_path, '') = '' AND transcript_json IS NOT NULL
+        """
+    ).fetchall()
+    for job_id, transcript_json in rows:
+        transcript = _parse_json(transcript_json)
+        media_path = _transcript_media_path(transcript)
+        if media_path:
+            conn.execute("UPDATE job_records SET media_path = ? WHERE job_id = ?", (media_path, job_id))
+    # Cursor pages order by (sort key, job_id); the job_id tiebreak keeps pages stable.
+    conn.execute("DROP INDEX IF EXISTS idx_job_records_recent")
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_job_records_page
+        ON job_records(COALESCE(updated_at, created_at) DESC, job_id DESC)
+        """
+    )
+
+
+def _migrate_media_fingerprint(conn: sqlite3.Connection) -> None:
+    _ensure_columns(conn, {"media_fingerprint": "TEXT"})
+
+
+def _migrate_segment_rows(conn: sqlite3.Connection) -> None:
+    # segment_store=1: the transcript's segments live in the segments table and
+    # transcript_json holds the rest. text_stale=1: transcript_text predates an edit.
+    _ensure_columns(conn, {
+        "segment_store": "INTEGER NOT NULL DEFAULT 0",
+        "text_stale": "INTEGER NOT NULL DEFAULT 0",
+    })
+    native_segments.create_schema(conn)
+
+
+# Append new steps; never edit or reorder released ones.
+_MIGRATIONS = (
+    _migrate_create_records,
+    _migrate_recent_index,
+    _migrate_history_page,
+    _migrate_media_fingerprint,
+    _migrate_segment_rows,
+)
+
+
 def _ensure_columns(conn: sqlite3.Connection, columns: Dict[str, str]) -> None:
     existing = {
         row[1]
@@ -110,18 +189,9 @@ def get_file_meta(path: str) -> Tuple[Optional[int], Optional[float]]:
         return None, None
 
 
-def compute_file_hash(path: str, chunk_size: int = 1024 * 1024) -> Optional[str]:
-    try:
-        hasher = hashlib.sha256()
-        with open(path, "rb") as handle:
-            while True:
-                chunk = handle.read(chunk_size)
-                if not chunk:
-                    break
-                hasher.update(chunk)
-        return hasher.hexdigest()
-    except Exception:
-        return None
+def compute_file_hash(path: str) -> Optional[str]:
+    """Full SHA-256 of *path*; unchanged files are answered from the hash cache."""
+    return native_fingerprint.sha256(path)
 
 
 def is_media_invalid(
@@ -129,8 +199,9 @@ def is_media_invalid(
     media_hash: Optional[str],
     media_size: Optional[int],
     media_mtime: Optional[float],
+    media_fingerprint: Optional[str] = None,
 ) -> Optional[bool]:
-    if not media_path or not media_hash:
+    if not media_path or not (media_hash or media_fingerprint):
         return None
     current_size, current_mtime = get_file_meta(media_path)
     if current_size is None or current_mtime is None:
@@ -142,12 +213,106 @@ def is_media_invalid(
         and current_mtime == media_mtime
     ):
         return False
+    if media_fingerprint:
+        current_fingerprint = native_fingerprint.fingerprint(media_path)
+        if not current_fingerprint or current_fingerprint != media_fingerprint:
+            return True
+        if not media_hash:
+            return False
+        # Same samples under a new stat: only the full hash tells a copy from
+        # an edit between the sampled blocks. Records from before
+        # fingerprints only have the full hash.
     current_hash = compute_file_hash(media_path)
     if not current_hash:
         return True
     return current_hash != media_hash
 
 
+class _MediaScanner:
+    """Background checks of whether history media still matches its recorded hash.
+
+    Listing only reads the last result for a file's recorded
+    (path, hash, size, mtime); unknown or stale entries are queued for a
+    worker thread, so a page never waits on a stat or a re-hash.
+    """
+
+    def __init__(self, recheck_seconds: float = _MEDIA_RECHECK_SECONDS):
+        self.recheck_seconds = recheck_seconds
+        self._lock = threading.Lock()
+        self._results: Dict[Tuple[Any, ...], Tuple[Optional[bool], float]] = {}
+        self._pending: Dict[Tuple[Any, ...], str] = {}
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def lookup(
+        self,
+        job_id: str,
+        media_path: Optional[str],
+        media_hash: Optional[str],
+        media_size: Optional[int],
+        media_mtime: Optional[float],
+        media_fingerprint: Optional[str] = None,
+    ) -> Optional[bool]:
+        """Last known validity (``None`` if not checked yet); schedules a check when due."""
+        if not media_path or not (media_hash or media_fingerprint):
+            return None
+        key = (media_path, media_hash, media_size, media_mtime, media_fingerprint)
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is None or time.monotonic() - cached[1] > self.recheck_seconds:
+                self._pending.setdefault(key, job_id)
+                self._ensure_thread()
+                self._wakeup.set()
+            return cached[0] if cached else None
+
+    def remember(self, key: Tuple[Any, ...], invalid: Optional[bool]) -> None:
+        with self._lock:
+            if len(self._results) >= _MEDIA_RESULTS_MAX:
+                self._results.clear()
+            self._results[key] = (invalid, time.monotonic())
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="history-media-scan", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._wakeup.clear()
+            for key, job_id in pending.items():
+                try:
+                    self._check(job_id, key)
+                except Exception as exc:
+                    logger.debug("Media check failed for job %s: %s", job_id, exc)
+            native_storage.close_thread_connections()
+
+    def _check(self, job_id: str, key: Tuple[Any, ...]) -> None:
+        media_path, media_hash, media_size, media_mtime, media_fingerprint = key
+        invalid = is_media_invalid(media_path, media_hash, media_size, media_mtime, media_fingerprint)
+        self.remember(key, invalid)
+        if invalid is False:
+            current_size, current_mtime = get_file_meta(media_path)
+            if (current_size, current_mtime) != (media_size, media_mtime):
+                # Same content, new stat (copied or touched): record it so the
+                # next check is a stat instead of a re-hash.
+                media_fingerprint = media_fingerprint or native_fingerprint.fingerprint(media_path)
+                with _transaction() as conn:
+                    conn.execute(
+                        """
+                        UPDATE job_records SET media_size = ?, media_mtime = ?, media_fingerprint = ?
+                        WHERE job_id = ? AND media_hash IS ?
+                        """,
+                        (current_size, current_mtime, media_fingerprint, job_id, media_hash),
+                    )
+                self.remember((media_path, media_hash, current_size, current_mtime, media_fingerprint), False)
+
+
+_media_scanner = _MediaScanner()
+
+
 def _serialize_json(value: Any) -> Optional[str]:
     if value is None:
         return None
@@ -168,6 +333,12 @@ def _parse_json(value: Optional[str]) -> Optional[Dict[str, Any]]:
         return None
 
 
+def _transcript_media_path(transcript: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not isinstance(transcript, dict):
+        return None
+    return transcript.get("file_path") or transcript.get("original_audio_path")
+
+
 def _strip_extension(value: Optional[str]) -> Optional[str]:
     if not value:
         return None
@@ -180,120 +351,173 @@ def _strip_extension(value: Optional[str]) -> Optional[str]:
     return name.rsplit(".", 1)[0] or name
 
 
+_RECORD_COLUMNS = (
+    "job_id", "filename", "display_name", "media_path", "media_kind", "media_hash", "media_fingerprint",
+    "media_size", "media_mtime", "status", "language", "device", "summary", "transcript_json", "transcript_text",
+    "segment_count", "duration", "created_at", "updated_at", "ui_state", "segment_store", "text_stale",
+)
+# Only replaced when an upsert carries a new transcript, so metadata updates
+# never write back a transcript that was edited in the meantime.
+_TRANSCRIPT_COLUMNS = ("transcript_json", "segment_store", "text_stale")
+
+
+def _build_upsert_sql(updated: Tuple[str, ...]) -> str:
+    return (
+        f"INSERT INTO job_records ({', '.join(_RECORD_COLUMNS)}) "
+        f"VALUES ({', '.join('?' for _ in _RECORD_COLUMNS)}) "
+        f"ON CONFLICT(job_id) DO UPDATE SET "
+        f"{', '.join(f'{column}=excluded.{column}' for column in updated)}"
+    )
+
+
+# Built once so every upsert reuses the same compiled statements.
+_UPSERT_RECORD_SQL = _build_upsert_sql(tuple(column for column in _RECORD_COLUMNS if column != "job_id"))
+_UPSERT_META_SQL = _build_upsert_sql(
+    tuple(column for column in _RECORD_COLUMNS if column != "job_id" and column not in _TRANSCRIPT_COLUMNS)
+)
+
+
 def upsert_job_record(record: Dict[str, Any]) -> None:
     job_id = record.get("job_id")
     if not job_id:
         return
 
     now = time.time()
-    with _connect() as conn:
-        row = conn.execute(
-            """
-            SELECT filename, display_name, media_path, media_kind, media_hash, media_size, media_mtime,
-                   status, language, device, summary, transcript_json, transcript_text,
-                   segment_count, duration, created_at, ui_state
-            FROM job_records
-            WHERE job_id = ?
-            """,
-            (job_id,),
-        ).fetchone()
-        existing = None
-        if row:
-            existing = {
-                "filename": row[0],
-                "display_name": row[1],
-                "media_path": row[2],
-                "media_kind": row[3],
-                "media_hash": row[4],
-                "media_size": row[5],
-                "media_mtime": row[6],
-                "status": row[7],
-                "language": row[8],
-                "device": row[9],
-                "summary": row[10],
-                "transcript_json": row[11],
-                "transcript_text": row[12],
-                "segment_count": row[13],
-                "duration": row[14],
-                "created_at": row[15],
-                "ui_state": row[16],
-            }
-
-        def pick(key: str, serializer=None):
-            if key in record:
-                value = record.get(key)
-                return serializer(value) if serializer else value
-            if existing:
-                return existing.get(key)
-            return None
-
-        created_at = record.get("created_at") or (existing.get("created_at") if existing else None) or now
-        updated_at = record.get("updated_at") or now
-
-        media_path = pick("media_path")
-        media_hash = pick("media_hash")
-        media_size = pick("media_size")
-        media_mtime = pick("media_mtime")
-
-        if media_path:
-            if media_size is None or media_mtime is None:
-                current_size, current_mtime = get_file_meta(str(media_path))
-                if media_size is None:
-                    media_size = current_size
-                if media_mtime is None:
-                    media_mtime = current_mtime
-            if media_hash is None:
-                media_hash = compute_file_hash(str(media_path))
-
-        display_name = pick("display_name") or _strip_extension(pick("filename"))
-        payload = {
-            "job_id": job_id,
-            "filename": pick("filename"),
-            "display_name": display_name,
-            "media_path": media_path,
-            "media_kind": pick("media_kind"),
-            "media_hash": media_hash,
-            "media_size": media_size,
-            "media_mtime": media_mtime,
-            "status": pick("status"),
-            "language": pick("language"),
-            "device": pick("device"),
-            "summary": pick("summary"),
-            "transcript_json": pick("transcript_json", _serialize_json),
-            "transcript_text": pick("transcript_text"),
-            "segment_count": pick("segment_count"),
-            "duration": pick("duration"),
-            "created_at": created_at,
-            "updated_at": updated_at,
-            "ui_state": pick("ui_state", _serialize_json),
+    # Stat and hash the media before taking the write lock.
+    row = _connect().execute(
+        """
+        SELECT filename, display_name, media_path, media_kind, media_hash, media_size, media_mtime,
+               status, language, device, summary, transcript_text,
+               segment_count, duration, created_at, ui_state, media_fingerprint
+        FROM job_records
+        WHERE job_id = ?
+        """,
+        (job_id,),
+    ).fetchone()
+    existing = None
+    if row:
+        existing = {
+            "filename": row[0],
+            "display_name": row[1],
+            "media_path": row[2],
+            "media_kind": row[3],
+            "media_hash": row[4],
+            "media_size": row[5],
+            "media_mtime": row[6],
+            "status": row[7],
+            "language": row[8],
+            "device": row[9],
+            "summary": row[10],
+            "transcript_text": row[11],
+            "segment_count": row[12],
+            "duration": row[13],
+            "created_at": row[14],
+            "ui_state": row[15],
+            "media_fingerprint": row[16],
         }
 
-        columns = ", ".join(payload.keys())
-        placeholders = ", ".join(["?"] * len(payload))
-        updates = ", ".join([f"{key}=excluded.{key}" for key in payload.keys() if key != "job_id"])
-        conn.execute(
-            f"""
-            INSERT INTO job_records ({columns})
-            VALUES ({placeholders})
-            ON CONFLICT(job_id) DO UPDATE SET {updates}
-            """,
-            tuple(payload.values()),
-        )
-        conn.commit()
+    def pick(key: str, serializer=None):
+        if key in record:
+            value = record.get(key)
+            return serializer(value) if serializer else value
+        if existing:
+            return existing.get(key)
+        return None
 
+    created_at = record.get("created_at") or (existing.get("created_at") if existing else None) or now
+    updated_at = record.get("updated_at") or now
+
+    media_path = pick("media_path") or _transcript_media_path(record.get("transcript_json"))
+    media_hash = pick("media_hash")
+    media_fingerprint = pick("media_fingerprint")
+    media_size = pick("media_size")
+    media_mtime = pick("media_mtime")
+
+    if media_path:
+        if media_size is None or media_mtime is None:
+            current_size, current_mtime = get_file_meta(str(media_path))
+            if media_size is None:
+                media_size = current_size
+            if media_mtime is None:
+                media_mtime = current_mtime
+        if media_fingerprint is None:
+            media_fingerprint = native_fingerprint.fingerprint(str(media_path))
+        if media_hash is None:
+            # Never read the whole file here; the hash is known once the
+            # pipeline has looked the media up in the result cache.
+            media_hash = native_fingerprint.known_sha256(str(media_path))
+
+    transcript_json = None
+    segments: Optional[List[Dict[str, Any]]] = None
+    transcript_text = pick("transcript_text")
+    segment_count = pick("segment_count")
+    if "transcript_json" in record:
+        transcript = record.get("transcript_json")
+        if isinstance(transcript, str):
+            transcript = _parse_json(transcript)
+        split = native_segments.split(transcript)
+        if split:
+            rest, segments = split
+            transcript_json = _serialize_json(rest)
+            if "transcript_text" not in record:
+                transcript_text = native_segments.join_text(segments)
+            if "segment_count" not in record:
+                segment_count = len(segments)
+        else:
+            transcript_json = _serialize_json(record.get("transcript_json"))
+
+    display_name = pick("display_name") or _strip_extension(pick("filename"))
+    payload = {
+        "job_id": job_id,
+        "filename": pick("filename"),
+        "display_name": display_name,
+        "media_path": media_path,
+        "media_kind": pick("media_kind"),
+        "media_hash": media_hash,
+        "media_fingerprint": media_fingerprint,
+        "media_size": media_size,
+        "media_mtime": media_mtime,
+        "status": pick("status"),
+        "language": pick("language"),
+        "device": pick("device"),
+        "summary": pick("summary"),
+        "transcript_json": transcript_json,
+        "transcript_text": transcript_text,
+        "segment_count": segment_count,
+        "duration": pick("duration"),
+        "created_at": created_at,
+        "updated_at": updated_at,
+        "ui_state": pick("ui_state", _serialize_json),
+        "segment_store": 1 if segments is not None else 0,
+        "text_stale": 0,
+    }
 
-def get_job_record(job_id: str) -> Optional[Dict[str, Any]]:
-    with _connect() as conn:
-        row = conn.execute(
-            """
-            SELECT job_id, filename, display_name, media_path, media_kind, media_hash, media_size, media_mtime,
-                   status, language, device, summary, transcript_json, transcript_text,
-                   segment_count, duration, created_at, updated_at, ui_state
-            FROM job_records
-            WHERE job_id = ?
-            """,
-            (job_id,),
-        ).fetchone()
+    with _transaction() as conn:
+        if "transcript_json" in record:
+            conn.execute(_UPSERT_RECORD_SQL, tuple(payload[column] for column in _RECORD_COLUMNS))
+            native_segments.replace(conn, job_id, segments or [])
+        else:
+            conn.execute(_UPSERT_META_SQL, tuple(payload[column] for column in _RECORD_COLUMNS))
+
+
+_GET_RECORD_SQL = """
+    SELECT job_id, filename, display_name, media_path, media_kind, media_hash, media_size, media_mtime,
+           status, language, device, summary, {transcript_columns},
+           segment_count, duration, created_at, updated_at, ui_state, media_fingerprint,
+           segment_store, text_stale
+    FROM job_records
+    WHERE job_id = ?
+"""
+_GET_RECORD_FULL_SQL = _GET_RECORD_SQL.format(transcript_columns="transcript_json, transcript_text")
+_GET_RECORD_META_SQL = _GET_RECORD_SQL.format(transcript_columns="NULL, NULL")
+
+
+def get_job_record(job_id: str, include_transcript: bool = True) -> Optional[Dict[str, Any]]:
+    """Load one record; pass ``include_transcript=False`` when only its metadata is needed."""
+    row = _connect().execute(
+        _GET_RECORD_FULL_SQL if include_transcript else _GET_RECORD_META_SQL,
+        (job_id,),
+    ).fetchone()
 
     if not row:
         return None
@@ -318,6 +542,9 @@ def get_job_record(job_id: str) -> Optional[Dict[str, Any]]:
         created_at,
         updated_at,
         ui_state,
+        media_fingerprint,
+        segment_store,
+        text_stale,
     ) = row
 
     if not filename and media_path:
@@ -327,14 +554,19 @@ def get_job_record(job_id: str) -> Optional[Dict[str, Any]]:
             filename = filename
 
     transcript = _parse_json(transcript_json)
+    if include_transcript and segment_store:
+        transcript, transcript_text = _assemble_transcript(job_id, transcript, transcript_text, bool(text_stale))
     if not media_path and transcript:
-        media_path = transcript.get("file_path") or transcript.get("original_audio_path")
+        media_path = _transcript_media_path(transcript)
     if not filename and media_path:
         try:
             filename = Path(str(media_path)).name
         except Exception:
             filename = filename
 
+    # Same as the history list: the last background check, never a hash here.
+    media_invalid = _media_scanner.lookup(job_id, media_path, media_hash, media_size, media_mtime, media_fingerprint)
+
     return {
         "job_id": job_id,
         "filename": filename,
@@ -342,9 +574,10 @@ def get_job_record(job_id: str) -> Optional[Dict[str, Any]]:
         "media_path": media_path,
         "media_kind": media_kind,
         "media_hash": media_hash,
+        "media_fingerprint": media_fingerprint,
         "media_size": media_size,
         "media_mtime": media_mtime,
-        "media_invalid": is_media_invalid(media_path, media_hash, media_size, media_mtime),
+        "media_invalid": media_invalid,
         "status": status,
         "language": language,
         "device": device,
@@ -359,6 +592,201 @@ def get_job_record(job_id: str) -> Optional[Dict[str, Any]]:
     }
 
 
+def _assemble_transcript(
+    job_id: str,
+    transcript: Optional[Dict[str, Any]],
+    transcript_text: Optional[str],
+    text_stale: bool,
+) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Rebuild the full transcript from its segment rows; refresh the joined text if edits made it stale."""
+    segments = native_segments.load(_connect(), job_id)
+    transcript = dict(transcript or {})
+    transcript["segments"] = segments
+    if text_stale or transcript_text is None:
+        transcript_text = native_segments.join_text(segments)
+        try:
+            with _transaction() as conn:
+                conn.execute(
+                    "UPDATE job_records SET transcript_text = ?, text_stale = 0 WHERE job_id = ? AND text_stale = ?",
+                    (transcript_text, job_id, int(text_stale)),
+                )
+        except Exception as exc:
+            logger.debug("Failed to refresh transcript text for %s: %s", job_id, exc)
+    transcript["text"] = transcript_text
+    return transcript, transcript_text
+
+
+def _edit_segments(
+    job_id: str,
+    edit_rows: Callable[[sqlite3.Connection], Any],
+    edit_list: Callable[[List[Dict[str, Any]]], Any],
+    count_delta: int = 0,
+) -> Any:
+    """Apply one segment edit; returns ``None`` when the job has no transcript, else the edit's result.
+
+    A transcript saved before segment rows existed is split into rows on its
+    first edit. One whose segments cannot be rows (ids that are not unique
+    integers) is still edited as a whole, through *edit_list*.
+    """
+    now = time.time()
+    with _transaction() as conn:
+        row = conn.execute(
+            "SELECT segment_store, transcript_json FROM job_records WHERE job_id = ?",
+            (job_id,),
+        ).fetchone()
+        if not row:
+            return None
+        segment_store, transcript_json = row
+        if not segment_store:
+            transcript = _parse_json(transcript_json)
+            if not transcript:
+                return None
+            split = native_segments.split(transcript)
+            if split is None:
+                segments = transcript.get("segments")
+                if not isinstance(segments, list):
+                    segments = transcript["segments"] = []
+                result = edit_list(segments)
+                if result:
+                    transcript["text"] = native_segments.join_text(segments)
+                    conn.execute(
+                        """
+                        UPDATE job_records
+                        SET transcript_json = ?, transcript_text = ?, segment_count = ?, updated_at = ?
+                        WHERE job_id = ?
+                        """,
+                        (_serialize_json(transcript), transcript["text"], len(segments), now, job_id),
+                    )
+                return result
+            rest, segments = split
+            native_segments.replace(conn, job_id, segments)
+            conn.execute(
+                "UPDATE job_records SET transcript_json = ?, segment_store = 1, segment_count = ? WHERE job_id = ?",
+                (_serialize_json(rest), len(segments), job_id),
+            )
+        result = edit_rows(conn)
+        if result:
+            conn.execute(
+                """
+                UPDATE job_records
+                SET text_stale = 1, segment_count = COALESCE(segment_count, 0) + ?, updated_at = ?
+                WHERE job_id = ?
+                """,
+                (count_delta, now, job_id),
+            )
+        return result
+
+
+def _is_segment(segment: Dict[str, Any], segment_id: Any, key: Optional[int]) -> bool:
+    """Whether *segment* is the one a client called *segment_id* (*key* is its integer form, if any)."""
+    if key is not None:
+        return native_segments.segment_key(segment.get("id")) == key
+    return segment.get("id") == segment_id
+
+
+def edit_segment_text(job_id: str, segment_id: Any, text: str) -> Optional[bool]:
+    """Replace a segment's text; ``None`` if the job has no transcript, ``False`` if the segment is unknown."""
+    key = native_segments.segment_key(segment_id)
+
+    def edit_rows(conn: sqlite3.Connection) -> bool:
+        segment = native_segments.get(conn, job_id, key) if key is not None else None
+        if segment is None:
+            return False
+        segment["text"] = text
+        segment["originalText"] = text
+        native_segments.put(conn, job_id, segment)
+        return True
+
+    def edit_list(segments: List[Dict[str, Any]]) -> bool:
+        for segment in segments:
+            if _is_segment(segment, segment_id, key):
+                segment["text"] = text
+                segment["originalText"] = text
+                return True
+        return False
+
+    return _edit_segments(job_id, edit_rows, edit_list)
+
+
+def set_segment_timing(job_id: str, segment_id: Any, start: float, end: float) -> Optional[bool]:
+    """Move a segment; ``None`` if the job has no transcript, ``False`` if the segment is unknown."""
+    key = native_segments.segment_key(segment_id)
+
+    def edit_rows(conn: sqlite3.Connection) -> bool:
+        return key is not None and native_segments.set_timing(conn, job_id, key, start, end)
+
+    def edit_list(segments: List[Dict[str, Any]]) -> bool:
+        for segment in segments:
+            if _is_segment(segment, segment_id, key):
+                segment["start"] = start
+                segment["end"] = end
+                return True
+        return False
+
+    return _edit_segments(job_id, edit_rows, edit_list)
+
+
+def add_segment(
+    job_id: str,
+    start: float,
+    end: float,
+    text: str,
+    segment_id: Any = None,
+) -> Optional[Dict[str, Any]]:
+    """Insert a segment and return it; ``None`` if the job has no transcript.
+
+    Without a usable *segment_id* the next free id is used. Raises
+    ``ValueError`` when *segment_id* is already taken.
+    """
+    key = native_segments.segment_key(segment_id)
+
+    def edit_rows(conn: sqlite3.Connection) -> Dict[str, Any]:
+        segment_key = key
+        if segment_key is None:
+            segment_key = native_segments.next_id(conn, job_id)
+        elif native_segments.get(conn, job_id, segment_key) is not None:
+            raise ValueError(f"Segment id {segment_key} is already taken")
+        segment = {"id": segment_key, "start": start, "end": end, "text": text, "originalText": text}
+        native_segments.put(conn, job_id, segment)
+        return segment
+
+    def edit_list(segments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        segment_key = key
+        if segment_key is not None and any(_is_segment(seg, segment_id, key) for seg in segments):
+            raise ValueError(f"Segment id {segment_key} is already taken")
+        if segment_key is None:
+            max_id = 0
+            for seg in segments:
+                try:
+                    max_id = max(max_id, int(seg.get("id", 0)))
+                except Exception:
+                    continue
+            segment_key = max_id + 1
+        segment = {"id": segment_key, "start": start, "end": end, "text": text, "originalText": text}
+        segments.append(segment)
+        segments.sort(key=lambda seg: float(seg.get("start", 0)))
+        return segment
+
+    return _edit_segments(job_id, edit_rows, edit_list, count_delta=1)
+
+
+def delete_segment(job_id: str, segment_id: Any) -> Optional[bool]:
+    """Remove a segment; ``None`` if the job has no transcript, ``False`` if the segment is unknown."""
+    key = native_segments.segment_key(segment_id)
+
+    def edit_rows(conn: sqlite3.Connection) -> bool:
+        return key is not None and native_segments.delete(conn, job_id, key)
+
+    def edit_list(segments: List[Dict[str, Any]]) -> bool:
+        remaining = [seg for seg in segments if not _is_segment(seg, segment_id, key)]
+        if len(remaining) == len(segments):
+            return False
+        segments[:] = remaining
+        return True
+
+    return _edit_segments(job_id, edit_rows, edit_list, count_delta=-1)
+
+
 def update_job_ui_state(job_id: str, ui_state: Dict[str, Any]) -> None:
     upsert_job_record({"job_id": job_id, "ui_state": ui_state})
 
@@ -386,108 +814,152 @@ def _ts_to_iso(ts: Optional[float]) -> Optional[str]:
         return None
 
 
-def load_history(limit: int = 200) -> List[Dict[str, Any]]:
-    """Return recent jobs stored in the records table."""
-    _cleanup_legacy_history()
-    entries: List[Dict[str, Any]] = []
+_HISTORY_PAGE_SQL = """
+    SELECT job_id, filename, display_name, media_path, media_kind, media_hash, media_size, media_mtime,
+           status, language, device, COALESCE(NULLIF(summary, ''), substr(transcript_text, 1, 500)),
+           segment_count, duration, created_at, updated_at, ui_state, media_fingerprint,
+           COALESCE(updated_at, created_at)
+    FROM job_records
+    WHERE (COALESCE(filename, '') != '' OR COALESCE(media_path, '') != ''
+           OR COALESCE(transcript_text, '') != '' OR transcript_json IS NOT NULL)
+      {cursor_clause}
+    ORDER BY COALESCE(updated_at, created_at) DESC, job_id DESC
+    LIMIT ?
+"""
+_HISTORY_FIRST_PAGE_SQL = _HISTORY_PAGE_SQL.format(cursor_clause="")
+_HISTORY_NEXT_PAGE_SQL = _HISTORY_PAGE_SQL.format(
+    cursor_clause="""AND (COALESCE(updated_at, created_at) < ?
+           OR (COALESCE(updated_at, created_at) = ? AND job_id < ?))"""
+)
+
+
+def _encode_cursor(sort_key: Any, job_id: str) -> str:
+    raw = json.dumps([sort_key, job_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
 
+
+def _decode_cursor(cursor: str) -> Tuple[Any, str]:
     try:
-        with _connect() as conn:
-            rows = conn.execute(
-                """
-                SELECT job_id, filename, display_name, media_path, media_kind, media_hash, media_size, media_mtime,
-                       status, language, device, summary, transcript_text, segment_count, duration,
-                       created_at, updated_at, ui_state, transcript_json
-                FROM job_records
-                ORDER BY COALESCE(updated_at, created_at) DESC
-                LIMIT ?
-                """,
-                (limit,),
-            ).fetchall()
-
-        for row in rows:
-            (
-                job_id,
-                filename,
-                display_name,
-                media_path,
-                media_kind,
-                media_hash,
-                media_size,
-                media_mtime,
-                status,
-                language,
-                device,
-                summary,
-                transcript_text,
-                segment_count,
-                duration,
-                created_at,
-                updated_at,
-                ui_state,
-                transcript_json,
-            ) = row
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_key, job_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as exc:
+        raise ValueError("Invalid history cursor") from exc
+    if not isinstance(job_id, str):
+        raise ValueError("Invalid history cursor")
+    return sort_key, job_id
+
+
+def load_history_page(
+    limit: int = HISTORY_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Return one page of history entries, newest first, and the cursor of the next page.
+
+    Only list columns are read: transcripts come from :func:`get_job_record`
+    and ``media_invalid`` is the last background check (``None`` until the
+    first one finishes). Raises ``ValueError`` for a malformed *cursor*.
+    """
+    limit = max(1, min(int(limit), HISTORY_PAGE_MAX))
+    if cursor:
+        sort_key, last_job_id = _decode_cursor(cursor)
+        rows = _connect().execute(_HISTORY_NEXT_PAGE_SQL, (sort_key, sort_key, last_job_id, limit + 1)).fetchall()
+    else:
+        _cleanup_legacy_history()
+        rows = _connect().execute(_HISTORY_FIRST_PAGE_SQL, (limit + 1,)).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1][-1], rows[-1][0])
 
-            transcript = _parse_json(transcript_json)
-            if not filename and media_path:
-                try:
-                    filename = Path(str(media_path)).name
-                except Exception:
-                    filename = filename
-            if not display_name:
-                display_name = _strip_extension(filename) or filename or job_id
+    entries: List[Dict[str, Any]] = []
+    for row in rows:
+        (
+            job_id,
+            filename,
+            display_name,
+            media_path,
+            media_kind,
+            media_hash,
+            media_size,
+            media_mtime,
+            status,
+            language,
+            device,
+            summary,
+            segment_count,
+            duration,
+            created_at,
+            updated_at,
+            ui_state,
+            media_fingerprint,
+            _sort_key,
+        ) = row
+
+        if not filename and media_path:
+            try:
+                filename = Path(str(media_path)).name
+            except Exception:
+                filename = filename
+        if not display_name:
+            display_name = _strip_extension(filename) or filename or job_id
+
+        normalized_status = (status or "completed").lower()
+        progress = 100 if normalized_status in FINISHED_STATES else (-1 if normalized_status in FAILED_STATES else 0)
 
-            if not filename and not media_path and not transcript_text and not transcript:
-                continue
-            if not media_path and transcript:
-                media_path = transcript.get("file_path") or transcript.get("original_audio_path")
-
-            normalized_status = (status or "completed").lower()
-            progress = 100 if normalized_status in FINISHED_STATES else (-1 if normalized_status in FAILED_STATES else 0)
-
-            entry: Dict[str, Any] = {
-                "job_id": job_id,
-                "status": status or "completed",
-                "message": "",
-                "created_at": _ts_to_iso(created_at),
-                "completed_at": _ts_to_iso(updated_at),
+        entry: Dict[str, Any] = {
+            "job_id": job_id,
+            "status": status or "completed",
+            "message": "",
+            "created_at": _ts_to_iso(created_at),
+            "completed_at": _ts_to_iso(updated_at),
+            "language": language,
+            "device": device,
+            "summary": summary or "",
+            "progress": progress,
+            "original_filename": filename or job_id,
+            "display_name": display_name,
+            "media_path": media_path,
+            "media_kind": media_kind,
+            "media_hash": media_hash,
+            "media_size": media_size,
+            "media_mtime": media_mtime,
+            "media_invalid": _media_scanner.lookup(
+                job_id, media_path, media_hash, media_size, media_mtime, media_fingerprint
+            ),
+            "audio_file": {
+                "name": filename or job_id,
+                "path": media_path,
+                "size": media_size,
+                "hash": media_hash,
+                "mtime": media_mtime,
+            },
+            "ui_state": _parse_json(ui_state),
+        }
+
+        if summary or segment_count:
+            # The list only reads the summary; the full text comes with the transcript.
+            entry["result_preview"] = {
+                "segment_count": int(segment_count or 0),
+                "text": summary or "",
                 "language": language,
-                "device": device,
-                "summary": summary or (transcript_text or "")[:500],
-                "progress": progress,
-                "original_filename": filename or job_id,
-                "display_name": display_name,
-                "media_path": media_path,
-                "media_kind": media_kind,
-                "media_hash": media_hash,
-                "media_size": media_size,
-                "media_mtime": media_mtime,
-                "media_invalid": is_media_invalid(media_path, media_hash, media_size, media_mtime),
-                "audio_file": {
-                    "name": filename or job_id,
-                    "path": media_path,
-                    "size": media_size,
-                    "hash": media_hash,
-                    "mtime": media_mtime,
-                },
-                "ui_state": _parse_json(ui_state),
             }
 
-            if transcript_text or segment_count:
-                entry["result_preview"] = {
-                    "segment_count": int(segment_count or 0),
-                    "text": transcript_text,
-                    "language": language,
-                }
+        if duration is not None:
+            entry["audio_duration"] = duration
+
+        entries.append(entry)
 
-            if duration is not None:
-                entry["audio_duration"] = duration
+    return entries, next_cursor
 
-            entries.append(entry)
+
+def load_history(limit: int = HISTORY_PAGE_SIZE) -> List[Dict[str, Any]]:
+    """Return the most recent history entries (the first page of :func:`load_history_page`)."""
+    try:
+        return load_history_page(limit)[0]
     except Exception as exc:
         logger.error("Failed to load job history: %s", exc)
-
-    return entries
+        return []
 
 
 def mark_completed(
@@ -500,46 +972,45 @@ def mark_completed(
     audio_file: Optional[Dict[str, Any]] = None,
     language: Optional[str] = None,
     device: Optional[str] = None,
+    transcript_stored: bool = False,
 ) -> None:
+    """Record a finished job; pass ``transcript_stored`` when the transcript is already in its record."""
     queue = get_queue('default')
     meta_update = {
-        "message": message,
-        "progress": 100,
         "original_filename": original_filename,
         "language": language or result.get("language"),
         "device": device or result.get("device"),
         "summary": (result.get("text") or "")[:500],
         "audio_file": audio_file,
     }
-    queue.update_job_meta(job_id, meta_update)
+    queue.update_job_progress(job_id, 100, message, meta_update)
 
-    try:
-        upsert_job_record({
-            "job_id": job_id,
-            "filename": original_filename,
-            "media_path": (audio_file.get("path") if isinstance(audio_file, dict) else None),
-            "media_kind": None,
-            "status": "completed",
-            "language": language or result.get("language"),
-            "device": device or result.get("device"),
-            "summary": (result.get("text") or "")[:500],
+    record = {
+        "job_id": job_id,
+        "filename": original_filename,
+        "media_path": (audio_file.get("path") if isinstance(audio_file, dict) else None),
+        "media_kind": None,
+        "status": "completed",
+        "language": language or result.get("language"),
+        "device": device or result.get("device"),
+        "summary": (result.get("text") or "")[:500],
+        "duration": result.get("audio_duration"),
+    }
+    if not transcript_stored:
+        record.update({
             "transcript_json": result,
             "transcript_text": result.get("text"),
             "segment_count": len(result.get("segments") or []),
-            "duration": result.get("audio_duration"),
         })
+    try:
+        upsert_job_record(record)
     except Exception as exc:
         logger.debug("Failed to upsert job record %s: %s", job_id, exc)
 
 
 def mark_failed(*, job_id: str, original_filename: str, message: str) -> None:
     queue = get_queue('default')
-    meta_update = {
-        "message": message,
-        "progress": -1,
-        "original_filename": original_filename,
-    }
-    queue.update_job_meta(job_id, meta_update)
+    queue.update_job_progress(job_id, -1, message, {"original_filename": original_filename})
     try:
         upsert_job_record({
             "job_id": job_id,
@@ -555,15 +1026,15 @@ def remove_entry(job_id: str) -> None:
     queue = get_queue('default')
     queue.remove_job(job_id)
     try:
-        with _connect() as conn:
+        with _transaction() as conn:
             conn.execute("DELETE FROM job_records WHERE job_id = ?", (job_id,))
-            conn.commit()
+            native_segments.clear(conn, job_id)
     except Exception as exc:
         logger.debug("Failed to remove job record %s: %s", job_id, exc)
 
 
 def get_entry(job_id: str) -> Optional[Dict[str, Any]]:
-    record = get_job_record(job_id)
+    record = get_job_record(job_id, include_transcript=False)
     if record:
         status = record.get("status") or "completed"
         normalized_status = status.lower()
@@ -582,7 +1053,7 @@ def get_entry(job_id: str) -> Optional[Dict[str, Any]]:
                 "hash": record.get("media_hash"),
                 "mtime": record.get("media_mtime"),
             },
-            "summary": record.get("summary") or (record.get("transcript_text") or "")[:500],
+            "summary": record.get("summary") or "",
             "progress": progress,
             "media_path": record.get("media_path"),
             "media_kind": record.get("media_kind"),
@@ -5,27 +5,39 @@ Uses native_job_queue instead of Redis/RQ.
 """
 from __future__ import annotations
 
+import bisect
 import contextlib
+import hashlib
 import json
 import logging
 import os
 import re
 import shutil
-import subprocess
 import tempfile
 import threading
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Callable, Dict, Iterable, Optional, Tuple
 
+import numpy as np
 import soundfile as sf
 
-from whisper_cpp_runtime import transcribe_whisper_cpp, resolve_whisper_model
+from whisper_cpp_runtime import transcribe_whisper_cpp, resolve_whisper_engine, resolve_whisper_model
 
-from native_config import get_models_dir, get_transcriptions_dir, get_uploads_dir, get_bundle_dir, setup_environment
+from native_config import get_data_dir, get_models_dir, get_transcriptions_dir, get_uploads_dir, get_bundle_dir, setup_environment
 from native_ffmpeg import get_ffmpeg_path, get_audio_duration
+import native_cancellation
+import native_checkpoints
+import native_chunking
+import native_fingerprint
 import native_history
+from native_job_queue import STAGE_CPU, Stage, run_stages
+import native_result_cache
+import native_resources
+import native_vad
 
 setup_environment()
 
@@ -48,12 +60,27 @@ _ENGLISH_TRANSLATE_PREFIX_ENV = "XCAPTION_ENGLISH_TRANSLATE_PREFIX_AUDIO"
 _DEFAULT_WRITTEN_PREFIX_RELATIVE = Path("merge") / "written.mp3"
 _DEFAULT_SPOKEN_PREFIX_RELATIVE = Path("merge") / "spoken.mp3"
 _DEFAULT_ENGLISH_TRANSLATE_PREFIX_RELATIVE = Path("merge") / "english_translate.mp3"
+_STEERING_MODE_ENV = "XCAPTION_STEERING_MODE"
+_WRITTEN_PREFIX_PROMPT_ENV = "XCAPTION_WRITTEN_PREFIX_PROMPT"
+_SPOKEN_PREFIX_PROMPT_ENV = "XCAPTION_SPOKEN_PREFIX_PROMPT"
+_ENGLISH_TRANSLATE_PREFIX_PROMPT_ENV = "XCAPTION_ENGLISH_TRANSLATE_PREFIX_PROMPT"
+# Text equivalents of the merge/*.mp3 clips, used as whisper's initial prompt.
+_DEFAULT_STEERING_PROMPTS = {
+    "written": "以下是香港新聞報道的中文字幕，使用規範的繁體中文書面語，並加上標點符號。",
+    "spoken": "以下係香港廣東話嘅字幕，用返口語粵字，例如佢哋、唔係、咁樣、嘅、咗，仲會加埋標點符號。",
+    "english_translate": "以下係英文對白嘅廣東話翻譯字幕，用繁體粵字同標點符號。",
+}
 _PREFIX_SILENCE_SECONDS = 5.0
 _DEFAULT_PREFIX_SECONDS = 15.0
 _PREFIX_TRIM_MIN_DURATION = 0.2
 _PREFIX_TRIM_BOUNDARY_TOLERANCE = 0.25
 _PREFIX_RECOVERY_MAX_OVERLAP = 999.0
 _PREFIX_RECOVERY_MAX_DURATION = 12.0
+_PARTIAL_RESULT_INTERVAL_SECONDS = 1.0
+_AUDIO_STREAMING_ENV = "XCAPTION_AUDIO_STREAMING"
+_PCM_FORMAT_FILTER = "aresample=16000,aformat=sample_fmts=s16:sample_rates=16000:channel_layouts=mono"
+_PCM_SAMPLE_RATE = 16000
+_SPLICE_BLOCK_FRAMES = _PCM_SAMPLE_RATE * 30
 
 
 def _postprocess_caption_segments(segments: Iterable[Dict[str, Any]]) -> list[Dict[str, Any]]:
@@ -147,6 +174,153 @@ def _resolve_english_translate_prefix_path() -> Optional[Path]:
     return None
 
 
+@dataclass(frozen=True)
+class _PrefixAudio:
+    pcm: np.ndarray
+    wav_path: Path
+
+    @property
+    def duration(self) -> float:
+        return self.pcm.shape[0] / _PCM_SAMPLE_RATE
+
+
+_prefix_audio_cache: Dict[str, _PrefixAudio] = {}
+_prefix_audio_lock = threading.Lock()
+
+
+def _load_prefix_audio(prefix_path: Path) -> Optional[_PrefixAudio]:
+    """Decode a prefix clip once into trimmed 16 kHz mono PCM and a cached WAV copy."""
+    try:
+        stat = prefix_path.stat()
+    except OSError:
+        return None
+    cache_key = f"{prefix_path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+    with _prefix_audio_lock:
+        cached = _prefix_audio_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        cmd = [
+            get_ffmpeg_path(),
+            "-nostdin",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-i",
+            str(prefix_path),
+            "-t",
+            str(_DEFAULT_PREFIX_SECONDS),
+            "-vn",
+            "-f",
+            "s16le",
+            "-acodec",
+            "pcm_s16le",
+            "-ac",
+            "1",
+            "-ar",
+            str(_PCM_SAMPLE_RATE),
+            "-",
+        ]
+        process = native_cancellation.run(cmd, capture_output=True)
+        pcm = np.frombuffer(process.stdout or b"", dtype=np.int16).copy()
+        if process.returncode != 0 or pcm.size == 0:
+            logger.warning(
+                "Failed to decode prefix audio %s: %s",
+                prefix_path,
+                (process.stderr or b"").decode("utf-8", errors="replace").strip(),
+            )
+            return None
+
+        digest = hashlib.sha1(cache_key.encode("utf-8")).hexdigest()[:12]
+        wav_path = get_data_dir() / "prefix_cache" / f"{prefix_path.stem}_{digest}.wav"
+        try:
+            if not wav_path.exists():
+                wav_path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = wav_path.with_suffix(".tmp.wav")
+                sf.write(str(temp_path), pcm, _PCM_SAMPLE_RATE, subtype="PCM_16", format="WAV")
+                os.replace(temp_path, wav_path)
+        except Exception as exc:
+            logger.warning("Failed to cache prefix audio %s: %s", prefix_path, exc)
+            return None
+
+        prefix_audio = _PrefixAudio(pcm=pcm, wav_path=wav_path)
+        _prefix_audio_cache[cache_key] = prefix_audio
+        _prefix_audio_cache[str(wav_path)] = prefix_audio
+        return prefix_audio
+
+
+def _splice_prefix_audio(
+    *,
+    job_id: str,
+    prefix_path: Path,
+    audio_path: Path,
+    silence_seconds: float = 0.0,
+    cleanup_paths: Optional[list] = None,
+) -> Optional[Path]:
+    """Write prefix + silence + *audio_path* as one WAV without spawning ffmpeg.
+
+    Only handles 16 kHz sources with a cached prefix; returns ``None`` otherwise
+    so the caller can fall back to :func:`_concat_prefix_audio`.
+    """
+    with _prefix_audio_lock:
+        prefix_audio = _prefix_audio_cache.get(str(prefix_path))
+    if prefix_audio is None:
+        return None
+    try:
+        info = sf.info(str(audio_path))
+    except Exception:
+        return None
+    if info.samplerate != _PCM_SAMPLE_RATE:
+        return None
+
+    temp_dir = Path(tempfile.mkdtemp(prefix=f"xsub_prefix_{job_id}_"))
+    output_path = temp_dir / f"{job_id}_prefixed.wav"
+    try:
+        with sf.SoundFile(
+            str(output_path), "w", samplerate=_PCM_SAMPLE_RATE, channels=1, subtype="PCM_16", format="WAV"
+        ) as target:
+            target.write(prefix_audio.pcm)
+            silence_frames = int(round(max(0.0, silence_seconds) * _PCM_SAMPLE_RATE))
+            if silence_frames:
+                target.write(np.zeros(silence_frames, dtype=np.int16))
+            for block in sf.blocks(str(audio_path), blocksize=_SPLICE_BLOCK_FRAMES, dtype="int16", always_2d=True):
+                if block.shape[1] > 1:
+                    block = block.mean(axis=1).astype(np.int16)
+                else:
+                    block = block[:, 0]
+                target.write(block)
+    except Exception as exc:
+        logger.warning("Failed to splice prefix audio for %s: %s", audio_path, exc)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return None
+
+    if cleanup_paths is not None:
+        cleanup_paths.append(str(temp_dir))
+    return output_path
+
+
+def _steering_mode(value: Optional[str] = None) -> str:
+    """Return ``"audio"`` (prepend a prefix clip) or ``"prompt"`` (initial prompt text)."""
+    raw_value = value if value else (os.environ.get(_STEERING_MODE_ENV) or "audio")
+    normalized = (raw_value or "").strip().lower()
+    if normalized in {"prompt", "text"}:
+        return "prompt"
+    if normalized not in {"audio", "prefix", ""}:
+        logger.warning("Unknown steering mode %r; defaulting to 'audio'", raw_value)
+    return "audio"
+
+
+def _resolve_steering_prompt(kind: str) -> Optional[str]:
+    env_key = {
+        "written": _WRITTEN_PREFIX_PROMPT_ENV,
+        "spoken": _SPOKEN_PREFIX_PROMPT_ENV,
+        "english_translate": _ENGLISH_TRANSLATE_PREFIX_PROMPT_ENV,
+    }.get(kind)
+    if not env_key:
+        return None
+    return (os.environ.get(env_key) or "").strip() or _DEFAULT_STEERING_PROMPTS.get(kind)
+
+
 def _concat_prefix_audio(
     *,
     job_id: str,
@@ -196,7 +370,7 @@ def _concat_prefix_audio(
         "16000",
         str(output_path),
     ]
-    process = subprocess.run(cmd, capture_output=True, text=True)
+    process = native_cancellation.run(cmd, capture_output=True, text=True)
     if process.returncode != 0 or not output_path.exists():
         error_output = (process.stderr or process.stdout or "").strip()
         logger.warning("Failed to apply prefix audio: %s", error_output)
@@ -479,80 +653,139 @@ def _build_noise_suppression_filter(backend: str) -> Optional[str]:
     return None
 
 
-@contextlib.contextmanager
-def _noise_suppressed_audio(
-    source_path: Path,
-    *,
-    job_id: str,
-    backend: Optional[str] = None,
-    progress_callback: Optional[Callable[[str, int], None]] = None,
-) -> Iterable[Path]:
+def _noise_filter_candidates(backend: Optional[str]) -> list:
+    """Return noise filters to try in order, ending with no filter at all."""
     resolved_backend = _noise_suppression_backend(backend)
-    if resolved_backend in {"", "none"}:
-        yield source_path
-        return
+    candidates: list = []
+    primary = _build_noise_suppression_filter(resolved_backend)
+    if primary:
+        candidates.append(primary)
+    if resolved_backend == "rnnoise":
+        candidates.append(_build_noise_suppression_filter("afftdn"))
+    candidates.append(None)
+    return candidates
+
+
+def _audio_streaming_enabled() -> bool:
+    raw_value = (os.environ.get(_AUDIO_STREAMING_ENV) or "off").strip().lower()
+    if raw_value not in {"1", "true", "yes", "on", "enable", "enabled"}:
+        return False
+    engine = resolve_whisper_engine()
+    # The wasm engine reads files itself and cannot consume a piped stream.
+    return bool(engine) and engine.suffix.lower() != ".mjs"
 
-    noise_filter = _build_noise_suppression_filter(resolved_backend)
-    if not noise_filter:
-        yield source_path
-        return
 
-    temp_dir = Path(tempfile.mkdtemp(prefix=f"xsub_denoise_{job_id}_"))
-    output_path = temp_dir / f"{job_id}_denoised.wav"
+def _streams_audio(prepared_audio_path: Optional[str]) -> bool:
+    """Whether a job decodes straight into the engine (prepared uploads are files already)."""
+    return not prepared_audio_path and _audio_streaming_enabled()
 
-    ffmpeg_path = get_ffmpeg_path()
-    base_cmd = [
-        ffmpeg_path,
-        "-y",
-        "-i",
-        str(source_path),
+
+def _build_audio_graph_command(
+    source_path: Path,
+    *,
+    output: str,
+    noise_filter: Optional[str] = None,
+    prefix_path: Optional[Path] = None,
+    prefix_seconds: Optional[float] = None,
+    silence_seconds: float = 0.0,
+) -> list[str]:
+    """Build one ffmpeg invocation that decodes, filters and resamples to 16 kHz mono s16 WAV.
+
+    *output* is a file path, or ``"-"`` to write the WAV stream to stdout.
+    """
+    source_chain = f"{noise_filter},{_PCM_FORMAT_FILTER}" if noise_filter else _PCM_FORMAT_FILTER
+    cmd = [get_ffmpeg_path(), "-y", "-nostdin", "-hide_banner", "-loglevel", "error"]
+    if prefix_path:
+        prefix_chain = _PCM_FORMAT_FILTER
+        if prefix_seconds and prefix_seconds > 0:
+            prefix_chain = f"atrim=0:{prefix_seconds},{prefix_chain}"
+        cmd += ["-i", str(prefix_path), "-i", str(source_path)]
+        parts = [f"[0:a]{prefix_chain}[a0]", f"[1:a]{source_chain}[a1]"]
+        if silence_seconds and silence_seconds > 0:
+            parts.append(f"anullsrc=r=16000:cl=mono:d={silence_seconds},{_PCM_FORMAT_FILTER}[s]")
+            parts.append("[a0][s][a1]concat=n=3:v=0:a=1[a]")
+        else:
+            parts.append("[a0][a1]concat=n=2:v=0:a=1[a]")
+    else:
+        cmd += ["-i", str(source_path)]
+        parts = [f"[0:a]{source_chain}[a]"]
+    cmd += [
+        "-filter_complex",
+        ";".join(parts),
+        "-map",
+        "[a]",
         "-vn",
+        "-acodec",
+        "pcm_s16le",
+        "-ac",
+        "1",
+        "-ar",
+        "16000",
+        "-f",
+        "wav",
+        output,
     ]
+    return cmd
 
-    def _run(filter_str: Optional[str]):
-        cmd = base_cmd.copy()
-        if filter_str:
-            cmd += ["-af", filter_str]
-        cmd += [
-            "-acodec",
-            "pcm_s16le",
-            "-ac",
-            "1",
-            "-ar",
-            "16000",
-            str(output_path),
-        ]
-        return subprocess.run(cmd, capture_output=True, text=True)
 
-    if progress_callback:
-        progress_callback("Applying noise suppression...", 0)
+def _render_processing_audio(
+    job_id: str,
+    source_path: Path,
+    *,
+    noise_backend: Optional[str] = None,
+    prefix_path: Optional[Path] = None,
+    prefix_seconds: Optional[float] = None,
+    cleanup_paths: Optional[list] = None,
+) -> Tuple[Path, bool]:
+    """Decode, denoise, prefix and resample *source_path* in one ffmpeg pass.
 
-    try:
-        process = _run(noise_filter)
-        if process.returncode != 0:
-            error_output = (process.stderr or process.stdout or "").strip()
-            if resolved_backend == "rnnoise":
-                logger.warning("RNNoise failed for %s: %s", source_path, error_output)
-                process = _run(_build_noise_suppression_filter("afftdn"))
-            if process.returncode != 0:
-                error_output = (process.stderr or process.stdout or "").strip()
-                logger.warning(
-                    "Noise suppression (%s) failed for %s: %s; continuing without denoise",
-                    resolved_backend,
-                    source_path,
-                    error_output,
-                )
-                yield source_path
-                return
+    Returns the rendered 16 kHz WAV and whether the prefix made it into the
+    output. RNNoise falls back to afftdn, then to no denoise, and finally the
+    prefix is dropped before giving up.
+    """
+    temp_dir = Path(tempfile.mkdtemp(prefix=f"xsub_audio_{job_id}_"))
+    if cleanup_paths is not None:
+        cleanup_paths.append(str(temp_dir))
+    output_path = temp_dir / f"{job_id}_processing.wav"
+
+    attempts = [(noise_filter, prefix_path) for noise_filter in _noise_filter_candidates(noise_backend)]
+    if prefix_path:
+        attempts.append((None, None))
+
+    error_output = ""
+    for noise_filter, attempt_prefix in attempts:
+        cmd = _build_audio_graph_command(
+            source_path,
+            output=str(output_path),
+            noise_filter=noise_filter,
+            prefix_path=attempt_prefix,
+            prefix_seconds=prefix_seconds,
+            silence_seconds=_PREFIX_SILENCE_SECONDS,
+        )
+        process = native_cancellation.run(cmd, capture_output=True, text=True)
+        if process.returncode == 0 and output_path.exists():
+            return output_path, bool(attempt_prefix)
+        error_output = (process.stderr or process.stdout or "").strip()
+        logger.warning(
+            "Audio pass failed for %s (filter=%s, prefix=%s): %s",
+            source_path,
+            noise_filter or "none",
+            bool(attempt_prefix),
+            error_output,
+        )
 
-        if not output_path.exists():
-            logger.warning("Noise suppression output missing for %s; continuing without denoise", source_path)
-            yield source_path
-            return
+    logger.error("FFmpeg preprocessing failed for %s: %s", source_path, error_output)
+    raise RuntimeError(
+        f"FFmpeg failed to preprocess {source_path.name}. "
+        "Ensure FFmpeg is installed and the media file is not corrupted."
+    )
 
-        yield output_path
-    finally:
-        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def _needs_transcode(source_path: Path) -> bool:
+    suffix = source_path.suffix.lower()
+    if suffix in _VIDEO_EXTENSIONS or suffix in _ALWAYS_TRANSCODE_AUDIO:
+        return True
+    return not _can_decode_with_soundfile(source_path)
 
 
 def _prepare_audio_for_processing(
@@ -561,15 +794,7 @@ def _prepare_audio_for_processing(
     progress_callback: Optional[Callable[[str, int], None]] = None,
 ) -> Tuple[Path, bool]:
     source_path = Path(file_path).resolve()
-    suffix = source_path.suffix.lower()
-
-    needs_conversion = False
-    if suffix in _VIDEO_EXTENSIONS or suffix in _ALWAYS_TRANSCODE_AUDIO:
-        needs_conversion = True
-    elif not _can_decode_with_soundfile(source_path):
-        needs_conversion = True
-
-    if not needs_conversion:
+    if not _needs_transcode(source_path):
         return source_path, False
 
     uploads_dir = get_uploads_dir()
@@ -587,24 +812,10 @@ def _prepare_audio_for_processing(
     if progress_callback:
         progress_callback("Converting media to supported format...", 7)
 
-    ffmpeg_path = get_ffmpeg_path()
     normalized_path.parent.mkdir(parents=True, exist_ok=True)
 
-    cmd = [
-        ffmpeg_path,
-        "-y",
-        "-i",
-        str(source_path),
-        "-vn",
-        "-acodec",
-        "pcm_s16le",
-        "-ac",
-        "1",
-        "-ar",
-        "16000",
-        str(normalized_path),
-    ]
-    process = subprocess.run(cmd, capture_output=True, text=True)
+    cmd = _build_audio_graph_command(source_path, output=str(normalized_path))
+    process = native_cancellation.run(cmd, capture_output=True, text=True)
 
     if process.returncode != 0:
         error_output = (process.stderr or process.stdout or "").strip()
@@ -625,21 +836,326 @@ def update_job_progress(job_id: str, progress: int, message: str, extra_data: Op
     try:
         from native_job_queue import get_queue
 
-        for queue_name in ["high", "default", "low"]:
+        # Every queue shares the database, job cache and progress bus.
+        get_queue("default").update_job_progress(job_id, progress, message, extra_data)
+        logger.debug("Job %s: %s%% - %s", job_id, progress, message)
+    except Exception as e:
+        logger.error("Failed to update job progress: %s", e)
+
+
+class _PartialResultPublisher:
+    """Collect streamed segments and publish them as ``partial_result`` job meta.
+
+    Each publish is numbered; ``changed_from[v - 1]`` is the first segment that
+    version ``v`` changed, so a poller that holds an earlier version is sent
+    only the segments from there on (see ``partial_result_delta``).
+    """
+
+    def __init__(self, job_id: str, interval: float = _PARTIAL_RESULT_INTERVAL_SECONDS):
+        self.job_id = job_id
+        self.interval = interval
+        self.progress = 10
+        self.message = "Transcribing audio..."
+        self._segments: list[Dict[str, Any]] = []
+        self._starts: list[float] = []
+        self._lock = threading.Lock()
+        self._push_lock = threading.Lock()
+        self._last_push = 0.0
+        self._published: list[Dict[str, Any]] = []
+        self._changed_from: list[int] = []
+
+    def track_progress(self, progress: int, message: str) -> None:
+        self.progress = progress
+        self.message = message
+
+    def add(self, segment: Dict[str, Any]) -> None:
+        with self._lock:
+            # Parallel chunks report out of order; keep the list sorted by start.
+            index = bisect.bisect_right(self._starts, float(segment["start"]))
+            self._starts.insert(index, float(segment["start"]))
+            self._segments.insert(index, dict(segment))
+            now = time.monotonic()
+            if now - self._last_push < self.interval:
+                return
+            self._last_push = now
+            snapshot = list(self._segments)
+        self._push(snapshot)
+
+    def _push(self, segments: list[Dict[str, Any]]) -> None:
+        processed = _postprocess_caption_segments(segments)
+        with self._push_lock:
+            unchanged = 0
+            for old, new in zip(self._published, processed):
+                if old != new:
+                    break
+                unchanged += 1
+            self._published = processed
+            self._changed_from.append(unchanged)
+            # Kept in the job cache only (partial_result is never written to
+            # the database); responses slice it per poller.
+            update_job_progress(self.job_id, self.progress, self.message, {
+                "stage": "transcription",
+                "partial_result": {
+                    "job_id": self.job_id,
+                    "segments": processed,
+                    "segment_count": len(processed),
+                    "partial": True,
+                    "version": len(self._changed_from),
+                    "changed_from": list(self._changed_from),
+                },
+            })
+
+
+def _run_whisper_pass(
+    job_id: str,
+    audio_path: Path,
+    *,
+    model_path: str,
+    language: Optional[str],
+    media_duration: Optional[float],
+    prefix_path: Optional[Path] = None,
+    prefix_duration: float = 0.0,
+    progress_callback: Optional[Callable[[int, str], None]] = None,
+    cleanup_paths: Optional[list] = None,
+    threads: Optional[int] = None,
+    segment_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    stream_noise_filters: Optional[list] = None,
+    prefix_applied: bool = False,
+    prompt: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Transcribe one audio file, applying and trimming the steering prefix.
+
+    When *stream_noise_filters* is a list, *audio_path* is the original media and
+    a single ffmpeg process pipes denoised, prefixed PCM into the engine; each
+    filter in the list is tried in turn if the decoder fails. *prefix_applied*
+    means *audio_path* already starts with the prefix and only needs trimming.
+    """
+    transcribe_path = audio_path
+    prefix_trim_seconds = 0.0
+    if stream_noise_filters is not None or prefix_applied:
+        if prefix_path:
+            prefix_trim_seconds = max(0.0, prefix_duration + _PREFIX_SILENCE_SECONDS)
+    elif prefix_path:
+        prefixed_path = _splice_prefix_audio(
+            job_id=job_id,
+            prefix_path=prefix_path,
+            audio_path=audio_path,
+            silence_seconds=_PREFIX_SILENCE_SECONDS,
+            cleanup_paths=cleanup_paths,
+        ) or _concat_prefix_audio(
+            job_id=job_id,
+            prefix_path=prefix_path,
+            audio_path=audio_path,
+            prefix_seconds=prefix_duration,
+            silence_seconds=_PREFIX_SILENCE_SECONDS,
+            cleanup_paths=cleanup_paths,
+        )
+        if prefixed_path:
+            transcribe_path = prefixed_path
+            prefix_trim_seconds = max(0.0, prefix_duration + _PREFIX_SILENCE_SECONDS)
+
+    def on_segment(segment: Dict[str, Any]) -> None:
+        start = float(segment.get("start", 0.0)) - prefix_trim_seconds
+        end = float(segment.get("end", 0.0)) - prefix_trim_seconds
+        if end - max(0.0, start) < _PREFIX_TRIM_MIN_DURATION:
+            return
+        segment_callback({**segment, "start": max(0.0, start), "end": end})
+
+    pipe_cmds: list = [None]
+    if stream_noise_filters is not None:
+        pipe_cmds = [
+            _build_audio_graph_command(
+                audio_path,
+                output="-",
+                noise_filter=noise_filter,
+                prefix_path=prefix_path,
+                prefix_seconds=prefix_duration,
+                silence_seconds=_PREFIX_SILENCE_SECONDS,
+            )
+            for noise_filter in (stream_noise_filters or [None])
+        ]
+
+    output_dir_path = Path(tempfile.mkdtemp())
+    try:
+        for attempt, pipe_cmd in enumerate(pipe_cmds):
             try:
-                queue = get_queue(queue_name)
-                queue.update_job_meta(job_id, {
-                    "progress": progress,
-                    "message": message,
-                    **(extra_data or {}),
+                transcription = transcribe_whisper_cpp(
+                    Path(transcribe_path),
+                    model_path=model_path,
+                    language=language,
+                    output_dir=output_dir_path,
+                    progress_callback=progress_callback,
+                    threads=threads,
+                    segment_callback=on_segment if segment_callback else None,
+                    audio_pipe_cmd=pipe_cmd,
+                    prompt=prompt,
+                )
+                break
+            except RuntimeError as exc:
+                if attempt + 1 >= len(pipe_cmds) or "Audio decoder failed" not in str(exc):
+                    raise
+                logger.warning("Streaming decode failed for %s; retrying with fallback filter: %s", audio_path, exc)
+    finally:
+        shutil.rmtree(output_dir_path, ignore_errors=True)
+
+    raw_segments = transcription.get("segments") or []
+    segments = [
+        {
+            "id": idx,
+            "start": float(segment.get("start", 0.0)),
+            "end": float(segment.get("end", 0.0)),
+            "text": str(segment.get("text", "")).strip(),
+            "words": segment.get("words", []),
+        }
+        for idx, segment in enumerate(raw_segments)
+    ]
+    duration = transcription.get("duration")
+    effective_prefix_trim = prefix_trim_seconds
+    if not prefix_trim_seconds and isinstance(duration, (int, float)) and media_duration is not None:
+        inferred_prefix = max(0.0, float(duration) - float(media_duration))
+        if inferred_prefix > 0.5:
+            effective_prefix_trim = inferred_prefix
+    if effective_prefix_trim and isinstance(duration, (int, float)):
+        duration = max(0.0, float(duration) - effective_prefix_trim)
+
+    if effective_prefix_trim:
+        trimmed_segments = _trim_prefixed_segments(segments, effective_prefix_trim, strict=True)
+        if not trimmed_segments and segments:
+            logger.warning(
+                "Prefix trim removed all segments (%.2fs); retrying with lenient trim.",
+                effective_prefix_trim,
+            )
+            trimmed_segments = _trim_prefixed_segments(segments, effective_prefix_trim, strict=False)
+        segments = _recover_first_segment_after_prefix(segments, trimmed_segments, effective_prefix_trim)
+
+    return {
+        "segments": segments,
+        "text": transcription.get("text", "").strip(),
+        "language": transcription.get("language"),
+        "duration": duration,
+        "prefix_trim": effective_prefix_trim,
+    }
+
+
+def _run_chunked_whisper(
+    job_id: str,
+    audio_path: Path,
+    *,
+    media_duration: float,
+    progress_callback: Optional[Callable[[int, str], None]] = None,
+    segment_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    **pass_kwargs: Any,
+) -> Optional[Dict[str, Any]]:
+    """Split long audio at quiet points and transcribe the chunks concurrently.
+
+    The chunk plan and every finished chunk are checkpointed, so a resumed job
+    only transcribes the chunks it had not finished.
+    """
+    engines, threads, target_seconds = native_chunking.plan_parallelism(
+        media_duration,
+        cpu_count=native_resources.job_cores(job_id),
+    )
+    saved_plan = native_checkpoints.load(job_id, "chunk_plan")
+    if saved_plan and abs(float(saved_plan.get("duration") or 0.0) - media_duration) < 0.5:
+        chunks = [
+            native_chunking.AudioChunk(index, float(start), float(end))
+            for index, (start, end) in enumerate(saved_plan["chunks"])
+        ]
+    else:
+        chunks = native_chunking.find_chunks(audio_path, target_seconds)
+        if len(chunks) >= 2:
+            native_checkpoints.save(job_id, "chunk_plan", {
+                "duration": media_duration,
+                "chunks": [[chunk.start, chunk.end] for chunk in chunks],
+            })
+    if len(chunks) < 2:
+        return None
+    finished_chunks = native_checkpoints.load_prefixed(job_id, "chunk:")
+
+    logger.info(
+        "Job %s: transcribing %s chunks on %s engines x %s threads",
+        job_id,
+        len(chunks),
+        engines,
+        threads,
+    )
+    temp_dir = Path(tempfile.mkdtemp(prefix=f"xsub_chunks_{job_id}_"))
+    chunk_progress = [0] * len(chunks)
+    progress_lock = threading.Lock()
+    token = native_cancellation.current()
+
+    def run_chunk(chunk: native_chunking.AudioChunk) -> Dict[str, Any]:
+        with native_cancellation.bind(token):
+            native_cancellation.check()
+            return transcribe_chunk(chunk)
+
+    def transcribe_chunk(chunk: native_chunking.AudioChunk) -> Dict[str, Any]:
+        def chunk_update(percent: int, message: str) -> None:
+            with progress_lock:
+                try:
+                    chunk_progress[chunk.index] = max(chunk_progress[chunk.index], int(percent))
+                except (TypeError, ValueError):
+                    return
+                overall = sum(chunk_progress) // len(chunk_progress)
+                done = sum(1 for value in chunk_progress if value >= 90)
+            if progress_callback:
+                progress_callback(overall, f"Transcribing audio ({done}/{len(chunks)} parts)...")
+
+        def chunk_segment(segment: Dict[str, Any]) -> None:
+            if segment_callback:
+                segment_callback({
+                    **segment,
+                    "start": float(segment["start"]) + chunk.start,
+                    "end": min(float(segment["end"]) + chunk.start, chunk.end),
                 })
-                logger.info("Job %s: %s%% - %s", job_id, progress, message)
-                return
-            except Exception:
-                continue
 
-    except Exception as e:
-        logger.error("Failed to update job progress: %s", e)
+        saved = finished_chunks.get(f"chunk:{chunk.index}")
+        if saved is not None:
+            for segment in saved.get("segments") or []:
+                chunk_segment(segment)
+            chunk_update(100, "")
+            return saved
+
+        chunk_path = native_chunking.write_chunk(
+            audio_path,
+            chunk,
+            temp_dir / f"{job_id}_chunk{chunk.index:04d}.wav",
+        )
+
+        try:
+            result = _run_whisper_pass(
+                job_id,
+                chunk_path,
+                media_duration=chunk.duration,
+                progress_callback=chunk_update,
+                threads=threads,
+                segment_callback=chunk_segment,
+                **pass_kwargs,
+            )
+            native_checkpoints.save(job_id, f"chunk:{chunk.index}", result)
+            return result
+        finally:
+            with contextlib.suppress(OSError):
+                chunk_path.unlink()
+
+    try:
+        with ThreadPoolExecutor(max_workers=engines, thread_name_prefix=f"whisper-{job_id[:8]}") as executor:
+            results = list(executor.map(run_chunk, chunks))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    segments = native_chunking.stitch_segments(chunks, [result["segments"] for result in results])
+    detected_language = next(
+        (result.get("language") for result in results if result.get("language") not in {None, "", "auto"}),
+        None,
+    )
+    return {
+        "segments": segments,
+        "text": " ".join(seg["text"] for seg in segments if seg.get("text")).strip(),
+        "language": detected_language,
+        "duration": media_duration,
+        "prefix_trim": max((result.get("prefix_trim") or 0.0) for result in results),
+    }
 
 
 def _format_timestamp(seconds: float) -> str:
@@ -648,7 +1164,384 @@ def _format_timestamp(seconds: float) -> str:
     return f"{minutes}:{secs:02d}"
 
 
-def process_transcription_job(
+@dataclass
+class _TranscriptionRun:
+    """Inputs and intermediate results shared by the stages of one transcription."""
+
+    job_id: str
+    file_path: str
+    model_path: str
+    language: str
+    chinese_style: Optional[str]
+    second_caption_language: Optional[str]
+    vad_filter: bool
+    noise_suppression: Optional[str]
+    steering_mode: Optional[str]
+    prepared_audio_path: Optional[str]
+    audio_was_transcoded: Optional[bool]
+    original_audio_path: Optional[str]
+    media_path: Optional[str]
+    media_kind: Optional[str]
+    send_completion: bool
+    cleanup_paths: list
+    stream_audio: bool
+    start_time: float = field(default_factory=time.time)
+    prefix_path: Optional[Path] = None
+    prefix_duration: float = 0.0
+    steering_prompt: Optional[str] = None
+    source_path: Optional[Path] = None
+    was_transcoded: bool = False
+    media_duration: Optional[float] = None
+    job_cores: int = 1
+    use_chunks: bool = False
+    prefix_applied: bool = False
+    prepared_path: Optional[Path] = None
+    inference_path: Optional[Path] = None
+    inference_duration: Optional[float] = None
+    speech_spans: Optional[list] = None
+    model_label: str = "Whisper.cpp"
+    transcription: Optional[Dict[str, Any]] = None
+    result: Optional[Dict[str, Any]] = None
+    # Set once finalize has written the transcript into the job record.
+    transcript_stored: bool = False
+
+
+def _stage_resolve_prefix(run: _TranscriptionRun) -> None:
+    """Pick the steering prefix (clip or prompt) and decode the clip once."""
+    prefix_path = None
+    prefix_label = None
+    prefix_kind = None
+    if _should_apply_english_translate_prefix(run.language, run.second_caption_language):
+        prefix_kind = "english_translate"
+        prefix_label = "English translate"
+    elif _should_apply_cantonese_prefix(run.language, run.chinese_style, run.second_caption_language):
+        prefix_kind = (run.chinese_style or "written").strip().lower()
+        prefix_label = "Cantonese"
+
+    if prefix_kind and _steering_mode(run.steering_mode) == "prompt":
+        run.steering_prompt = _resolve_steering_prompt(prefix_kind)
+        if run.steering_prompt:
+            prefix_kind = None
+    if prefix_kind == "english_translate":
+        prefix_path = _resolve_english_translate_prefix_path()
+    elif prefix_kind:
+        prefix_path = _resolve_prefix_path(prefix_kind)
+
+    prefix_audio = None
+    if prefix_path and prefix_path.exists():
+        update_job_progress(run.job_id, 8, f"Applying {prefix_label} prefix...", {"stage": "preprocessing"})
+        prefix_audio = _load_prefix_audio(prefix_path)
+    if prefix_audio is not None:
+        # Use the decoded copy so later passes never touch the original mp3.
+        run.prefix_path = prefix_audio.wav_path
+        run.prefix_duration = prefix_audio.duration
+    else:
+        if prefix_label and not run.steering_prompt:
+            logger.warning("%s prefix audio not available; skipping prefix merge.", prefix_label)
+        run.prefix_path = None
+
+
+def _stage_probe_media(run: _TranscriptionRun) -> None:
+    run.source_path = Path(run.prepared_audio_path) if run.prepared_audio_path else Path(run.file_path)
+    if run.prepared_audio_path:
+        run.was_transcoded = bool(run.audio_was_transcoded)
+
+    try:
+        media_duration = get_audio_duration(str(run.source_path))
+        run.media_duration = media_duration if media_duration and media_duration > 0 else None
+    except Exception:
+        run.media_duration = None
+
+
+def _stage_render_audio(run: _TranscriptionRun) -> None:
+    """Transcode, denoise and (when transcribed as-is) prefix the audio in one ffmpeg pass."""
+    noise_backend = _noise_suppression_backend(run.noise_suppression)
+    # Engine threads come out of this job's share of the machine.
+    run.job_cores = native_resources.job_cores(run.job_id)
+    run.use_chunks = not run.stream_audio and native_chunking.should_chunk(run.media_duration, cpu_count=run.job_cores)
+    use_vad = bool(run.vad_filter) and not run.stream_audio
+    # Chunks and VAD-compacted audio get the prefix spliced on later, so only
+    # bake it in when the rendered file is transcribed as-is.
+    render_prefix = None if (run.use_chunks or use_vad) else run.prefix_path
+    saved_audio = None if run.stream_audio else native_checkpoints.load(run.job_id, "audio")
+    if run.stream_audio:
+        # ffmpeg decodes straight into the engine; nothing is written to disk.
+        run.prepared_path = Path(run.file_path)
+    elif saved_audio and Path(saved_audio["path"]).exists():
+        # Resuming: the audio was already rendered before the interruption.
+        update_job_progress(run.job_id, 9, "Resuming with prepared audio...", {"stage": "preprocessing"})
+        run.prepared_path = Path(saved_audio["path"])
+        run.prefix_applied = bool(saved_audio.get("prefix_applied"))
+        run.was_transcoded = run.was_transcoded or bool(saved_audio.get("was_transcoded"))
+    else:
+        update_job_progress(run.job_id, 6, "Verifying audio format...", {"stage": "transcription"})
+        needs_transcode = _needs_transcode(run.source_path)
+        if noise_backend == "none" and not render_prefix and not needs_transcode:
+            run.prepared_path = run.source_path
+        else:
+            update_job_progress(run.job_id, 9, "Preparing audio...", {"stage": "preprocessing"})
+            rendered_path, run.prefix_applied = _render_processing_audio(
+                run.job_id,
+                run.source_path,
+                noise_backend=noise_backend,
+                prefix_path=render_prefix,
+                prefix_seconds=run.prefix_duration,
+                cleanup_paths=run.cleanup_paths,
+            )
+            run.was_transcoded = run.was_transcoded or needs_transcode
+            run.prepared_path = native_checkpoints.keep_file(run.job_id, rendered_path)
+            native_checkpoints.save(run.job_id, "audio", {
+                "path": str(run.prepared_path),
+                "prefix_applied": run.prefix_applied,
+                "was_transcoded": run.was_transcoded,
+            })
+    native_cancellation.check()
+    run.inference_path = run.prepared_path
+    run.inference_duration = run.media_duration
+
+
+def _stage_detect_speech(run: _TranscriptionRun) -> None:
+    """VAD pre-pass; cheap next to decoding, so it runs with the preparation stages."""
+    if not (run.vad_filter and not run.stream_audio and _can_decode_with_soundfile(Path(run.inference_path))):
+        return
+    update_job_progress(run.job_id, 9, "Detecting speech...", {"stage": "preprocessing"})
+    try:
+        speech_spans = native_vad.detect_speech(Path(run.inference_path))
+        if speech_spans:
+            vad_dir = Path(tempfile.mkdtemp(prefix=f"xsub_vad_{run.job_id}_"))
+            run.cleanup_paths.append(str(vad_dir))
+            run.inference_path = native_vad.write_compacted(
+                Path(run.prepared_path),
+                speech_spans,
+                vad_dir / f"{run.job_id}_speech.wav",
+            )
+            run.speech_spans = speech_spans
+            run.inference_duration = speech_spans[-1].offset + speech_spans[-1].duration
+            logger.info(
+                "VAD kept %.1fs of %.1fs for job %s",
+                run.inference_duration,
+                run.media_duration or 0.0,
+                run.job_id,
+            )
+            run.use_chunks = native_chunking.should_chunk(run.inference_duration, cpu_count=run.job_cores)
+    except native_cancellation.JobCanceled:
+        raise
+    except Exception as vad_error:
+        logger.warning("VAD pre-pass failed for %s; transcribing full audio: %s", run.job_id, vad_error)
+        run.speech_spans = None
+        run.inference_path = run.prepared_path
+        run.inference_duration = run.media_duration
+
+
+def _stage_transcribe(run: _TranscriptionRun) -> None:
+    job_id = run.job_id
+    speech_spans = run.speech_spans
+    model_candidate = resolve_whisper_model(run.model_path)
+    if model_candidate:
+        run.model_label = f"Whisper.cpp ({model_candidate.name})"
+
+    partial_publisher = _PartialResultPublisher(job_id)
+
+    def whisper_progress(percent: int, message: str) -> None:
+        try:
+            numeric = int(percent)
+        except (TypeError, ValueError):
+            numeric = 0
+        capped = max(10, min(numeric, 95))
+        partial_publisher.track_progress(capped, message)
+        update_job_progress(job_id, capped, message, {"stage": "transcription"})
+
+    def publish_segment(segment: Dict[str, Any]) -> None:
+        if speech_spans:
+            segment = native_vad.remap_segment(speech_spans, segment)
+        partial_publisher.add(segment)
+
+    language_for_whisper = run.language
+    if run.second_caption_language:
+        language_for_whisper = (run.second_caption_language or "").strip().lower() or language_for_whisper
+
+    pass_kwargs = {
+        "model_path": run.model_path,
+        "language": language_for_whisper,
+        "prefix_path": run.prefix_path,
+        "prefix_duration": run.prefix_duration,
+        "cleanup_paths": run.cleanup_paths,
+        "segment_callback": publish_segment,
+        "prompt": run.steering_prompt,
+    }
+    if run.stream_audio:
+        pass_kwargs["stream_noise_filters"] = _noise_filter_candidates(run.noise_suppression)
+    native_cancellation.check()
+    update_job_progress(job_id, 10, "Running Whisper transcription...", {"stage": "transcription"})
+    transcription = None
+    if run.use_chunks and _can_decode_with_soundfile(Path(run.inference_path)):
+        try:
+            transcription = _run_chunked_whisper(
+                job_id,
+                Path(run.inference_path),
+                media_duration=float(run.inference_duration or 0.0),
+                progress_callback=whisper_progress,
+                **pass_kwargs,
+            )
+        except native_cancellation.JobCanceled:
+            raise
+        except Exception as chunk_error:
+            logger.warning("Chunked transcription failed for %s; running single pass: %s", job_id, chunk_error)
+            transcription = None
+    if transcription is None:
+        transcription = _run_whisper_pass(
+            job_id,
+            Path(run.inference_path),
+            media_duration=run.inference_duration,
+            progress_callback=whisper_progress,
+            prefix_applied=run.prefix_applied,
+            threads=run.job_cores,
+            **pass_kwargs,
+        )
+    if speech_spans:
+        transcription["segments"] = native_vad.remap_segments(speech_spans, transcription["segments"])
+        transcription["duration"] = run.media_duration
+    run.transcription = transcription
+
+
+def _stage_finalize(run: _TranscriptionRun) -> None:
+    """Clean up the segments, build the result and write the job record."""
+    job_id = run.job_id
+    file_path = run.file_path
+    media_path = run.media_path
+    transcription = run.transcription
+    media_duration = run.media_duration
+    device_label = "cpu"
+
+    segments = transcription["segments"]
+    full_text = transcription.get("text", "").strip()
+    detected_language = transcription.get("language") or (run.language or "auto")
+    duration = transcription.get("duration")
+    effective_prefix_trim = transcription.get("prefix_trim") or 0.0
+    effective_duration: Optional[float] = None
+    if isinstance(duration, (int, float)):
+        effective_duration = float(duration)
+    if media_duration is not None:
+        effective_duration = media_duration
+
+    if not segments and full_text:
+        if effective_prefix_trim:
+            full_text = ""
+        else:
+            segments = [
+                {
+                    "id": 0,
+                    "start": 0.0,
+                    "end": round(float(effective_duration) if effective_duration else 0.0, 2),
+                    "text": full_text,
+                    "words": [],
+                }
+            ]
+
+    segments = _postprocess_caption_segments(segments)
+    full_text = " ".join([seg.get("text", "") for seg in segments if seg.get("text")]).strip()
+
+    if not segments and not full_text:
+        update_job_progress(job_id, 100, "No transcription generated", {
+            "stage": "transcription",
+            "partial_result": None,
+        })
+        result = {
+            "job_id": job_id,
+            "status": "completed",
+            "file_path": file_path,
+            "segments": [],
+            "text": "",
+            "language": detected_language or "auto",
+            "transcription_time": round(time.time() - run.start_time, 2),
+            "model": run.model_label,
+            "device": device_label,
+            "audio_was_transcoded": run.was_transcoded,
+            "normalized_audio_path": str(run.prepared_path),
+            "segment_count": 0,
+        }
+        if run.original_audio_path:
+            result["original_audio_path"] = str(run.original_audio_path)
+        run.result = result
+        return
+
+    transcription_time = time.time() - run.start_time
+    result = {
+        "job_id": job_id,
+        "status": "completed",
+        "file_path": media_path or file_path,
+        "segments": segments,
+        "text": full_text,
+        "language": detected_language or "auto",
+        "transcription_time": round(transcription_time, 2),
+        "model": run.model_label,
+        "device": device_label,
+        "segment_count": len(segments),
+    }
+    if effective_duration is not None:
+        try:
+            result["audio_duration"] = round(float(effective_duration), 2)
+        except Exception:
+            pass
+
+    try:
+        existing_record = native_history.get_job_record(job_id, include_transcript=False)
+        display_name = existing_record.get("display_name") if existing_record else None
+        if not display_name:
+            display_name = Path(media_path or file_path).stem
+        native_history.upsert_job_record({
+            "job_id": job_id,
+            "filename": Path(media_path or file_path).name,
+            "display_name": display_name,
+            "media_path": media_path or file_path,
+            "media_kind": run.media_kind,
+            "status": "completed",
+            "language": detected_language or "auto",
+            "device": device_label,
+            "summary": full_text[:500],
+            "transcript_json": result,
+            "transcript_text": full_text,
+            "segment_count": len(segments),
+            "duration": result.get("audio_duration"),
+        })
+        run.transcript_stored = True
+    except Exception as history_error:
+        logger.warning("Failed to store job record %s: %s", job_id, history_error)
+
+    if run.send_completion:
+        update_job_progress(job_id, 100, "Transcription completed successfully", {
+            "result": result,
+            "partial_result": None,
+            "stage": "completed",
+        })
+        time.sleep(0.1)
+    else:
+        update_job_progress(job_id, 100, "Transcription completed", {
+            "result": result,
+            "partial_result": None,
+            "stage": "transcription_complete",
+        })
+    run.result = result
+
+
+# Preparation runs on the shared I/O pool so it overlaps other jobs' inference;
+# only the decode itself holds one of the scheduler's inference slots.
+_TRANSCRIPTION_STAGES = (
+    Stage("prefix", _stage_resolve_prefix),
+    Stage("probe", _stage_probe_media),
+    Stage("render", _stage_render_audio, after=("prefix", "probe")),
+    Stage("vad", _stage_detect_speech, after=("render",)),
+    Stage("transcribe", _stage_transcribe, pool=STAGE_CPU, after=("vad",)),
+    Stage("finalize", _stage_finalize, after=("transcribe",)),
+)
+
+
+def process_transcription_job(job_id: str, file_path: str, **options: Any) -> Dict[str, Any]:
+    """Process audio transcription job using the selected backend; returns its result."""
+    return _transcribe(job_id, file_path, **options).result
+
+
+def _transcribe(
     job_id: str,
     file_path: str,
     model_path: str = "whisper",
@@ -662,242 +1555,63 @@ def process_transcription_job(
     output_dir: Optional[str] = None,
     send_completion: bool = True,
     prepared_audio_path: Optional[str] = None,
-    inference_audio_path: Optional[str] = None,
     audio_was_transcoded: Optional[bool] = None,
     original_audio_path: Optional[str] = None,
     cleanup_paths: Optional[list] = None,
     media_path: Optional[str] = None,
     media_kind: Optional[str] = None,
-) -> Dict[str, Any]:
-    """Process audio transcription job using the selected backend."""
-    prepared_audio_path_obj: Optional[Path] = None
-    was_transcoded = False
+    noise_suppression: Optional[str] = None,
+    steering_mode: Optional[str] = None,
+) -> _TranscriptionRun:
+    """Run a transcription and return its finished run.
+
+    Transcoding, noise suppression and the steering prefix are applied in a
+    single ffmpeg pass (or streamed straight into the engine when enabled).
+    The work runs as the stage graph in ``_TRANSCRIPTION_STAGES``.
+    """
+    transcoded_upload: Optional[Path] = None
     if cleanup_paths is None:
         cleanup_paths = []
+    stream_audio = _streams_audio(prepared_audio_path)
+    if stream_audio and vad_filter:
+        # VAD needs the decoded file; streamed audio never lands on disk.
+        logger.info("Audio streaming is on; skipping VAD for job %s", job_id)
+        vad_filter = False
+    if prepared_audio_path and audio_was_transcoded:
+        transcoded_upload = Path(prepared_audio_path)
+    run = _TranscriptionRun(
+        job_id=job_id,
+        file_path=file_path,
+        model_path=model_path,
+        language=language,
+        chinese_style=chinese_style,
+        second_caption_language=second_caption_language,
+        vad_filter=vad_filter,
+        noise_suppression=noise_suppression,
+        steering_mode=steering_mode,
+        prepared_audio_path=prepared_audio_path,
+        audio_was_transcoded=audio_was_transcoded,
+        original_audio_path=original_audio_path,
+        media_path=media_path,
+        media_kind=media_kind,
+        send_completion=send_completion,
+        cleanup_paths=cleanup_paths,
+        stream_audio=stream_audio,
+    )
     try:
-        start_time = time.time()
         update_job_progress(job_id, 0, "Starting transcription...", {"stage": "transcription"})
 
-        output_dir_path = Path(tempfile.mkdtemp())
-
         update_job_progress(job_id, 5, "Preparing Whisper.cpp pipeline...", {"stage": "transcription"})
 
-        if prepared_audio_path:
-            prepared_audio_path_obj = Path(prepared_audio_path)
-            was_transcoded = bool(audio_was_transcoded)
-        else:
-            update_job_progress(job_id, 6, "Verifying audio format...", {"stage": "transcription"})
-
-            def preprocessing_update(message: str, approx_progress: int) -> None:
-                update_job_progress(job_id, approx_progress, message, {"stage": "transcription"})
-
-            prepared_audio_path_obj, was_transcoded = _prepare_audio_for_processing(
-                job_id,
-                file_path,
-                preprocessing_update,
-            )
-
-        inference_path_obj = prepared_audio_path_obj
-        if inference_audio_path:
-            candidate = Path(inference_audio_path)
-            if candidate.exists():
-                inference_path_obj = candidate
-
-        transcribe_path_obj = inference_path_obj
-        prefix_trim_seconds = 0.0
-        prefix_path = None
-        prefix_label = None
-        if _should_apply_english_translate_prefix(language, second_caption_language):
-            prefix_path = _resolve_english_translate_prefix_path()
-            prefix_label = "English translate"
-        elif _should_apply_cantonese_prefix(language, chinese_style, second_caption_language):
-            prefix_path = _resolve_prefix_path(chinese_style if chinese_style else "written")
-            prefix_label = "Cantonese"
-
-        if prefix_path and prefix_path.exists():
-            update_job_progress(job_id, 8, f"Applying {prefix_label} prefix...", {"stage": "preprocessing"})
-            prefix_duration = get_audio_duration(str(prefix_path))
-            if not prefix_duration or prefix_duration <= 0:
-                prefix_duration = _DEFAULT_PREFIX_SECONDS
-            else:
-                prefix_duration = min(prefix_duration, _DEFAULT_PREFIX_SECONDS)
-            prefixed_path = _concat_prefix_audio(
-                job_id=job_id,
-                prefix_path=prefix_path,
-                audio_path=inference_path_obj,
-                prefix_seconds=prefix_duration,
-                silence_seconds=_PREFIX_SILENCE_SECONDS,
-                cleanup_paths=cleanup_paths,
-            )
-            if prefixed_path:
-                transcribe_path_obj = prefixed_path
-                prefix_trim_seconds = max(0.0, prefix_duration + _PREFIX_SILENCE_SECONDS)
-        elif prefix_label:
-            logger.warning("%s prefix audio not available; skipping prefix merge.", prefix_label)
-
-        model_label = "Whisper.cpp"
-        model_candidate = resolve_whisper_model(model_path)
-        if model_candidate:
-            model_label = f"Whisper.cpp ({model_candidate.name})"
-
-        def whisper_progress(percent: int, message: str) -> None:
-            try:
-                numeric = int(percent)
-            except (TypeError, ValueError):
-                numeric = 0
-            capped = max(10, min(numeric, 95))
-            update_job_progress(job_id, capped, message, {"stage": "transcription"})
-
-        language_for_whisper = language
-        if second_caption_language:
-            language_for_whisper = (second_caption_language or "").strip().lower() or language_for_whisper
-
-        update_job_progress(job_id, 10, "Running Whisper transcription...", {"stage": "transcription"})
-        transcription = transcribe_whisper_cpp(
-            Path(transcribe_path_obj),
-            model_path=model_path,
-            language=language_for_whisper,
-            output_dir=output_dir_path,
-            progress_callback=whisper_progress,
-        )
-        device_label = "cpu"
-
-        raw_segments = transcription.get("segments") or []
-        media_duration: Optional[float] = None
-        try:
-            media_duration = get_audio_duration(str(inference_path_obj))
-            if not media_duration or media_duration <= 0:
-                media_duration = None
-        except Exception:
-            media_duration = None
-        segments = [
-            {
-                "id": idx,
-                "start": float(segment.get("start", 0.0)),
-                "end": float(segment.get("end", 0.0)),
-                "text": str(segment.get("text", "")).strip(),
-                "words": segment.get("words", []),
-            }
-            for idx, segment in enumerate(raw_segments)
-        ]
-        full_text = transcription.get("text", "").strip()
-        detected_language = transcription.get("language") or (language or "auto")
-        duration = transcription.get("duration")
-        effective_prefix_trim = prefix_trim_seconds
-        if not prefix_trim_seconds and isinstance(duration, (int, float)) and media_duration is not None:
-            inferred_prefix = max(0.0, float(duration) - float(media_duration))
-            if inferred_prefix > 0.5:
-                effective_prefix_trim = inferred_prefix
-        if effective_prefix_trim and isinstance(duration, (int, float)):
-            duration = max(0.0, float(duration) - effective_prefix_trim)
-        effective_duration: Optional[float] = None
-        if isinstance(duration, (int, float)):
-            effective_duration = float(duration)
-        if media_duration is not None:
-            effective_duration = media_duration
-
-        if effective_prefix_trim:
-            trimmed_segments = _trim_prefixed_segments(segments, effective_prefix_trim, strict=True)
-            if not trimmed_segments and segments:
-                logger.warning(
-                    "Prefix trim removed all segments (%.2fs); retrying with lenient trim.",
-                    effective_prefix_trim,
-                )
-                trimmed_segments = _trim_prefixed_segments(segments, effective_prefix_trim, strict=False)
-            segments = _recover_first_segment_after_prefix(segments, trimmed_segments, effective_prefix_trim)
-
-        if not segments and full_text:
-            if effective_prefix_trim:
-                full_text = ""
-            else:
-                segments = [
-                    {
-                        "id": 0,
-                        "start": 0.0,
-                        "end": round(float(effective_duration) if effective_duration else 0.0, 2),
-                        "text": full_text,
-                        "words": [],
-                    }
-                ]
-
-        segments = _postprocess_caption_segments(segments)
-        full_text = " ".join([seg.get("text", "") for seg in segments if seg.get("text")]).strip()
-
-        if not segments and not full_text:
-            update_job_progress(job_id, 100, "No transcription generated", {"stage": "transcription"})
-            result = {
-                "job_id": job_id,
-                "status": "completed",
-                "file_path": file_path,
-                "segments": [],
-                "text": "",
-                "language": detected_language or "auto",
-                "transcription_time": round(time.time() - start_time, 2),
-                "model": model_label,
-                "device": device_label,
-                "audio_was_transcoded": was_transcoded,
-                "normalized_audio_path": str(prepared_audio_path_obj),
-                "segment_count": 0,
-            }
-            if original_audio_path:
-                result["original_audio_path"] = str(original_audio_path)
-            return result
-
-        transcription_time = time.time() - start_time
-        result = {
-            "job_id": job_id,
-            "status": "completed",
-            "file_path": media_path or file_path,
-            "segments": segments,
-            "text": full_text,
-            "language": detected_language or "auto",
-            "transcription_time": round(transcription_time, 2),
-            "model": model_label,
-            "device": device_label,
-            "segment_count": len(segments),
-        }
-        if effective_duration is not None:
-            try:
-                result["audio_duration"] = round(float(effective_duration), 2)
-            except Exception:
-                pass
-
-        try:
-            existing_record = native_history.get_job_record(job_id)
-            display_name = existing_record.get("display_name") if existing_record else None
-            if not display_name:
-                display_name = Path(media_path or file_path).stem
-            native_history.upsert_job_record({
-                "job_id": job_id,
-                "filename": Path(media_path or file_path).name,
-                "display_name": display_name,
-                "media_path": media_path or file_path,
-                "media_kind": media_kind,
-                "status": "completed",
-                "language": detected_language or "auto",
-                "device": device_label,
-                "summary": full_text[:500],
-                "transcript_json": result,
-                "transcript_text": full_text,
-                "segment_count": len(segments),
-                "duration": result.get("audio_duration"),
-            })
-        except Exception as history_error:
-            logger.warning("Failed to store job record %s: %s", job_id, history_error)
-
-        if send_completion:
-            update_job_progress(job_id, 100, "Transcription completed successfully", {
-                "result": result,
-                "stage": "completed",
-            })
-            time.sleep(0.1)
-        else:
-            update_job_progress(job_id, 100, "Transcription completed", {
-                "result": result,
-                "stage": "transcription_complete",
-            })
-
-        return result
+        run_stages(job_id, list(_TRANSCRIPTION_STAGES), run)
+        return run
+    except native_cancellation.JobCanceled:
+        logger.info("Transcription job %s canceled", job_id)
+        update_job_progress(job_id, 0, "Job was manually terminated", {
+            "stage": "canceled",
+            "partial_result": None,
+        })
+        raise
     except Exception as e:
         logger.error("Transcription job %s failed: %s", job_id, e)
         logger.error(traceback.format_exc())
@@ -907,8 +1621,6 @@ def process_transcription_job(
         })
         raise
     finally:
-        with contextlib.suppress(Exception):
-            shutil.rmtree(output_dir_path, ignore_errors=True)
         if cleanup_paths:
             for path in cleanup_paths:
                 with contextlib.suppress(Exception):
@@ -918,15 +1630,42 @@ def process_transcription_job(
                     else:
                         target.unlink()
         try:
-            if was_transcoded and prepared_audio_path_obj:
+            if transcoded_upload:
                 uploads_dir = get_uploads_dir().resolve()
-                prepared_path = Path(prepared_audio_path_obj).resolve()
+                prepared_path = transcoded_upload.resolve()
                 if uploads_dir in prepared_path.parents:
                     prepared_path.unlink(missing_ok=True)
         except Exception:
             pass
 
 
+def _restore_cached_result(
+    job_id: str,
+    cached_result: Dict[str, Any],
+    *,
+    file_path: str,
+    original_audio_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Turn a cached transcription into this job's result without decoding again."""
+    update_job_progress(job_id, 50, "Reusing previous transcription...", {"stage": "transcription"})
+    result = dict(cached_result)
+    result.update({
+        "job_id": job_id,
+        "status": "completed",
+        "file_path": file_path,
+        "transcription_time": 0.0,
+        "cached": True,
+    })
+    if original_audio_path:
+        result["original_audio_path"] = str(original_audio_path)
+    update_job_progress(job_id, 95, "Transcription completed", {
+        "result": result,
+        "partial_result": None,
+        "stage": "transcription_complete",
+    })
+    return result
+
+
 def process_full_pipeline_job(
     job_id: str,
     file_path: str,
@@ -948,45 +1687,67 @@ def process_full_pipeline_job(
     cleanup_paths: Optional[list] = None,
     media_path: Optional[str] = None,
     media_kind: Optional[str] = None,
+    media_hash: Optional[str] = None,
+    steering_mode: Optional[str] = None,
 ) -> Dict[str, Any]:
     """Process transcription pipeline with optional noise suppression."""
     reference_name = original_filename or (original_audio_path and Path(original_audio_path).name) or Path(file_path).name
     try:
-        processing_source = Path(prepared_audio_path or file_path)
-
-        def noise_update(message: str, approx_progress: int) -> None:
-            update_job_progress(job_id, approx_progress, message, {"stage": "preprocessing"})
-
-        with _noise_suppressed_audio(
-            processing_source,
-            job_id=job_id,
-            backend=noise_suppression,
-            progress_callback=noise_update,
-        ) as processing_audio:
-            processing_audio_path = Path(processing_audio).resolve()
-            inference_audio_path = None
-            if processing_audio_path != processing_source.resolve():
-                inference_audio_path = str(processing_audio_path)
-            transcription_result = process_transcription_job(
-                job_id=job_id,
-                file_path=file_path,
+        cache_key = None
+        try:
+            if not media_hash:
+                # Submission only fingerprints the media; read the full hash on
+                # this worker thread (a concurrent job on the same file shares it).
+                media_hash = native_fingerprint.sha256(media_path or file_path)
+            cache_key = native_result_cache.build_cache_key(
+                media_hash=media_hash,
                 model_path=model_path,
                 language=language,
-                chinese_style=chinese_style,
                 second_caption_language=second_caption_language,
-                device=device,
-                compute_type=compute_type,
-                vad_filter=vad_filter,
-                batch_size=8,
-                send_completion=False,
-                prepared_audio_path=prepared_audio_path,
-                inference_audio_path=inference_audio_path,
-                audio_was_transcoded=audio_was_transcoded,
-                original_audio_path=original_audio_path or file_path,
-                cleanup_paths=cleanup_paths,
-                media_path=media_path or file_path,
-                media_kind=media_kind,
+                chinese_style=chinese_style,
+                noise_backend=_noise_suppression_backend(noise_suppression),
+                steering_mode=_steering_mode(steering_mode),
+                # Streamed jobs skip VAD, so their results never depend on it.
+                vad_filter=vad_filter and not _streams_audio(prepared_audio_path),
             )
+        except Exception as cache_error:
+            logger.debug("Result cache key unavailable for %s: %s", job_id, cache_error)
+
+        transcript_stored = False
+        with native_result_cache.single_flight(cache_key) as cached_result:
+            if cached_result is not None:
+                transcription_result = _restore_cached_result(
+                    job_id,
+                    cached_result,
+                    file_path=media_path or file_path,
+                    original_audio_path=original_audio_path,
+                )
+            else:
+                run = _transcribe(
+                    job_id=job_id,
+                    file_path=file_path,
+                    model_path=model_path,
+                    language=language,
+                    chinese_style=chinese_style,
+                    second_caption_language=second_caption_language,
+                    device=device,
+                    compute_type=compute_type,
+                    vad_filter=vad_filter,
+                    batch_size=8,
+                    send_completion=False,
+                    prepared_audio_path=prepared_audio_path,
+                    audio_was_transcoded=audio_was_transcoded,
+                    original_audio_path=original_audio_path or file_path,
+                    cleanup_paths=cleanup_paths,
+                    media_path=media_path or file_path,
+                    media_kind=media_kind,
+                    noise_suppression=noise_suppression,
+                    steering_mode=steering_mode,
+                )
+                transcription_result = run.result
+                transcript_stored = run.transcript_stored
+                if transcription_result.get("segments"):
+                    native_result_cache.store(cache_key, transcription_result)
 
         audio_info: Dict[str, Any] = {"name": reference_name}
         playback_path = str(media_path or file_path)
@@ -1024,12 +1785,17 @@ def process_full_pipeline_job(
                 audio_file=audio_info,
                 language=transcription_result.get("language"),
                 device=transcription_result.get("device"),
+                # Written here unless finalize already stored it (cache hits,
+                # empty transcripts and failed writes still need it).
+                transcript_stored=transcript_stored,
             )
         except Exception as history_error:
             logger.warning("Failed to persist history for job %s: %s", job_id, history_error)
 
         return transcription_result
 
+    except native_cancellation.JobCanceled:
+        raise
     except Exception as e:
         logger.error("Full pipeline job %s failed: %s", job_id, e)
         logger.error(traceback.format_exc())
@@ -3,25 +3,51 @@
 Native Job Queue - SQLite-based replacement for Redis + RQ
 No external dependencies required
 """
-import sqlite3
+import atexit
+import heapq
+import itertools
+import os
 import threading
 import time
 import json
 import uuid
 import traceback
 import importlib
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, Optional, Callable, Tuple
 from datetime import datetime
-import queue
 import logging
 
+import native_cancellation
+import native_checkpoints
+import native_resources
+import native_storage
+from native_process_pool import BACKEND_PROCESS, ProcessJobPool, can_run_in_process, job_backend
+
 logger = logging.getLogger(__name__)
 
+JOB_CACHE_SIZE_ENV = 'XCAPTION_JOB_CACHE_SIZE'
+DEFAULT_JOB_CACHE_SIZE = 256
+
+RESUME_POLICY_ENV = 'XCAPTION_RESUME_POLICY'
+# 'resume' re-queues interrupted jobs at startup to continue from their
+# checkpoints; 'manual' leaves them pending for the user to restart.
+RESUME_POLICIES = ('resume', 'manual')
+DEFAULT_RESUME_POLICY = 'resume'
+
+TERMINAL_STATES = frozenset({'finished', 'failed', 'canceled', 'cancelled', 'deleted'})
+
 
 class Job:
     """Job object compatible with RQ Job interface"""
 
+    __slots__ = (
+        'id', 'func', 'func_name', 'kwargs', 'queue_name', 'meta', 'result',
+        'exc_info', 'created_at', 'started_at', 'ended_at', '_status',
+    )
+
     def __init__(self, job_id: str, func: Callable, kwargs: Dict[str, Any], queue_name: str = 'default'):
         self.id = job_id
         self.func = func
@@ -56,11 +82,641 @@ class Job:
         pass  # Will be handled by NativeJobQueue
 
 
+# Lower value is dispatched first; unknown queue names rank with 'default'.
+QUEUE_PRIORITIES = {'high': 0, 'default': 1, 'low': 2}
+_PRIORITY_NAMES = {priority: name for name, priority in QUEUE_PRIORITIES.items()}
+
+# Meta keys that only matter while a job runs; kept in memory, never written to the DB.
+TRANSIENT_META_KEYS = frozenset({'partial_result'})
+
+
+class _CacheEntry:
+    __slots__ = ('job', 'updates')
+
+    def __init__(self):
+        self.job: Optional[Job] = None
+        self.updates: Dict[str, Any] = {}
+
+
+class JobCache:
+    """LRU of Job objects and their live poll updates, shared by every queue.
+
+    When the cache is full, finished jobs (and update-only entries) are evicted
+    before running ones; anything evicted is simply reloaded from the database.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_JOB_CACHE_SIZE):
+        self.capacity = max(1, capacity)
+        self._entries: 'OrderedDict[str, _CacheEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, job_id: str, create: bool = False) -> Optional[_CacheEntry]:
+        entry = self._entries.get(job_id)
+        if entry is not None:
+            self._entries.move_to_end(job_id)
+        elif create:
+            entry = _CacheEntry()
+            self._entries[job_id] = entry
+            self._evict(keep=job_id)
+        return entry
+
+    def _evict(self, keep: str) -> None:
+        # *keep* is the entry being created; its job is not attached yet.
+        while len(self._entries) > self.capacity:
+            victim = next(
+                (
+                    job_id for job_id, entry in self._entries.items()
+                    if job_id != keep and (entry.job is None or entry.job.get_status() in TERMINAL_STATES)
+                ),
+                None,
+            )
+            if victim is None:
+                victim = next(iter(self._entries))
+            del self._entries[victim]
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            entry = self._entry(job_id)
+            return entry.job if entry else None
+
+    def put_job(self, job: Job) -> None:
+        with self._lock:
+            self._entry(job.id, create=True).job = job
+
+    def get_updates(self, job_id: str) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._entry(job_id)
+            return dict(entry.updates) if entry else {}
+
+    def merge_updates(self, job_id: str, values: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entry(job_id, create=True).updates.update(values)
+
+    def reset(self, job: Job) -> None:
+        """Cache a freshly enqueued job, dropping updates left over from a reused id."""
+        with self._lock:
+            entry = self._entry(job.id, create=True)
+            entry.job = job
+            entry.updates = {}
+
+    def settle(self, job_id: str) -> None:
+        """Drop what a job no longer needs once it reaches a terminal state."""
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return
+            for key in TRANSIENT_META_KEYS:
+                entry.updates.pop(key, None)
+            if entry.job is not None:
+                entry.job.result = transcript_reference(entry.job.result)
+
+    def forget_job(self, job_id: str) -> None:
+        """Drop the cached Job object (keeping live updates) so it is reloaded from the DB."""
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is not None:
+                entry.job = None
+
+    def discard(self, job_id: str) -> None:
+        with self._lock:
+            self._entries.pop(job_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+def _job_cache_size() -> int:
+    try:
+        return int(os.environ.get(JOB_CACHE_SIZE_ENV) or DEFAULT_JOB_CACHE_SIZE)
+    except (TypeError, ValueError):
+        return DEFAULT_JOB_CACHE_SIZE
+
+
+_job_cache = JobCache(_job_cache_size())
+
+
+def get_job_cache() -> JobCache:
+    return _job_cache
+
+
+def transcript_reference(result: Any) -> Any:
+    """Strip the transcript body from *result*, leaving a stub that points at its stored copy.
+
+    Finished transcripts live once, in ``job_records`` (segments in their own
+    ``segments`` rows); queue rows and job meta only keep this stub.
+    """
+    if not isinstance(result, dict) or 'segments' not in result:
+        return result
+    stub = {key: value for key, value in result.items() if key not in ('segments', 'text')}
+    stub['transcript'] = {'table': 'job_records', 'job_id': result.get('job_id')}
+    return stub
+
+
+def partial_result_delta(partial: Any, known_version: Optional[int] = None) -> Any:
+    """The part of a streamed ``partial_result`` that a poller holding *known_version* lacks.
+
+    Returns the segments from ``offset`` on; the poller keeps its first
+    ``offset`` segments and appends these. An unknown or missing version gets
+    everything (``offset`` 0).
+    """
+    if not isinstance(partial, dict) or 'changed_from' not in partial:
+        return partial
+    segments = partial.get('segments') or []
+    changed_from = partial['changed_from']
+    version = partial.get('version') or len(changed_from)
+    if known_version and 0 < known_version <= version:
+        offset = min(changed_from[known_version:], default=len(segments))
+    else:
+        offset = 0
+    delta = {key: value for key, value in partial.items() if key not in ('segments', 'changed_from')}
+    delta['segments'] = segments[offset:]
+    delta['offset'] = offset
+    return delta
+
+
+PROGRESS_FLUSH_ENV = 'XCAPTION_PROGRESS_FLUSH_SECONDS'
+DEFAULT_PROGRESS_FLUSH_SECONDS = 1.0
+
+
+def _progress_flush_seconds() -> float:
+    try:
+        return max(0.0, float(os.environ.get(PROGRESS_FLUSH_ENV) or DEFAULT_PROGRESS_FLUSH_SECONDS))
+    except (TypeError, ValueError):
+        return DEFAULT_PROGRESS_FLUSH_SECONDS
+
+
+class _PendingProgress:
+    __slots__ = ('db_path', 'progress', 'message', 'stage', 'meta', 'updated_at')
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.progress = 0
+        self.message = ''
+        self.stage: Optional[str] = None
+        self.meta: Dict[str, Any] = {}
+        self.updated_at = 0.0
+
+
+class ProgressBus:
+    """Coalesces progress updates per job and writes them behind to SQLite.
+
+    Pollers read every update straight from the job cache; the database gets
+    each job's latest state at most every ``interval`` seconds, and at once on
+    a stage change, a final tick (100% or failure) or a status change.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        # Serializes flushes so an older snapshot never lands after a newer one.
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[str, _PendingProgress] = {}
+        self._flushed_stage: Dict[str, Optional[str]] = {}
+        self._dirty = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.writes = 0
+        self.updates = 0
+
+    def submit(
+        self,
+        db_path: str,
+        job_id: str,
+        progress: int,
+        message: str,
+        stage: Optional[str] = None,
+        meta: Optional[Dict[str, Any]] = None,
+        urgent: bool = False,
+    ) -> None:
+        with self._lock:
+            self.updates += 1
+            entry = self._pending.get(job_id)
+            if entry is None:
+                entry = self._pending[job_id] = _PendingProgress(db_path)
+            entry.progress = progress
+            entry.message = message
+            entry.updated_at = time.time()
+            if stage is not None:
+                entry.stage = stage
+            if meta:
+                entry.meta.update(meta)
+            urgent = (
+                urgent
+                or self.interval <= 0
+                or (stage is not None and stage != self._flushed_stage.get(job_id))
+            )
+        if urgent:
+            self.flush(job_id)
+        else:
+            self._start()
+            self._dirty.set()
+
+    def flush(self, job_id: Optional[str] = None) -> int:
+        """Write pending updates (one job's, or all) now; returns how many jobs were written."""
+        with self._flush_lock:
+            with self._lock:
+                if job_id is None:
+                    entries = list(self._pending.items())
+                    self._pending.clear()
+                elif job_id in self._pending:
+                    entries = [(job_id, self._pending.pop(job_id))]
+                else:
+                    entries = []
+            if not entries:
+                return 0
+            by_db: Dict[str, list] = {}
+            for pending_id, entry in entries:
+                by_db.setdefault(entry.db_path, []).append((pending_id, entry))
+            for db_path, batch in by_db.items():
+                # One transaction per database for the whole batch.
+                with native_storage.transaction(db_path) as conn:
+                    for pending_id, entry in batch:
+                        self._write(conn, pending_id, entry)
+            with self._lock:
+                self.writes += len(entries)
+                for pending_id, entry in entries:
+                    if entry.stage is not None:
+                        self._flushed_stage[pending_id] = entry.stage
+            return len(entries)
+
+    @staticmethod
+    def _write(conn, job_id: str, entry: _PendingProgress) -> None:
+        conn.execute(
+            """
+            INSERT INTO job_progress (job_id, progress, message, stage, updated_at)
+            SELECT ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM jobs WHERE job_id = ?)
+            ON CONFLICT(job_id) DO UPDATE SET
+                progress = excluded.progress,
+                message = excluded.message,
+                stage = COALESCE(excluded.stage, job_progress.stage),
+                updated_at = excluded.updated_at
+            """,
+            (job_id, entry.progress, entry.message, entry.stage, entry.updated_at, job_id),
+        )
+        if entry.meta:
+            row = conn.execute("SELECT meta FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row:
+                current_meta = json.loads(row[0]) if row[0] else {}
+                current_meta.update(entry.meta)
+                conn.execute("UPDATE jobs SET meta = ? WHERE job_id = ?", (json.dumps(current_meta), job_id))
+
+    def forget(self, job_id: str) -> None:
+        """Drop what the bus remembers about a job that has ended or was removed."""
+        with self._lock:
+            self._pending.pop(job_id, None)
+            self._flushed_stage.pop(job_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'interval_seconds': self.interval,
+                'pending_jobs': len(self._pending),
+                'updates': self.updates,
+                'writes': self.writes,
+            }
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='job-progress-flush', daemon=True)
+                self._thread.start()
+                # Do not lose the last second of progress on a clean exit.
+                atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            self._dirty.wait()
+            time.sleep(self.interval)
+            self._dirty.clear()
+            try:
+                self.flush()
+            except Exception as exc:
+                logger.warning("Failed to flush job progress: %s", exc)
+
+
+_progress_bus = ProgressBus(_progress_flush_seconds())
+
+
+def get_progress_bus() -> ProgressBus:
+    return _progress_bus
+
+
+SCHEDULING_POLICY_ENV = 'XCAPTION_SCHEDULING_POLICY'
+QUEUE_SHARING_ENV = 'XCAPTION_QUEUE_SHARING'
+QUEUE_WEIGHTS_ENV = 'XCAPTION_QUEUE_WEIGHTS'
+SJF_AGING_ENV = 'XCAPTION_SJF_AGING'
+
+SCHEDULING_POLICIES = ('fifo', 'sjf')
+QUEUE_SHARING_MODES = ('strict', 'weighted')
+DEFAULT_QUEUE_WEIGHTS = {'high': 4.0, 'default': 2.0, 'low': 1.0}
+# Seconds of media a job is forgiven for every second it waits under SJF.
+DEFAULT_SJF_AGING = 4.0
+# Jobs whose duration could not be probed rank as if they were this long.
+_UNKNOWN_DURATION_SECONDS = 600.0
+_WAIT_SAMPLES = 500
+
+
+def _env_choice(name: str, choices: tuple, default: str) -> str:
+    value = (os.environ.get(name) or default).strip().lower()
+    return value if value in choices else default
+
+
+def _queue_weights() -> Dict[str, float]:
+    weights = dict(DEFAULT_QUEUE_WEIGHTS)
+    for part in (os.environ.get(QUEUE_WEIGHTS_ENV) or '').split(','):
+        name, _, value = part.partition('=')
+        try:
+            if name.strip() and float(value) > 0:
+                weights[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return weights
+
+
+def resume_policy(queue_name: str) -> str:
+    """Policy for *queue_name* from ``XCAPTION_RESUME_POLICY`` (``manual`` or ``high=resume,low=manual``)."""
+    policy = DEFAULT_RESUME_POLICY
+    for part in (os.environ.get(RESUME_POLICY_ENV) or '').split(','):
+        name, _, value = part.strip().lower().rpartition('=')
+        if value in RESUME_POLICIES and name in ('', queue_name):
+            policy = value
+            if name:
+                break
+    return policy
+
+
+def _sjf_aging() -> float:
+    try:
+        return max(0.0, float(os.environ.get(SJF_AGING_ENV) or DEFAULT_SJF_AGING))
+    except (TypeError, ValueError):
+        return DEFAULT_SJF_AGING
+
+
+class _Pending:
+    __slots__ = ('priority', 'enqueued', 'duration', 'seq', 'item')
+
+    def __init__(self, priority: int, duration: Optional[float], seq: int, item: Any):
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.duration = duration
+        self.seq = seq
+        self.item = item
+
+
+class JobDispatcher:
+    """Run queue shared by every queue; idle workers block until work arrives.
+
+    Each priority class has its own heap. Within a class jobs run oldest first
+    (``fifo``) or shortest media first with aging (``sjf``). Across classes the
+    lowest priority number wins (``strict``) or classes take turns in proportion
+    to their weights (``weighted``), so low-priority work keeps moving.
+    """
+
+    def __init__(self, policy: Optional[str] = None, sharing: Optional[str] = None, aging: Optional[float] = None):
+        self._heaps: Dict[int, list] = {}
+        self._pass: Dict[int, float] = {}
+        self._waits: Dict[int, deque] = {}
+        self._dispatched: Dict[int, int] = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self.policy = policy or _env_choice(SCHEDULING_POLICY_ENV, SCHEDULING_POLICIES, 'fifo')
+        self.sharing = sharing or _env_choice(QUEUE_SHARING_ENV, QUEUE_SHARING_MODES, 'strict')
+        self.aging = _sjf_aging() if aging is None else max(0.0, aging)
+        self.weights = _queue_weights()
+
+    def _key(self, entry: _Pending) -> float:
+        if self.policy == 'sjf':
+            duration = entry.duration if entry.duration and entry.duration > 0 else _UNKNOWN_DURATION_SECONDS
+            # Every waiting job ages at the same rate, so ranking by
+            # duration - aging * waited equals ranking by this fixed key.
+            return duration + self.aging * entry.enqueued
+        return entry.enqueued
+
+    def _weight(self, priority: int) -> float:
+        return self.weights.get(_PRIORITY_NAMES.get(priority, 'default'), 1.0)
+
+    def put(self, priority: int, item: Any, duration: Optional[float] = None) -> None:
+        with self._condition:
+            entry = _Pending(priority, duration, next(self._counter), item)
+            heap = self._heaps.setdefault(priority, [])
+            if not heap:
+                # A class coming back from idle starts level with the others
+                # instead of cashing in the turns it did not need.
+                busy = [self._pass.get(p, 0.0) for p, h in self._heaps.items() if h]
+                self._pass[priority] = max(self._pass.get(priority, 0.0), min(busy) if busy else 0.0)
+            heapq.heappush(heap, (self._key(entry), entry.seq, entry))
+            self._condition.notify()
+
+    def _pick(self) -> Optional[int]:
+        ready = [priority for priority, heap in self._heaps.items() if heap]
+        if not ready:
+            return None
+        if self.sharing == 'weighted':
+            return min(ready, key=lambda p: (self._pass.get(p, 0.0), p))
+        return min(ready)
+
+    def get(self, should_stop: Optional[Callable[[], bool]] = None) -> Optional[Any]:
+        """Pop the next item by policy; returns ``None`` once *should_stop* is true."""
+        with self._condition:
+            priority = self._pick()
+            while priority is None:
+                if should_stop and should_stop():
+                    return None
+                self._condition.wait()
+                priority = self._pick()
+            entry = heapq.heappop(self._heaps[priority])[-1]
+            self._pass[priority] = self._pass.get(priority, 0.0) + 1.0 / self._weight(priority)
+            self._dispatched[priority] = self._dispatched.get(priority, 0) + 1
+            self._waits.setdefault(priority, deque(maxlen=_WAIT_SAMPLES)).append(
+                time.monotonic() - entry.enqueued
+            )
+            return entry.item
+
+    def configure(
+        self,
+        *,
+        policy: Optional[str] = None,
+        sharing: Optional[str] = None,
+        aging: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Switch policy at runtime; jobs already waiting are re-ranked."""
+        if policy is not None and policy not in SCHEDULING_POLICIES:
+            raise ValueError(f"Unknown scheduling policy: {policy}")
+        if sharing is not None and sharing not in QUEUE_SHARING_MODES:
+            raise ValueError(f"Unknown queue sharing mode: {sharing}")
+        with self._condition:
+            self.policy = policy or self.policy
+            self.sharing = sharing or self.sharing
+            if aging is not None:
+                self.aging = max(0.0, float(aging))
+            for heap in self._heaps.values():
+                heap[:] = [(self._key(entry), entry.seq, entry) for _, _, entry in heap]
+                heapq.heapify(heap)
+        logger.info(
+            "Job scheduling set to policy=%s sharing=%s aging=%s", self.policy, self.sharing, self.aging
+        )
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue-wait statistics per class, for checking the scheduling policy."""
+        now = time.monotonic()
+        with self._condition:
+            classes = {}
+            for priority in sorted(set(self._heaps) | set(self._waits)):
+                heap = self._heaps.get(priority) or []
+                waits = sorted(self._waits.get(priority) or ())
+                summary: Dict[str, Any] = {
+                    'waiting': len(heap),
+                    'oldest_wait_seconds': round(max((now - e.enqueued for _, _, e in heap), default=0.0), 3),
+                    'dispatched': self._dispatched.get(priority, 0),
+                    'weight': self._weight(priority),
+                }
+                if waits:
+                    summary.update({
+                        'mean_wait_seconds': round(sum(waits) / len(waits), 3),
+                        'p50_wait_seconds': round(waits[len(waits) // 2], 3),
+                        'p95_wait_seconds': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3),
+                        'max_wait_seconds': round(waits[-1], 3),
+                    })
+                classes[_PRIORITY_NAMES.get(priority, str(priority))] = summary
+            return {
+                'policy': self.policy,
+                'sharing': self.sharing,
+                'aging': self.aging,
+                'queues': classes,
+            }
+
+    def wake_all(self) -> None:
+        with self._condition:
+            self._condition.notify_all()
+
+    def __len__(self):
+        with self._condition:
+            return sum(len(heap) for heap in self._heaps.values())
+
+
+_dispatcher = JobDispatcher()
+
+
+def get_dispatcher() -> JobDispatcher:
+    return _dispatcher
+
+
+STAGE_IO = 'io'
+STAGE_CPU = 'cpu'
+
+
+class Stage:
+    """One step of a staged job.
+
+    ``func(state)`` runs once every stage named in ``after`` has finished:
+    ``io`` stages (ffmpeg, disk, database) on the shared I/O pool, ``cpu``
+    stages on the job's own thread while holding an inference slot.
+    """
+
+    __slots__ = ('name', 'func', 'pool', 'after')
+
+    def __init__(self, name: str, func: Callable[[Any], None], pool: str = STAGE_IO, after: Tuple[str, ...] = ()):
+        self.name = name
+        self.func = func
+        self.pool = pool
+        self.after = tuple(after)
+
+
+def _run_stage(token: Optional[native_cancellation.CancellationToken], stage: Stage, state: Any) -> None:
+    with native_cancellation.bind(token):
+        native_cancellation.check()
+        stage.func(state)
+
+
+class StagePools:
+    """Runs stage graphs: a small I/O pool shared by all jobs plus the scheduler's inference slots.
+
+    I/O stages of upcoming jobs run on the pool while earlier jobs hold the
+    inference slots, so one job's transcode overlaps another job's decode.
+    """
+
+    def __init__(self, io_workers: int):
+        self.io_workers = max(1, int(io_workers))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _io_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix='job-io')
+            return self._executor
+
+    def run(self, job_id: str, stages: list, state: Any = None, inline: bool = False) -> Any:
+        """Run *stages* for *job_id* in dependency order; *inline* runs every stage on this thread."""
+        token = native_cancellation.current()
+        scheduler = native_resources.get_scheduler()
+        waiting = list(stages)
+        done = set()
+        running: Dict[Any, Stage] = {}
+        try:
+            while waiting or running:
+                ready = [stage for stage in waiting if all(name in done for name in stage.after)]
+                for stage in ready:
+                    waiting.remove(stage)
+                    if stage.pool == STAGE_IO and not inline:
+                        running[self._io_executor().submit(_run_stage, token, stage, state)] = stage
+                progressed = False
+                for stage in ready:
+                    if stage.pool == STAGE_IO and not inline:
+                        continue
+                    if stage.pool == STAGE_CPU:
+                        with scheduler.inference_slot(check=native_cancellation.check):
+                            _run_stage(token, stage, state)
+                    else:
+                        _run_stage(token, stage, state)
+                    done.add(stage.name)
+                    progressed = True
+                if progressed:
+                    continue
+                if not running:
+                    if waiting:
+                        raise RuntimeError(
+                            f"Job {job_id} has stages with unmet dependencies: {[stage.name for stage in waiting]}"
+                        )
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage = running.pop(future)
+                    future.result()
+                    done.add(stage.name)
+        finally:
+            # Never return while a stage still works on state the caller may clean up.
+            if running:
+                wait(running)
+        return state
+
+
+_stage_pools: Optional[StagePools] = None
+_stage_pools_lock = threading.Lock()
+
+
+def get_stage_pools() -> StagePools:
+    global _stage_pools
+    with _stage_pools_lock:
+        if _stage_pools is None:
+            _stage_pools = StagePools(native_resources.get_scheduler().io_workers)
+        return _stage_pools
+
+
+def run_stages(job_id: str, stages: list, state: Any = None) -> Any:
+    """Run a job's stage graph; inside a worker process the stages simply run in order."""
+    return get_stage_pools().run(job_id, stages, state, inline=_in_worker_process)
+
+
 class NativeJobQueue:
     """SQLite-based job queue that mimics Redis + RQ behavior"""
 
-    def __init__(self, name: str = 'default', db_path: str = None):
+    def __init__(self, name: str = 'default', db_path: str = None, resume: Optional[str] = None):
         self.name = name
+        self.resume_policy = resume if resume in RESUME_POLICIES else resume_policy(name)
 
         # Use app data directory for database
         if db_path is None:
@@ -69,17 +725,17 @@ class NativeJobQueue:
             db_path = str(db_dir / 'jobs.db')
 
         self.db_path = db_path
-        self.conn = None
-        self.lock = threading.Lock()
-        self.job_updates = {}  # In-memory storage for real-time updates
-        self.active_jobs = {}  # Track active Job objects
+        # Job objects and real-time updates, shared with the other queues.
+        self.cache = get_job_cache()
+        # Progress ticks are coalesced in memory and written behind.
+        self.progress_bus = get_progress_bus()
         self._init_db()
 
-        # Worker thread pool
-        self.worker_threads = []
-        self.job_queue = queue.Queue()
-        self.running = False
-        self._recover_pending_jobs()
+        # Jobs are dispatched through the shared run queue.
+        self.priority = QUEUE_PRIORITIES.get(name, QUEUE_PRIORITIES['default'])
+        self.dispatcher = get_dispatcher()
+        if not _in_worker_process:
+            self._recover_pending_jobs()
 
     def _resolve_callable(self, func_name: str) -> Optional[Callable]:
         if not func_name or "." not in func_name:
@@ -92,59 +748,88 @@ class NativeJobQueue:
             return None
 
     def _recover_pending_jobs(self) -> None:
-        """Reset interrupted jobs to pending status without auto-resuming."""
+        """Deal with jobs a previous run left unfinished, according to the queue's resume policy.
+
+        ``resume`` puts jobs that saved a checkpoint back on the run queue to
+        continue from it. Every other started job (and every started job under
+        ``manual``) is reset to pending for the user to restart; waiting jobs
+        without a checkpoint stay as they are.
+        """
+        resume = self.resume_policy == 'resume'
         try:
-            with self.lock:
-                rows = self.conn.execute(
-                    """
-                    SELECT job_id, func_name, status
-                    FROM jobs
-                    WHERE queue_name = ? AND status IN ('started')
-                    """,
-                    (self.name,),
-                ).fetchall()
+            rows = native_storage.connect(self.db_path).execute(
+                f"""
+                SELECT job_id, func_name, status, kwargs, created_at, media_duration
+                FROM jobs
+                WHERE queue_name = ? AND status IN ({"'started', 'queued'" if resume else "'started'"})
+                ORDER BY created_at
+                """,
+                (self.name,),
+            ).fetchall()
         except Exception as exc:
             logger.warning("Failed to load interrupted jobs for recovery: %s", exc)
             return
 
         reset_count = 0
+        resumed = []
+
+        # One transaction for the whole sweep instead of a commit per job.
+        with native_storage.transaction(self.db_path) as conn:
+            for row in rows:
+                job_id, func_name, status, kwargs_json, created_at, media_duration = row
+                func = None
+                if resume and native_checkpoints.has_checkpoints(job_id):
+                    func = self._resolve_callable(func_name)
+                try:
+                    kwargs = json.loads(kwargs_json) if kwargs_json else {}
+                except (TypeError, ValueError):
+                    func = None
+
+                if func is None:
+                    if status != 'started':
+                        continue
+                    # Reset interrupted jobs back to pending (queued) status
+                    # Do NOT add them back to the job queue - user must manually restart
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, started_at = NULL, ended_at = NULL, error = NULL WHERE job_id = ?",
+                        ('queued', job_id),
+                    )
+                    native_checkpoints.clear(job_id)
+
+                    # Update progress to indicate the job was interrupted
+                    self.update_job_progress(job_id, 0, "Job was interrupted. Please restart manually.")
+                    reset_count += 1
+                    continue
 
-        for row in rows:
-            job_id, func_name, status = row
-
-            # Reset interrupted jobs back to pending (queued) status
-            # Do NOT add them back to the job queue - user must manually restart
-            with self.lock:
-                self.conn.execute(
+                conn.execute(
                     "UPDATE jobs SET status = ?, started_at = NULL, ended_at = NULL, error = NULL WHERE job_id = ?",
                     ('queued', job_id),
                 )
-                self.conn.commit()
+                job = Job(job_id=job_id, func=func, kwargs=kwargs, queue_name=self.name)
+                if created_at:
+                    job.created_at = datetime.fromtimestamp(created_at)
+                self.cache.reset(job)
+                self.update_job_progress(job_id, 0, "Resuming interrupted job from its last checkpoint...")
+                resumed.append((job, func, kwargs, media_duration))
 
-            # Update metadata to indicate the job was interrupted
-            self.update_job_meta(
-                job_id,
-                {
-                    "message": "Job was interrupted. Please restart manually.",
-                    "progress": 0,
-                },
-            )
-            reset_count += 1
+        for job, func, kwargs, media_duration in resumed:
+            self.dispatcher.put(self.priority, (self, job, func, kwargs), duration=media_duration)
 
-        if reset_count > 0:
+        if reset_count or resumed:
             logger.info(
-                "Job recovery complete for queue '%s': reset to pending=%s (not auto-resumed)",
+                "Job recovery complete for queue '%s' (%s policy): resumed=%s reset to pending=%s",
                 self.name,
+                self.resume_policy,
+                len(resumed),
                 reset_count,
             )
 
     def _init_db(self):
         """Initialize SQLite database"""
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
 
-        with self.lock:
-            self.conn.execute("""
+        with native_storage.transaction(self.db_path) as conn:
+            conn.execute("""
                 CREATE TABLE IF NOT EXISTS jobs (
                     job_id TEXT PRIMARY KEY,
                     queue_name TEXT,
@@ -161,42 +846,67 @@ class NativeJobQueue:
             """)
 
             # Create index for faster queries
-            self.conn.execute("""
+            conn.execute("""
                 CREATE INDEX IF NOT EXISTS idx_status ON jobs(status)
             """)
-            self.conn.execute("""
+            conn.execute("""
                 CREATE INDEX IF NOT EXISTS idx_queue ON jobs(queue_name, status)
             """)
 
-            self.conn.commit()
+            # Probed media length, used by shortest-job-first scheduling.
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'media_duration' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN media_duration REAL")
+            # Seconds a finished job is kept; NULL uses the retention default.
+            if 'result_ttl' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN result_ttl INTEGER")
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_jobs_ended ON jobs(status, ended_at)
+            """)
+
+            # Progress ticks update this small row in place instead of the meta blob.
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_progress (
+                    job_id TEXT PRIMARY KEY,
+                    progress INTEGER,
+                    message TEXT,
+                    stage TEXT,
+                    updated_at REAL
+                )
+            """)
 
         logger.info(f"Initialized job queue '{self.name}' with database: {self.db_path}")
 
     def enqueue(self, func: Callable, kwargs: Dict[str, Any] = None,
-                job_id: str = None, timeout: str = '1h', result_ttl: int = -1):
-        """Add job to queue"""
+                job_id: str = None, timeout: str = '1h', result_ttl: Optional[int] = None,
+                media_duration: Optional[float] = None):
+        """Add job to queue
+
+        ``media_duration`` (seconds) lets the ``sjf`` scheduling policy run short
+        jobs ahead of long ones; jobs without it rank as medium length.
+        ``result_ttl`` is how long (seconds) the finished job row is kept:
+        ``None`` follows ``XCAPTION_JOB_TTL_HOURS``, ``-1`` keeps it until the
+        row cap removes it (see native_maintenance).
+        """
         if kwargs is None:
             kwargs = {}
 
         if job_id is None:
             job_id = str(uuid.uuid4())
 
-        # Clear stale in-memory updates when reusing a job id.
-        if job_id in self.job_updates:
-            del self.job_updates[job_id]
-
         # Create job object
         job = Job(job_id=job_id, func=func, kwargs=kwargs, queue_name=self.name)
 
-        # Store in active jobs
-        self.active_jobs[job_id] = job
+        # Cache it, clearing stale in-memory updates when reusing a job id.
+        self.cache.reset(job)
 
         # Store in database
-        with self.lock:
-            self.conn.execute("""
+        with native_storage.transaction(self.db_path) as conn:
+            conn.execute("""
                 INSERT OR REPLACE INTO jobs
-                (job_id, queue_name, func_name, kwargs, status, created_at, started_at, ended_at, meta, result, error)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                (job_id, queue_name, func_name, kwargs, status, created_at, started_at, ended_at, meta, result, error,
+                 media_duration, result_ttl)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 job_id,
                 self.name,
@@ -208,12 +918,13 @@ class NativeJobQueue:
                 None,
                 json.dumps({}),
                 None,
-                None
+                None,
+                media_duration,
+                result_ttl,
             ))
-            self.conn.commit()
 
-        # Add to processing queue
-        self.job_queue.put((job, func, kwargs))
+        # Hand to the shared dispatcher; wakes exactly one idle worker.
+        self.dispatcher.put(self.priority, (self, job, func, kwargs), duration=media_duration)
 
         logger.info(f"Enqueued job {job_id} to queue '{self.name}'")
         return job
@@ -221,23 +932,18 @@ class NativeJobQueue:
     def fetch_job(self, job_id: str):
         """Fetch job by ID (compatible with RQ Job.fetch)"""
         # IMPORTANT: Jobs live in a shared DB across all queue instances. Do not
-        # trust per-queue in-memory caches alone, or status can go stale (e.g. a
-        # "low" queue job fetched via the "high" queue would otherwise stay
-        # "started" forever and make the UI oscillate between processing/done).
-
-        terminal_states = {"finished", "failed", "canceled", "cancelled", "deleted"}
-
-        cached = self.active_jobs.get(job_id)
-        if cached is not None and cached.get_status() in terminal_states:
+        # trust the in-memory cache alone for running jobs, or status can go stale
+        # and make the UI oscillate between processing/done.
+        cached = self.cache.get_job(job_id)
+        if cached is not None and cached.get_status() in TERMINAL_STATES:
             return cached
 
         # Refresh from database (lightweight query for cached jobs).
         if cached is not None:
-            with self.lock:
-                row = self.conn.execute(
-                    "SELECT status, started_at, ended_at, error FROM jobs WHERE job_id = ?",
-                    (job_id,),
-                ).fetchone()
+            row = native_storage.connect(self.db_path).execute(
+                "SELECT status, started_at, ended_at, error FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
             if not row:
                 raise Exception(f"Job {job_id} not found")
 
@@ -249,12 +955,13 @@ class NativeJobQueue:
             return cached
 
         # Not cached: load the full job record once.
-        with self.lock:
-            row = self.conn.execute("""
-                SELECT job_id, queue_name, func_name, kwargs, status,
-                       created_at, started_at, ended_at, meta, result, error
-                FROM jobs WHERE job_id = ?
-            """, (job_id,)).fetchone()
+        row = native_storage.connect(self.db_path).execute("""
+            SELECT j.job_id, j.queue_name, j.func_name, j.kwargs, j.status,
+                   j.created_at, j.started_at, j.ended_at, j.meta, j.result, j.error,
+                   p.progress, p.message, p.stage
+            FROM jobs j LEFT JOIN job_progress p ON p.job_id = j.job_id
+            WHERE j.job_id = ?
+        """, (job_id,)).fetchone()
 
         if not row:
             raise Exception(f"Job {job_id} not found")
@@ -274,18 +981,24 @@ class NativeJobQueue:
             job.meta = json.loads(row[8]) if row[8] else {}
         except Exception:
             job.meta = {}
+        if row[11] is not None:
+            job.meta.update({'progress': row[11], 'message': row[12] or ''})
+        if row[13] is not None:
+            job.meta['stage'] = row[13]
         try:
             job.result = json.loads(row[9]) if row[9] else None
         except Exception:
             job.result = None
         job.exc_info = row[10]
 
-        self.active_jobs[job_id] = job
+        self.cache.put_job(job)
         return job
 
     def update_job_status(self, job_id: str, status: str, result: Any = None, error: str = None):
         """Update job status in database"""
-        with self.lock:
+        # Pending progress lands first so the row never shows a newer status with older progress.
+        self.progress_bus.flush(job_id)
+        with native_storage.transaction(self.db_path) as conn:
             updates = {'status': status}
 
             if status == 'started':
@@ -294,7 +1007,7 @@ class NativeJobQueue:
                 updates['ended_at'] = time.time()
 
             if result is not None:
-                updates['result'] = json.dumps(result)
+                updates['result'] = json.dumps(transcript_reference(result))
 
             if error is not None:
                 updates['error'] = error
@@ -303,91 +1016,133 @@ class NativeJobQueue:
             set_clause = ', '.join([f"{k} = ?" for k in updates.keys()])
             values = list(updates.values()) + [job_id]
 
-            self.conn.execute(f"UPDATE jobs SET {set_clause} WHERE job_id = ?", values)
-            self.conn.commit()
+            conn.execute(f"UPDATE jobs SET {set_clause} WHERE job_id = ?", values)
 
         # Update active job
-        if job_id in self.active_jobs:
-            job = self.active_jobs[job_id]
+        job = self.cache.get_job(job_id)
+        if job is not None:
             job._status = status
             if result is not None:
                 job.result = result
             if error is not None:
                 job.exc_info = error
+        if status in TERMINAL_STATES:
+            self.cache.settle(job_id)
+            self.progress_bus.forget(job_id)
 
     def update_job_meta(self, job_id: str, meta: Dict[str, Any]):
         """Update job metadata"""
-        with self.lock:
+        # Read-merge-write under one write lock so concurrent updates never lose keys.
+        with native_storage.transaction(self.db_path) as conn:
             # Get current meta
-            cursor = self.conn.execute("SELECT meta FROM jobs WHERE job_id = ?", (job_id,))
+            cursor = conn.execute("SELECT meta FROM jobs WHERE job_id = ?", (job_id,))
             row = cursor.fetchone()
 
             if row:
                 current_meta = json.loads(row[0]) if row[0] else {}
                 current_meta.update(meta)
 
-                self.conn.execute(
+                conn.execute(
                     "UPDATE jobs SET meta = ? WHERE job_id = ?",
                     (json.dumps(current_meta), job_id)
                 )
-                self.conn.commit()
 
                 # Store for polling
-                self.job_updates[job_id] = current_meta
+                self.cache.merge_updates(job_id, current_meta)
 
         # Update active job
-        if job_id in self.active_jobs:
-            job = self.active_jobs[job_id]
+        job = self.cache.get_job(job_id)
+        if job is not None:
             job.meta.update(meta)
 
+    def update_job_progress(self, job_id: str, progress: int, message: str, extra: Optional[Dict[str, Any]] = None):
+        """Record a progress tick; only keys other than progress/message/stage touch the meta blob.
+
+        Pollers see the update immediately; the database write goes through the
+        progress bus, which coalesces plain ticks and writes stage changes,
+        final ticks, results and errors right away.
+        """
+        extra = dict(extra or {})
+        stage = extra.pop('stage', None)
+        transient = {key: extra.pop(key) for key in TRANSIENT_META_KEYS if key in extra}
+        if 'result' in extra:
+            extra['result_ref'] = transcript_reference(extra.pop('result'))
+
+        live = {'progress': progress, 'message': message, **extra, **transient}
+        if stage is not None:
+            live['stage'] = stage
+        self.cache.merge_updates(job_id, live)
+
+        job = self.cache.get_job(job_id)
+        if job is not None:
+            job.meta.update({key: value for key, value in live.items() if key not in TRANSIENT_META_KEYS})
+
+        final = progress >= 100 or progress < 0 or 'result_ref' in extra or 'error' in extra
+        self.progress_bus.submit(self.db_path, job_id, progress, message, stage, extra, urgent=final)
+
+    def get_job_status(self, job_id: str) -> Optional[str]:
+        """Read the persisted status of a job (shared across queue instances)."""
+        row = native_storage.connect(self.db_path).execute(
+            "SELECT status FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return row[0] if row else None
+
     def get_job_updates(self, job_id: str) -> Dict[str, Any]:
         """Get latest job updates (for polling)"""
-        return self.job_updates.get(job_id, {})
+        return self.cache.get_updates(job_id)
 
     def remove_job(self, job_id: str):
         """Remove job from queue and database"""
-        with self.lock:
-            self.conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
-            self.conn.commit()
+        self.progress_bus.forget(job_id)
+        with native_storage.transaction(self.db_path) as conn:
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM job_progress WHERE job_id = ?", (job_id,))
 
-        if job_id in self.active_jobs:
-            del self.active_jobs[job_id]
-
-        if job_id in self.job_updates:
-            del self.job_updates[job_id]
+        self.cache.discard(job_id)
+        native_checkpoints.clear(job_id)
 
     def __len__(self):
         """Get queue length"""
-        with self.lock:
-            cursor = self.conn.execute(
-                "SELECT COUNT(*) FROM jobs WHERE queue_name = ? AND status = 'queued'",
-                (self.name,)
-            )
-            return cursor.fetchone()[0]
+        cursor = native_storage.connect(self.db_path).execute(
+            "SELECT COUNT(*) FROM jobs WHERE queue_name = ? AND status = 'queued'",
+            (self.name,)
+        )
+        return cursor.fetchone()[0]
 
     @property
     def job_ids(self):
         """Get all job IDs in queue"""
-        with self.lock:
-            cursor = self.conn.execute(
-                "SELECT job_id FROM jobs WHERE queue_name = ? AND status = 'queued'",
-                (self.name,)
-            )
-            return [row[0] for row in cursor.fetchall()]
+        cursor = native_storage.connect(self.db_path).execute(
+            "SELECT job_id FROM jobs WHERE queue_name = ? AND status = 'queued'",
+            (self.name,)
+        )
+        return [row[0] for row in cursor.fetchall()]
 
 
 class NativeWorker:
     """Worker that processes jobs from NativeJobQueue"""
 
-    def __init__(self, queues: list, num_threads: int = 2):
+    def __init__(self, queues: list, num_threads: Optional[int] = None, backend: Optional[str] = None):
         self.queues = queues
-        self.num_threads = num_threads
+        # How many jobs actually run at once is decided by the resource scheduler;
+        # the thread count only bounds how high that limit can be raised at runtime.
+        self.scheduler = native_resources.get_scheduler()
+        # 'process' runs each job in a worker process owned by its thread.
+        self.backend = backend or job_backend()
+        # With thread workers, a few extra jobs may prepare audio while others
+        # decode; a worker process runs its stages back to back instead.
+        self.lookahead = self.scheduler.io_workers if self.backend != BACKEND_PROCESS else 0
+        self.num_threads = num_threads or self.scheduler.worker_slots + self.lookahead
         self.running = False
         self.threads = []
+        self.dispatcher = get_dispatcher()
+        self._stopped = threading.Event()
+        self.pool = ProcessJobPool(self.num_threads) if self.backend == BACKEND_PROCESS else None
 
     def work(self):
         """Start processing jobs"""
         self.running = True
+        self._stopped.clear()
 
         logger.info(f"Starting {self.num_threads} worker threads for queues: {[q.name for q in self.queues]}")
 
@@ -399,71 +1154,110 @@ class NativeWorker:
 
         # Keep main thread alive
         try:
-            while self.running:
-                time.sleep(1)
+            self._stopped.wait()
         except KeyboardInterrupt:
             logger.info("Worker interrupted by user")
-            self.running = False
+            self.stop()
+
+    def stop(self):
+        """Stop the worker threads once they finish their current job."""
+        self.running = False
+        self._stopped.set()
+        self.dispatcher.wake_all()
+        self.scheduler.wake_all()
+        if self.pool is not None:
+            self.pool.shutdown()
 
     def _worker_loop(self, worker_id: int):
         """Worker thread loop"""
         logger.info(f"Worker thread {worker_id} started")
 
+        should_stop = lambda: not self.running  # noqa: E731
         while self.running:
-            job_processed = False
-
-            # Check each queue (high priority first)
-            for queue in self.queues:
+            # Wait for admission, then for the next job the scheduling policy picks
+            if not self.scheduler.acquire(should_stop=should_stop, lookahead=self.lookahead):
+                break
+            try:
+                item = self.dispatcher.get(should_stop=should_stop)
+                if item is None:
+                    break
+                queue, job, func, kwargs = item
                 try:
-                    # Try to get a job (non-blocking)
-                    job, func, kwargs = queue.job_queue.get(timeout=0.1)
-                    job_processed = True
-
-                    logger.info(f"Worker {worker_id} processing job {job.id}")
-
-                    # Update status to started
-                    queue.update_job_status(job.id, 'started')
-                    job._status = 'started'
-                    job.started_at = datetime.now()
-
-                    try:
-                        # Execute the job
-                        result = func(**kwargs)
-
-                        # Update status to finished
-                        queue.update_job_status(job.id, 'finished', result=result)
-                        job._status = 'finished'
-                        job.result = result
-                        job.ended_at = datetime.now()
-
-                        logger.info(f"Worker {worker_id} completed job {job.id}")
-
-                    except Exception as e:
-                        # Job failed
-                        error_msg = traceback.format_exc()
-                        logger.error(f"Worker {worker_id} job {job.id} failed: {e}\n{error_msg}")
+                    self._run_job(worker_id, queue, job, func, kwargs)
+                except Exception as e:
+                    logger.error(f"Worker {worker_id} could not run job {job.id}: {e}")
+            finally:
+                self.scheduler.release()
 
-                        queue.update_job_status(job.id, 'failed', error=error_msg)
-                        job._status = 'failed'
-                        job.exc_info = error_msg
-                        job.ended_at = datetime.now()
+        native_storage.close_thread_connections()
+        logger.info(f"Worker thread {worker_id} stopped")
 
-                    break  # Job processed, exit queue loop
+    def _run_job(self, worker_id: int, queue: 'NativeJobQueue', job: Job, func: Callable, kwargs: Dict[str, Any]):
+        # Skip jobs that were terminated or removed while waiting.
+        if queue.get_job_status(job.id) in (None, 'canceled', 'cancelled', 'deleted'):
+            logger.info(f"Worker {worker_id} skipping canceled job {job.id}")
+            native_checkpoints.clear(job.id)
+            return
 
-                except Exception as e:
-                    # Queue is empty or other error, try next queue
-                    continue
+        logger.info(f"Worker {worker_id} processing job {job.id}")
 
-            # If no job was processed, sleep briefly
-            if not job_processed:
-                time.sleep(0.5)
+        # Update status to started
+        queue.update_job_status(job.id, 'started')
+        job._status = 'started'
+        job.started_at = datetime.now()
 
-        logger.info(f"Worker thread {worker_id} stopped")
+        cores = self.scheduler.assign(job.id, queued=len(self.dispatcher))
+        logger.info(f"Worker {worker_id} assigned {cores} cores to job {job.id}")
+        token = native_cancellation.begin(job.id)
+        try:
+            # Execute the job
+            with native_cancellation.bind(token):
+                if self.pool is not None and can_run_in_process(job.func_name):
+                    try:
+                        result = self.pool.run(worker_id, job.id, job.func_name, kwargs, cores=cores)
+                    finally:
+                        # The child wrote meta straight to the DB; reload it on next fetch.
+                        queue.cache.forget_job(job.id)
+                else:
+                    result = func(**kwargs)
+            token.check()
+
+            # Update status to finished
+            queue.update_job_status(job.id, 'finished', result=result)
+            job._status = 'finished'
+            job.result = transcript_reference(result)
+            job.ended_at = datetime.now()
+
+            logger.info(f"Worker {worker_id} completed job {job.id}")
+
+        except Exception as e:
+            if token.canceled:
+                # Terminated: its processes were killed, so this is not a failure.
+                logger.info(f"Worker {worker_id} stopped canceled job {job.id}")
+                queue.update_job_status(job.id, 'canceled')
+                job._status = 'canceled'
+                job.ended_at = datetime.now()
+            else:
+                # Job failed
+                error_msg = traceback.format_exc()
+                logger.error(f"Worker {worker_id} job {job.id} failed: {e}\n{error_msg}")
+
+                queue.update_job_status(job.id, 'failed', error=error_msg)
+                job._status = 'failed'
+                job.exc_info = error_msg
+                job.ended_at = datetime.now()
+        finally:
+            native_cancellation.end(job.id, token)
+            self.scheduler.unassign(job.id)
+            # Only a job interrupted by shutdown resumes; any outcome here is final.
+            native_checkpoints.clear(job.id)
 
 
 # Singleton instances
 _queues = {}
 _worker = None
+# Set inside job worker processes, which must not recover the parent's jobs.
+_in_worker_process = False
 
 
 def get_queue(name: str = 'default') -> NativeJobQueue:
@@ -476,8 +1270,17 @@ def get_queue(name: str = 'default') -> NativeJobQueue:
     return _queues[name]
 
 
-def start_worker(num_threads: int = 2):
-    """Start the worker threads"""
+def find_job(job_id: str) -> Tuple[Optional[NativeJobQueue], Optional[Job]]:
+    """Look a job up once across every queue; returns ``(queue, job)`` or ``(None, None)``."""
+    try:
+        job = get_queue('default').fetch_job(job_id)
+    except Exception:
+        return None, None
+    return get_queue(job.queue_name or 'default'), job
+
+
+def start_worker(num_threads: Optional[int] = None, backend: Optional[str] = None):
+    """Start the worker threads (sized by the resource scheduler unless *num_threads* is given)"""
     global _worker, _queues
 
     if _worker is None:
@@ -486,13 +1289,20 @@ def start_worker(num_threads: int = 2):
         default_queue = get_queue('default')
         low_queue = get_queue('low')
 
-        _worker = NativeWorker([high_queue, default_queue, low_queue], num_threads=num_threads)
+        _worker = NativeWorker([high_queue, default_queue, low_queue], num_threads=num_threads, backend=backend)
 
         # Start worker in background thread
         worker_thread = threading.Thread(target=_worker.work, daemon=True)
         worker_thread.start()
 
-        logger.info(f"Started native worker with {num_threads} threads")
+        # Expire old job rows and compact jobs.db in the background.
+        import native_maintenance
+        native_maintenance.start_scheduler()
+
+        logger.info(
+            f"Started native worker with {_worker.num_threads} threads ({_worker.backend} backend), "
+            f"up to {_worker.scheduler.max_jobs} concurrent jobs"
+        )
 
     return _worker
 
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""Retention and compaction for jobs.db: expire finished job rows, cap the table, vacuum incrementally."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import native_fingerprint
+import native_storage
+from native_job_queue import TERMINAL_STATES, get_job_cache
+
+logger = logging.getLogger(__name__)
+
+JOB_TTL_HOURS_ENV = "XCAPTION_JOB_TTL_HOURS"
+JOB_MAX_ROWS_ENV = "XCAPTION_JOB_MAX_ROWS"
+MAINTENANCE_INTERVAL_ENV = "XCAPTION_MAINTENANCE_INTERVAL_MINUTES"
+
+DEFAULT_JOB_TTL_HOURS = 24 * 7
+DEFAULT_JOB_MAX_ROWS = 1000
+DEFAULT_MAINTENANCE_INTERVAL_MINUTES = 60
+# Let startup (recovery, model warm-up) finish before the first pass.
+_FIRST_RUN_DELAY_SECONDS = 120
+# Pages released per incremental_vacuum call; small steps keep the write lock short.
+_VACUUM_STEP_PAGES = 2048
+_DELETE_BATCH = 500
+
+# Tables keyed by job_id that go with a jobs row.
+_JOB_TABLES = ("job_progress", "job_checkpoints", "jobs")
+
+_maintenance_lock = threading.Lock()
+_last_report: Optional[Dict[str, Any]] = None
+_scheduler_thread: Optional[threading.Thread] = None
+_stop_event = threading.Event()
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name) or default)
+    except (TypeError, ValueError):
+        return default
+
+
+def retention_settings() -> Dict[str, Any]:
+    return {
+        "job_ttl_hours": _env_number(JOB_TTL_HOURS_ENV, DEFAULT_JOB_TTL_HOURS),
+        "job_max_rows": int(_env_number(JOB_MAX_ROWS_ENV, DEFAULT_JOB_MAX_ROWS)),
+        "interval_minutes": _env_number(MAINTENANCE_INTERVAL_ENV, DEFAULT_MAINTENANCE_INTERVAL_MINUTES),
+    }
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def database_stats(db_path: Optional[Union[str, Path]] = None) -> Dict[str, Any]:
+    """Size of jobs.db (including its WAL) and how much of it is free pages."""
+    path = Path(db_path or native_storage.default_db_path())
+    conn = native_storage.connect(path)
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    tables = {}
+    for table in ("jobs", "job_records", "media_hashes"):
+        try:
+            tables[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        except Exception:
+            continue
+    db_bytes = _file_size(path)
+    wal_bytes = _file_size(path.with_name(path.name + "-wal"))
+    return {
+        "path": str(path),
+        "size_bytes": db_bytes + wal_bytes,
+        "db_bytes": db_bytes,
+        "wal_bytes": wal_bytes,
+        "page_size": page_size,
+        "page_count": page_count,
+        "free_bytes": freelist * page_size,
+        "incremental_vacuum": auto_vacuum == 2,
+        "rows": tables,
+    }
+
+
+def expire_jobs(db_path: Optional[Union[str, Path]] = None, now: Optional[float] = None) -> List[str]:
+    """Delete finished jobs past their TTL, then the oldest ones beyond the row cap.
+
+    A job's own ``result_ttl`` (seconds) overrides the default TTL; ``-1``
+    keeps it until the row cap pushes it out. Queued and running jobs are
+    never removed. Transcripts live on in ``job_records``.
+    """
+    settings = retention_settings()
+    now = time.time() if now is None else now
+    states = tuple(sorted(TERMINAL_STATES))
+    placeholders = ", ".join("?" for _ in states)
+    conn = native_storage.connect(db_path)
+
+    expired: List[str] = []
+    if settings["job_ttl_hours"] > 0:
+        cutoff = now - settings["job_ttl_hours"] * 3600
+        expired.extend(row[0] for row in conn.execute(
+            f"""
+            SELECT job_id FROM jobs
+            WHERE status IN ({placeholders})
+              AND (
+                (result_ttl IS NULL AND COALESCE(ended_at, created_at) < ?)
+                OR (result_ttl >= 0 AND COALESCE(ended_at, created_at) + result_ttl < ?)
+              )
+            """,
+            (*states, cutoff, now),
+        ))
+
+    max_rows = settings["job_max_rows"]
+    if max_rows > 0:
+        total = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] - len(expired)
+        if total > max_rows:
+            already = set(expired)
+            for (job_id,) in conn.execute(
+                f"""
+                SELECT job_id FROM jobs
+                WHERE status IN ({placeholders})
+                ORDER BY COALESCE(ended_at, created_at)
+                """,
+                states,
+            ):
+                if total <= max_rows:
+                    break
+                if job_id not in already:
+                    expired.append(job_id)
+                    total -= 1
+
+    for start in range(0, len(expired), _DELETE_BATCH):
+        batch = expired[start:start + _DELETE_BATCH]
+        marks = ", ".join("?" for _ in batch)
+        with native_storage.transaction(db_path) as write_conn:
+            for table in _JOB_TABLES:
+                try:
+                    write_conn.execute(f"DELETE FROM {table} WHERE job_id IN ({marks})", batch)
+                except Exception as exc:
+                    # job_checkpoints only exists once a job has checkpointed.
+                    logger.debug("Skipping retention for %s: %s", table, exc)
+
+    cache = get_job_cache()
+    for job_id in expired:
+        cache.discard(job_id)
+    return expired
+
+
+def _compact(db_path: Optional[Union[str, Path]], full: bool) -> str:
+    """Hand free pages back to the filesystem; returns how (``full``, ``incremental`` or ``skipped``)."""
+    conn = native_storage.connect(db_path)
+    incremental = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    if full:
+        # auto_vacuum only changes on a full VACUUM, which rewrites the whole
+        # file under the write lock, so it runs only when explicitly asked
+        # for. Afterwards free pages go back in small steps.
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        mode = "full"
+    elif incremental:
+        while conn.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+            conn.execute(f"PRAGMA incremental_vacuum({_VACUUM_STEP_PAGES})").fetchall()
+        mode = "incremental"
+    else:
+        mode = "skipped"
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    return mode
+
+
+def run_maintenance(db_path: Optional[Union[str, Path]] = None, *, full: bool = False) -> Dict[str, Any]:
+    """Apply retention and compact jobs.db; returns sizes before/after and bytes reclaimed."""
+    global _last_report
+    with _maintenance_lock:
+        started = time.time()
+        before = database_stats(db_path)
+        expired = expire_jobs(db_path, now=started)
+        pruned_hashes = native_fingerprint.prune()
+        try:
+            compaction = _compact(db_path, full)
+        except Exception as exc:
+            logger.warning("jobs.db compaction failed: %s", exc)
+            compaction = "failed"
+        after = database_stats(db_path)
+        report = {
+            "ran_at": started,
+            "duration_seconds": round(time.time() - started, 3),
+            "expired_jobs": len(expired),
+            "pruned_hashes": pruned_hashes,
+            "compaction": compaction,
+            "size_before_bytes": before["size_bytes"],
+            "size_after_bytes": after["size_bytes"],
+            "reclaimed_bytes": max(0, before["size_bytes"] - after["size_bytes"]),
+            "database": after,
+        }
+        _last_report = report
+    logger.info(
+        "jobs.db maintenance: expired %s jobs, %s -> %s bytes",
+        report["expired_jobs"],
+        report["size_before_bytes"],
+        report["size_after_bytes"],
+    )
+    return report
+
+
+def last_report() -> Optional[Dict[str, Any]]:
+    return _last_report
+
+
+def _maintenance_loop(interval_seconds: float) -> None:
+    delay = min(_FIRST_RUN_DELAY_SECONDS, interval_seconds)
+    while not _stop_event.wait(delay):
+        try:
+            run_maintenance()
+        except Exception as exc:
+            logger.warning("Scheduled jobs.db maintenance failed: %s", exc)
+        finally:
+            native_storage.close_thread_connections()
+        delay = interval_seconds
+
+
+def start_scheduler() -> Optional[threading.Thread]:
+    """Run maintenance in the background every ``XCAPTION_MAINTENANCE_INTERVAL_MINUTES`` (0 disables)."""
+    global _scheduler_thread
+    interval_minutes = retention_settings()["interval_minutes"]
+    if interval_minutes <= 0:
+        return None
+    if _scheduler_thread is None or not _scheduler_thread.is_alive():
+        _stop_event.clear()
+        _scheduler_thread = threading.Thread(
+            target=_maintenance_loop,
+            args=(interval_minutes * 60,),
+            name="jobs-db-maintenance",
+            daemon=True,
+        )
+        _scheduler_thread.start()
+    return _scheduler_thread
+
+
+def stop_scheduler() -> None:
+    _stop_event.set()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""Run queued jobs in worker processes so they never share the Flask process's GIL."""
+from __future__ import annotations
+
+import importlib
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+
+import native_cancellation
+import native_resources
+
+logger = logging.getLogger(__name__)
+
+JOB_BACKEND_ENV = "XCAPTION_JOB_BACKEND"
+BACKEND_THREAD = "thread"
+BACKEND_PROCESS = "process"
+
+# How long a canceled job may take to wind down before its process is killed.
+_CANCEL_GRACE_SECONDS = 5.0
+_POLL_SECONDS = 0.5
+
+
+class WorkerProcessError(RuntimeError):
+    """A job raised inside its worker process; carries the remote traceback."""
+
+
+class WorkerProcessCrashed(RuntimeError):
+    """The worker process died while running a job."""
+
+
+def job_backend() -> str:
+    value = (os.environ.get(JOB_BACKEND_ENV) or BACKEND_THREAD).strip().lower()
+    return BACKEND_PROCESS if value in {"process", "processes", "pool"} else BACKEND_THREAD
+
+
+def can_run_in_process(func_name: Optional[str]) -> bool:
+    """Only importable module-level callables can be resolved in a fresh process."""
+    if not func_name or "." not in func_name or "<" in func_name:
+        return False
+    return not func_name.startswith("__main__.")
+
+
+# ---------------------------------------------------------------------------
+# Child side
+# ---------------------------------------------------------------------------
+
+
+def _slot_main(conn) -> None:
+    """Entry point of a worker process: run jobs sent over *conn* one at a time."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    import native_job_queue
+
+    # Interrupted-job recovery belongs to the parent; a child must never reset
+    # the job it is running back to queued.
+    native_job_queue._in_worker_process = True
+
+    send_lock = threading.Lock()
+
+    def send(message: tuple) -> None:
+        with send_lock:
+            conn.send(message)
+
+    import native_job_handlers
+
+    def forward_progress(job_id: str, progress: int, message: str, extra_data: Optional[Dict[str, Any]] = None):
+        send(("progress", job_id, progress, message, extra_data))
+
+    native_job_handlers.update_job_progress = forward_progress
+
+    tasks: "queue.Queue[Optional[tuple]]" = queue.Queue()
+    running: Dict[str, Optional[str]] = {"job_id": None}
+
+    def reader() -> None:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                # The parent went away: kill the running job's children and exit.
+                if running["job_id"]:
+                    native_cancellation.cancel_job(running["job_id"])
+                os._exit(0)
+            if message[0] == "cancel":
+                native_cancellation.cancel_job(message[1])
+            elif message[0] == "stop":
+                tasks.put(None)
+                return
+            else:
+                tasks.put(message[1:])
+
+    threading.Thread(target=reader, name="job-slot-reader", daemon=True).start()
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job_id, func_name, kwargs, resources = task
+        # Use the core share and memory cap the parent's scheduler decided on.
+        scheduler = native_resources.get_scheduler()
+        scheduler.job_memory_limit_mb = resources.get("job_memory_limit_mb")
+        scheduler.assign(job_id, cores=resources.get("cores"))
+        token = native_cancellation.begin(job_id)
+        running["job_id"] = job_id
+        try:
+            module_name, attr_name = func_name.rsplit(".", 1)
+            func = getattr(importlib.import_module(module_name), attr_name)
+            with native_cancellation.bind(token):
+                result = func(**kwargs)
+            token.check()
+            send(("done", job_id, result))
+        except BaseException:
+            send(("failed", job_id, traceback.format_exc(), token.canceled))
+        finally:
+            running["job_id"] = None
+            native_cancellation.end(job_id, token)
+            scheduler.unassign(job_id)
+
+
+# ---------------------------------------------------------------------------
+# Parent side
+# ---------------------------------------------------------------------------
+
+
+class _ProcessSlot:
+    """One worker process, owned by one worker thread."""
+
+    def __init__(self, ctx, index: int):
+        self._ctx = ctx
+        self.index = index
+        self._lock = threading.Lock()
+        self._process = None
+        self._conn = None
+        self._job_id: Optional[str] = None
+
+    def _start(self) -> None:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_slot_main,
+            args=(child_conn,),
+            name=f"x-caption-job-{self.index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        self._process, self._conn = process, parent_conn
+        logger.info("Started job worker process %s (pid %s)", self.index, process.pid)
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._process is None or not self._process.is_alive():
+                self._start()
+
+    def restart(self) -> None:
+        with self._lock:
+            self._terminate()
+            self._start()
+
+    def _terminate(self) -> None:
+        process, conn = self._process, self._conn
+        self._process = self._conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        if process is not None and process.is_alive():
+            process.kill()
+            process.join(timeout=5)
+
+    def run(
+        self,
+        job_id: str,
+        func_name: str,
+        kwargs: Dict[str, Any],
+        on_progress: Callable[[str, int, str, Optional[Dict[str, Any]]], None],
+        resources: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        self._ensure_started()
+        token = native_cancellation.current()
+        cancel = lambda: self.cancel(job_id)  # noqa: E731
+        if token is not None:
+            token.add_callback(cancel)
+        self._job_id = job_id
+        try:
+            self._conn.send(("run", job_id, func_name, kwargs, resources or {}))
+            while True:
+                try:
+                    ready = self._conn.poll(_POLL_SECONDS)
+                    message = self._conn.recv() if ready else None
+                except (EOFError, OSError):
+                    # The pipe closed: the process is gone or going.
+                    message = None
+                    ready = True
+                if message is None:
+                    if ready or not self._process.is_alive():
+                        break
+                    continue
+                kind = message[0]
+                if kind == "progress":
+                    _, progress_job, progress, text, extra = message
+                    try:
+                        on_progress(progress_job, progress, text, extra)
+                    except Exception as exc:
+                        logger.debug("Failed to relay progress for %s: %s", progress_job, exc)
+                elif kind == "done":
+                    return message[2]
+                elif kind == "failed":
+                    _, _, remote_traceback, canceled = message
+                    if canceled or (token is not None and token.canceled):
+                        raise native_cancellation.JobCanceled(job_id)
+                    raise WorkerProcessError(remote_traceback.rstrip())
+        finally:
+            self._job_id = None
+            if token is not None:
+                token.remove_callback(cancel)
+
+        # The process died underneath the job (crash, OOM kill or forced cancel).
+        exitcode = None
+        if self._process is not None:
+            self._process.join(timeout=1)
+            exitcode = self._process.exitcode
+        self.restart()
+        if token is not None and token.canceled:
+            raise native_cancellation.JobCanceled(job_id)
+        raise WorkerProcessCrashed(f"Job worker process exited unexpectedly (exit code {exitcode})")
+
+    def cancel(self, job_id: str) -> None:
+        """Ask the child to cancel *job_id*; kill the process if it does not stop in time."""
+        with self._lock:
+            conn = self._conn
+        if conn is None:
+            return
+        try:
+            conn.send(("cancel", job_id))
+        except Exception:
+            pass
+        timer = threading.Timer(_CANCEL_GRACE_SECONDS, self._kill_if_running, args=(job_id,))
+        timer.daemon = True
+        timer.start()
+
+    def _kill_if_running(self, job_id: str) -> None:
+        if self._job_id != job_id:
+            return
+        process = self._process
+        if process is not None and process.is_alive():
+            logger.warning("Job %s ignored cancellation; killing worker process %s", job_id, process.pid)
+            process.kill()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.send(("stop",))
+                except Exception:
+                    pass
+            process = self._process
+        if process is not None:
+            process.join(timeout=2)
+        with self._lock:
+            self._terminate()
+
+
+class ProcessJobPool:
+    """A fixed set of worker processes, one per worker thread.
+
+    Each worker thread drives its own process, so a crash or forced kill only
+    affects the job that was running there; the process is replaced before the
+    next job.
+    """
+
+    def __init__(self, size: int):
+        ctx = multiprocessing.get_context("spawn")
+        self._slots: List[_ProcessSlot] = [_ProcessSlot(ctx, index) for index in range(max(1, size))]
+
+    def run(
+        self,
+        worker_id: int,
+        job_id: str,
+        func_name: str,
+        kwargs: Dict[str, Any],
+        cores: Optional[int] = None,
+    ) -> Any:
+        import native_job_handlers
+
+        slot = self._slots[worker_id % len(self._slots)]
+        # Resolve at call time so the web server's patched (event-emitting) version is used.
+        return slot.run(
+            job_id,
+            func_name,
+            kwargs,
+            lambda *args: native_job_handlers.update_job_progress(*args),
+            {
+                "cores": cores,
+                "job_memory_limit_mb": native_resources.get_scheduler().job_memory_limit_mb,
+            },
+        )
+
+    def shutdown(self) -> None:
+        for slot in self._slots:
+            slot.stop()
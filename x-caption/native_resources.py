@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""CPU/memory-aware admission control for transcription jobs and their engine threads."""
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import sys
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+CPU_CORES_ENV = "XCAPTION_CPU_CORES"
+MAX_JOBS_ENV = "XCAPTION_MAX_CONCURRENT_JOBS"
+THREADS_PER_JOB_ENV = "XCAPTION_THREADS_PER_JOB"
+JOB_MEMORY_LIMIT_ENV = "XCAPTION_JOB_MEMORY_LIMIT_MB"
+IO_WORKERS_ENV = "XCAPTION_IO_WORKERS"
+
+# Below this many cores per job, whisper.cpp spends more time waiting than decoding.
+_MIN_CORES_PER_JOB = 4
+# Rough resident size of one job: model weights, decoder state and audio buffers.
+_JOB_MEMORY_ESTIMATE_MB = 1500
+_MEMORY_HEADROOM = 0.75
+_MAX_WORKER_SLOTS = 16
+# ffmpeg and disk stages are I/O bound; a couple of them keep the next jobs ready.
+_DEFAULT_IO_WORKERS = 2
+
+
+def _env_int(name: str) -> Optional[int]:
+    try:
+        value = int(os.environ.get(name) or 0)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def detect_cpu_cores() -> int:
+    override = _env_int(CPU_CORES_ENV)
+    if override:
+        return override
+    if hasattr(os, "sched_getaffinity"):
+        try:
+            return max(1, len(os.sched_getaffinity(0)))
+        except OSError:
+            pass
+    return max(1, os.cpu_count() or 1)
+
+
+def detect_memory_mb() -> Optional[int]:
+    """Total physical memory in MiB, or ``None`` when it cannot be determined."""
+    if sys.platform == "win32":
+        try:
+            import ctypes
+
+            class _MemoryStatus(ctypes.Structure):
+                _fields_ = [
+                    ("dwLength", ctypes.c_ulong),
+                    ("dwMemoryLoad", ctypes.c_ulong),
+                    ("ullTotalPhys", ctypes.c_ulonglong),
+                    ("ullAvailPhys", ctypes.c_ulonglong),
+                    ("ullTotalPageFile", ctypes.c_ulonglong),
+                    ("ullAvailPageFile", ctypes.c_ulonglong),
+                    ("ullTotalVirtual", ctypes.c_ulonglong),
+                    ("ullAvailVirtual", ctypes.c_ulonglong),
+                    ("sullAvailExtendedVirtual", ctypes.c_ulonglong),
+                ]
+
+            status = _MemoryStatus()
+            status.dwLength = ctypes.sizeof(_MemoryStatus)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return int(status.ullTotalPhys // (1024 * 1024))
+        except Exception:
+            return None
+        return None
+    try:
+        return int(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024))
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+class ResourceScheduler:
+    """Decides how many jobs run at once and how many engine threads each one gets.
+
+    Worker threads call :meth:`acquire` before taking a job, so lowering
+    ``max_jobs`` at runtime takes effect as running jobs finish. Each admitted
+    job gets a share of the cores sized to the work in flight: a job running
+    alone uses the whole machine, a busy queue splits it evenly.
+
+    Staged jobs hold one of the ``max_jobs`` inference slots only while they
+    decode, so up to ``io_workers`` more jobs may be admitted to prepare their
+    audio in the meantime.
+    """
+
+    def __init__(self, cores: Optional[int] = None, memory_mb: Optional[int] = None):
+        self.cores = cores or detect_cpu_cores()
+        self.memory_mb = memory_mb if memory_mb is not None else detect_memory_mb()
+        self.worker_slots = max(2, min(_MAX_WORKER_SLOTS, self.cores // 2))
+        self._condition = threading.Condition()
+        self._running: Dict[str, int] = {}
+        self._active = 0
+        self._inferring = 0
+        self._inference_waiters: Deque[object] = deque()
+        self.max_jobs = self._clamp_jobs(_env_int(MAX_JOBS_ENV) or self.recommended_jobs())
+        self.threads_per_job: Optional[int] = _env_int(THREADS_PER_JOB_ENV)
+        self.job_memory_limit_mb: Optional[int] = _env_int(JOB_MEMORY_LIMIT_ENV)
+        self.io_workers = _env_int(IO_WORKERS_ENV) or _DEFAULT_IO_WORKERS
+
+    def recommended_jobs(self) -> int:
+        by_cpu = max(1, self.cores // _MIN_CORES_PER_JOB)
+        if self.memory_mb:
+            by_memory = max(1, int(self.memory_mb * _MEMORY_HEADROOM) // _JOB_MEMORY_ESTIMATE_MB)
+            return min(by_cpu, by_memory)
+        return by_cpu
+
+    def _clamp_jobs(self, value: int) -> int:
+        return max(1, min(int(value), self.worker_slots))
+
+    # -- admission ---------------------------------------------------------
+
+    def acquire(self, should_stop: Optional[Callable[[], bool]] = None, lookahead: int = 0) -> bool:
+        """Block until another job may start; returns ``False`` if *should_stop* fires first.
+
+        *lookahead* admits that many jobs beyond ``max_jobs`` so they can run
+        their preparation stages while the others decode.
+        """
+        with self._condition:
+            while self._active >= self.max_jobs + max(0, lookahead):
+                if should_stop and should_stop():
+                    return False
+                self._condition.wait(timeout=1.0)
+            self._active += 1
+            return True
+
+    def release(self) -> None:
+        with self._condition:
+            self._active = max(0, self._active - 1)
+            self._condition.notify_all()
+
+    def wake_all(self) -> None:
+        with self._condition:
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def inference_slot(self, check: Optional[Callable[[], None]] = None) -> Iterator[None]:
+        """Hold one of the ``max_jobs`` inference slots; *check* may raise to stop waiting.
+
+        Slots are granted in arrival order, so jobs reach the engine in the
+        order they finished preparing.
+        """
+        ticket = object()
+        with self._condition:
+            self._inference_waiters.append(ticket)
+            try:
+                while self._inferring >= self.max_jobs or self._inference_waiters[0] is not ticket:
+                    if check:
+                        check()
+                    self._condition.wait(timeout=1.0)
+            finally:
+                self._inference_waiters.remove(ticket)
+                self._condition.notify_all()
+            self._inferring += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._inferring = max(0, self._inferring - 1)
+                self._condition.notify_all()
+
+    # -- per-job core shares -------------------------------------------------
+
+    def assign(self, job_id: str, queued: int = 0, cores: Optional[int] = None) -> int:
+        """Give *job_id* its core share (or record one decided by another process)."""
+        with self._condition:
+            if cores is None:
+                if self.threads_per_job:
+                    cores = self.threads_per_job
+                else:
+                    in_flight = min(self.max_jobs, len(self._running) + 1 + max(0, queued))
+                    cores = max(1, self.cores // max(1, in_flight))
+            self._running[job_id] = max(1, int(cores))
+            return self._running[job_id]
+
+    def unassign(self, job_id: str) -> None:
+        with self._condition:
+            self._running.pop(job_id, None)
+
+    def job_cores(self, job_id: Optional[str] = None) -> int:
+        """Cores this job may use across all of its engine processes."""
+        with self._condition:
+            if job_id and job_id in self._running:
+                return self._running[job_id]
+            if self.threads_per_job:
+                return self.threads_per_job
+            return max(1, self.cores // self.max_jobs)
+
+    # -- runtime API ---------------------------------------------------------
+
+    def configure(
+        self,
+        *,
+        max_jobs: Optional[int] = None,
+        threads_per_job: Optional[int] = None,
+        job_memory_limit_mb: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Change limits at runtime; ``0`` resets a value to automatic/unlimited."""
+        with self._condition:
+            if max_jobs is not None:
+                self.max_jobs = self._clamp_jobs(max_jobs) if max_jobs > 0 else self._clamp_jobs(self.recommended_jobs())
+            if threads_per_job is not None:
+                self.threads_per_job = max(1, min(int(threads_per_job), self.cores)) if threads_per_job > 0 else None
+            if job_memory_limit_mb is not None:
+                self.job_memory_limit_mb = int(job_memory_limit_mb) if job_memory_limit_mb > 0 else None
+            self._condition.notify_all()
+        logger.info(
+            "Resource limits updated: max_jobs=%s threads_per_job=%s job_memory_limit_mb=%s",
+            self.max_jobs,
+            self.threads_per_job or "auto",
+            self.job_memory_limit_mb or "unlimited",
+        )
+        return self.snapshot()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "cores": self.cores,
+                "memory_mb": self.memory_mb,
+                "worker_slots": self.worker_slots,
+                "max_jobs": self.max_jobs,
+                "recommended_jobs": self.recommended_jobs(),
+                "threads_per_job": self.threads_per_job,
+                "job_memory_limit_mb": self.job_memory_limit_mb,
+                "memory_limits_supported": memory_limits_supported(),
+                "io_workers": self.io_workers,
+                "running_jobs": self._active,
+                "inferring_jobs": self._inferring,
+                "allocations": dict(self._running),
+            }
+
+
+_scheduler: Optional[ResourceScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> ResourceScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ResourceScheduler()
+        return _scheduler
+
+
+def job_cores(job_id: Optional[str] = None) -> int:
+    return get_scheduler().job_cores(job_id)
+
+
+# -- RLIMIT memory caps ------------------------------------------------------
+
+
+def memory_limits_supported() -> bool:
+    # macOS accepts RLIMIT_AS but does not enforce it; Windows has no rlimits.
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        import resource  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def memory_limit_preexec() -> Optional[Callable[[], None]]:
+    """A ``preexec_fn`` that caps a job child's address space before it execs (Linux only).
+
+    Set in the child, the limit is in force from the first allocation; returns
+    ``None`` when no limit is configured.
+    """
+    limit_mb = get_scheduler().job_memory_limit_mb
+    if not limit_mb or not memory_limits_supported():
+        return None
+    import resource
+
+    limit = int(limit_mb) * 1024 * 1024
+
+    def _apply() -> None:
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (OSError, ValueError):
+            # Never fail the exec over the cap (e.g. a lower hard limit is already set).
+            pass
+
+    return _apply
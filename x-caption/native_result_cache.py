@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""Content-addressed cache of finished transcriptions stored in the queue database."""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+import native_cancellation
+import native_fingerprint
+import native_storage
+from native_config import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_MB_ENV = "XCAPTION_RESULT_CACHE_MAX_MB"
+DEFAULT_CACHE_MAX_MB = 256
+CACHE_SCHEMA_VERSION = 2
+
+# Fields that describe where a particular job ran rather than what it produced.
+_JOB_SPECIFIC_FIELDS = (
+    "job_id",
+    "file_path",
+    "original_audio_path",
+    "normalized_audio_path",
+    "audio_was_transcoded",
+    "transcription_time",
+    "total_processing_time",
+)
+
+# How often a caller waiting on another job's result checks for cancellation.
+_FOLLOWER_POLL_SECONDS = 1.0
+
+_inflight: Dict[str, threading.Event] = {}
+_inflight_lock = threading.Lock()
+
+
+def _db_path() -> Path:
+    return get_data_dir() / "jobs.db"
+
+
+def _migrate_create_cache(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS result_cache (
+            cache_key TEXT PRIMARY KEY,
+            result_json TEXT NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            created_at REAL,
+            last_used_at REAL,
+            hits INTEGER DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_result_cache_last_used
+        ON result_cache(last_used_at)
+        """
+    )
+
+
+_MIGRATIONS = (_migrate_create_cache,)
+
+
+def _connect() -> sqlite3.Connection:
+    native_storage.migrate("result_cache", _MIGRATIONS, _db_path())
+    return native_storage.connect(_db_path())
+
+
+@contextlib.contextmanager
+def _transaction() -> Iterator[sqlite3.Connection]:
+    _connect()
+    with native_storage.transaction(_db_path()) as conn:
+        yield conn
+
+
+def _max_bytes() -> int:
+    try:
+        megabytes = float(os.environ.get(CACHE_MAX_MB_ENV) or DEFAULT_CACHE_MAX_MB)
+    except (TypeError, ValueError):
+        megabytes = DEFAULT_CACHE_MAX_MB
+    return max(0, int(megabytes * 1024 * 1024))
+
+
+def file_digest(path: Optional[Path]) -> Optional[str]:
+    """Return a SHA-256 of *path*, kept in the persistent hash cache while the file is unchanged."""
+    if not path:
+        return None
+    return native_fingerprint.sha256(path)
+
+
+def _engine_version(engine: Optional[Path]) -> Optional[str]:
+    if not engine:
+        return None
+    try:
+        stat = Path(engine).stat()
+    except OSError:
+        return None
+    return f"{Path(engine).name}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def build_cache_key(
+    *,
+    media_hash: Optional[str],
+    model_path: Optional[str],
+    language: Optional[str],
+    second_caption_language: Optional[str],
+    chinese_style: Optional[str],
+    noise_backend: Optional[str],
+    steering_mode: Optional[str] = None,
+    vad_filter: bool = True,
+) -> Optional[str]:
+    """Return the cache key for a job, or ``None`` when it cannot be cached."""
+    if not media_hash:
+        return None
+    from whisper_cpp_runtime import resolve_whisper_engine, resolve_whisper_model
+
+    model_sha = file_digest(resolve_whisper_model(model_path))
+    engine_version = _engine_version(resolve_whisper_engine())
+    if not model_sha or not engine_version:
+        return None
+    fields = {
+        "schema": CACHE_SCHEMA_VERSION,
+        "media_hash": media_hash,
+        "model_sha": model_sha,
+        "language": (language or "auto").strip().lower(),
+        "second_caption_language": (second_caption_language or "").strip().lower() or None,
+        "chinese_style": (chinese_style or "").strip().lower() or None,
+        "noise_backend": (noise_backend or "none").strip().lower(),
+        "steering_mode": (steering_mode or "audio").strip().lower(),
+        "vad_filter": bool(vad_filter),
+        "engine_version": engine_version,
+    }
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def lookup(cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not cache_key:
+        return None
+    try:
+        row = _connect().execute(
+            "SELECT result_json FROM result_cache WHERE cache_key = ?",
+            (cache_key,),
+        ).fetchone()
+        if not row:
+            return None
+        with _transaction() as conn:
+            conn.execute(
+                "UPDATE result_cache SET last_used_at = ?, hits = hits + 1 WHERE cache_key = ?",
+                (time.time(), cache_key),
+            )
+        return json.loads(row[0])
+    except Exception as exc:
+        logger.debug("Result cache lookup failed: %s", exc)
+        return None
+
+
+def store(cache_key: Optional[str], result: Dict[str, Any]) -> None:
+    if not cache_key or not isinstance(result, dict):
+        return
+    payload = {key: value for key, value in result.items() if key not in _JOB_SPECIFIC_FIELDS}
+    try:
+        serialized = json.dumps(payload, ensure_ascii=False)
+    except Exception as exc:
+        logger.debug("Result cache skipped unserializable result: %s", exc)
+        return
+    size_bytes = len(serialized.encode("utf-8"))
+    max_bytes = _max_bytes()
+    if size_bytes > max_bytes:
+        return
+    now = time.time()
+    try:
+        with _transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO result_cache (cache_key, result_json, size_bytes, created_at, last_used_at, hits)
+                VALUES (?, ?, ?, ?, ?, 0)
+                ON CONFLICT(cache_key) DO UPDATE SET
+                    result_json=excluded.result_json,
+                    size_bytes=excluded.size_bytes,
+                    last_used_at=excluded.last_used_at
+                """,
+                (cache_key, serialized, size_bytes, now, now),
+            )
+            _evict(conn, max_bytes)
+    except Exception as exc:
+        logger.warning("Failed to store cached transcription: %s", exc)
+
+
+def _evict(conn: sqlite3.Connection, max_bytes: int) -> int:
+    """Drop least recently used entries until the cache fits in *max_bytes*."""
+    total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM result_cache").fetchone()[0]
+    if total <= max_bytes:
+        return 0
+    removed = 0
+    rows = conn.execute(
+        "SELECT cache_key, size_bytes FROM result_cache ORDER BY last_used_at ASC"
+    ).fetchall()
+    for cache_key, size_bytes in rows:
+        if total <= max_bytes:
+            break
+        conn.execute("DELETE FROM result_cache WHERE cache_key = ?", (cache_key,))
+        total -= int(size_bytes or 0)
+        removed += 1
+    return removed
+
+
+def purge() -> Dict[str, int]:
+    """Remove every cached transcription and report what was dropped."""
+    with _transaction() as conn:
+        entries, size_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM result_cache"
+        ).fetchone()
+        conn.execute("DELETE FROM result_cache")
+    return {"entries": int(entries), "bytes": int(size_bytes)}
+
+
+def stats() -> Dict[str, Any]:
+    entries, size_bytes, hits = _connect().execute(
+        "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0), COALESCE(SUM(hits), 0) FROM result_cache"
+    ).fetchone()
+    with _inflight_lock:
+        inflight = len(_inflight)
+    return {
+        "entries": int(entries),
+        "bytes": int(size_bytes),
+        "hits": int(hits),
+        "max_bytes": _max_bytes(),
+        "inflight": inflight,
+    }
+
+
+@contextlib.contextmanager
+def single_flight(cache_key: Optional[str]) -> Iterator[Optional[Dict[str, Any]]]:
+    """Yield a cached result, or ``None`` when the caller must compute and store it.
+
+    While one caller computes a key, other callers for the same key block here
+    and then receive the result it stored. A waiting caller whose job is
+    canceled raises :class:`native_cancellation.JobCanceled`, so its job
+    unwinds and hands back its worker slot instead of waiting out the leader.
+    """
+    if not cache_key:
+        yield None
+        return
+
+    while True:
+        with _inflight_lock:
+            event = _inflight.get(cache_key)
+            leader = event is None
+            if leader:
+                event = threading.Event()
+                _inflight[cache_key] = event
+        if leader:
+            break
+        while not event.wait(_FOLLOWER_POLL_SECONDS):
+            native_cancellation.check()
+        native_cancellation.check()
+
+    try:
+        # A previous leader for this key may have just stored its result.
+        yield lookup(cache_key)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(cache_key, None)
+        event.set()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Per-segment rows for stored transcripts, so a caption edit rewrites one row instead of the whole transcript."""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Segment keys that have their own columns; anything else (originalText,
+# words, speaker, ...) is kept as JSON in ``extra``.
+_COLUMN_FIELDS = ("id", "start", "end", "text")
+
+_SELECT_COLUMNS = "segment_id, start_time, end_time, text, extra"
+_INSERT_SQL = (
+    "INSERT OR REPLACE INTO segments (job_id, segment_id, start_time, end_time, text, extra) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+
+def create_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS segments (
+            job_id TEXT NOT NULL,
+            segment_id INTEGER NOT NULL,
+            start_time REAL NOT NULL,
+            end_time REAL NOT NULL,
+            text TEXT,
+            extra TEXT,
+            PRIMARY KEY (job_id, segment_id)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_segments_start
+        ON segments(job_id, start_time, segment_id)
+        """
+    )
+
+
+def segment_key(value: Any) -> Optional[int]:
+    """The integer id a client sent for a segment, or ``None`` if it is not one."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else None
+
+
+def split(transcript: Any) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Separate *transcript* into its segments and everything else.
+
+    Returns ``None`` when the segments cannot be stored as rows: no segment
+    list, ids that are not unique integers, or non-numeric times.
+    """
+    if not isinstance(transcript, dict) or not isinstance(transcript.get("segments"), list):
+        return None
+    segments = transcript["segments"]
+    seen = set()
+    for segment in segments:
+        if not isinstance(segment, dict):
+            return None
+        segment_id = segment.get("id")
+        if isinstance(segment_id, bool) or not isinstance(segment_id, int) or segment_id in seen:
+            return None
+        seen.add(segment_id)
+        try:
+            float(segment.get("start") or 0.0)
+            float(segment.get("end") or 0.0)
+        except (TypeError, ValueError):
+            return None
+    rest = {key: value for key, value in transcript.items() if key != "segments"}
+    return rest, segments
+
+
+def join_text(segments: List[Dict[str, Any]]) -> str:
+    return " ".join([segment.get("text", "") for segment in segments if segment.get("text")]).strip()
+
+
+def _to_row(job_id: str, segment: Dict[str, Any]) -> tuple:
+    extra = {key: value for key, value in segment.items() if key not in _COLUMN_FIELDS}
+    return (
+        job_id,
+        int(segment["id"]),
+        float(segment.get("start") or 0.0),
+        float(segment.get("end") or 0.0),
+        segment.get("text"),
+        json.dumps(extra, ensure_ascii=False) if extra else None,
+    )
+
+
+def _from_row(row: tuple) -> Dict[str, Any]:
+    segment_id, start, end, text, extra = row
+    segment: Dict[str, Any] = {"id": segment_id, "start": start, "end": end, "text": text}
+    if extra:
+        try:
+            segment.update(json.loads(extra))
+        except ValueError:
+            logger.debug("Ignoring unreadable extra fields of segment %s", segment_id)
+    return segment
+
+
+def replace(conn: sqlite3.Connection, job_id: str, segments: List[Dict[str, Any]]) -> None:
+    """Make *segments* the job's full set of rows."""
+    conn.execute("DELETE FROM segments WHERE job_id = ?", (job_id,))
+    if segments:
+        conn.executemany(_INSERT_SQL, [_to_row(job_id, segment) for segment in segments])
+
+
+def load(conn: sqlite3.Connection, job_id: str) -> List[Dict[str, Any]]:
+    rows = conn.execute(
+        f"SELECT {_SELECT_COLUMNS} FROM segments WHERE job_id = ? ORDER BY start_time, segment_id",
+        (job_id,),
+    ).fetchall()
+    return [_from_row(row) for row in rows]
+
+
+def get(conn: sqlite3.Connection, job_id: str, segment_id: int) -> Optional[Dict[str, Any]]:
+    row = conn.execute(
+        f"SELECT {_SELECT_COLUMNS} FROM segments WHERE job_id = ? AND segment_id = ?",
+        (job_id, segment_id),
+    ).fetchone()
+    return _from_row(row) if row else None
+
+
+def put(conn: sqlite3.Connection, job_id: str, segment: Dict[str, Any]) -> None:
+    """Insert or overwrite one segment row."""
+    conn.execute(_INSERT_SQL, _to_row(job_id, segment))
+
+
+def set_timing(conn: sqlite3.Connection, job_id: str, segment_id: int, start: float, end: float) -> bool:
+    cursor = conn.execute(
+        "UPDATE segments SET start_time = ?, end_time = ? WHERE job_id = ? AND segment_id = ?",
+        (start, end, job_id, segment_id),
+    )
+    return cursor.rowcount > 0
+
+
+def delete(conn: sqlite3.Connection, job_id: str, segment_id: int) -> bool:
+    cursor = conn.execute("DELETE FROM segments WHERE job_id = ? AND segment_id = ?", (job_id, segment_id))
+    return cursor.rowcount > 0
+
+
+def next_id(conn: sqlite3.Connection, job_id: str) -> int:
+    row = conn.execute("SELECT MAX(segment_id) FROM segments WHERE job_id = ?", (job_id,)).fetchone()
+    return max(0, row[0] or 0) + 1
+
+
+def clear(conn: sqlite3.Connection, job_id: str) -> None:
+    conn.execute("DELETE FROM segments WHERE job_id = ?", (job_id,))
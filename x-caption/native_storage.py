@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Shared SQLite access for jobs.db: WAL mode, per-thread connections, grouped writes and schema migrations."""
+from __future__ import annotations
+
+import contextlib
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Sequence, Set, Tuple, Union
+
+from native_config import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+BUSY_TIMEOUT_MS = 5000
+# Compiled statements kept per connection; every query in the app fits.
+STATEMENT_CACHE_SIZE = 256
+
+Migration = Callable[[sqlite3.Connection], None]
+
+_local = threading.local()
+_migrated: Set[Tuple[str, str]] = set()
+_migrate_lock = threading.Lock()
+
+
+def default_db_path() -> Path:
+    return get_data_dir() / "jobs.db"
+
+
+def _thread_state() -> Dict[str, Dict[str, object]]:
+    state = getattr(_local, "state", None)
+    if state is None:
+        state = {"connections": {}, "depths": {}}
+        _local.state = state
+    return state
+
+
+def _open(path: str) -> sqlite3.Connection:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000.0, cached_statements=STATEMENT_CACHE_SIZE)
+    try:
+        mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()
+        if not mode or str(mode[0]).lower() != "wal":
+            logger.debug("SQLite database %s is not in WAL mode (%s)", path, mode)
+    except sqlite3.OperationalError as exc:
+        # Another connection holding the database may briefly block the switch.
+        logger.debug("Could not enable WAL on %s: %s", path, exc)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def connect(db_path: Optional[Union[str, Path]] = None) -> sqlite3.Connection:
+    """Return this thread's pooled connection to *db_path* (``jobs.db`` by default)."""
+    path = str(db_path or default_db_path())
+    connections = _thread_state()["connections"]
+    conn = connections.get(path)
+    if conn is None:
+        conn = _open(path)
+        connections[path] = conn
+    return conn
+
+
+@contextlib.contextmanager
+def transaction(db_path: Optional[Union[str, Path]] = None) -> Iterator[sqlite3.Connection]:
+    """Run the enclosed writes as one short transaction.
+
+    Nested calls on the same thread join the outermost transaction, so a burst
+    of updates commits once. The write lock is taken up front (``BEGIN
+    IMMEDIATE``) so read-modify-write sequences never deadlock on upgrade.
+    """
+    path = str(db_path or default_db_path())
+    conn = connect(path)
+    depths = _thread_state()["depths"]
+    depth = depths.get(path, 0)
+    if depth == 0 and not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    depths[path] = depth + 1
+    try:
+        yield conn
+    except BaseException:
+        depths[path] = depth
+        if depth == 0 and conn.in_transaction:
+            conn.rollback()
+        raise
+    else:
+        depths[path] = depth
+        if depth == 0 and conn.in_transaction:
+            conn.commit()
+
+
+def close_thread_connections() -> None:
+    """Close every connection opened by the calling thread."""
+    state = _thread_state()
+    for conn in state["connections"].values():
+        with contextlib.suppress(Exception):
+            conn.close()
+    state["connections"].clear()
+    state["depths"].clear()
+
+
+def migrate(component: str, migrations: Sequence[Migration], db_path: Optional[Union[str, Path]] = None) -> None:
+    """Bring *component*'s tables up to version ``len(migrations)``.
+
+    ``migrations[i]`` upgrades from version ``i`` to ``i + 1``. Applied versions
+    are recorded in ``schema_versions``, so each step runs once per database,
+    and after the first call in a process this is a set lookup.
+    """
+    path = str(db_path or default_db_path())
+    key = (path, component)
+    if key in _migrated:
+        return
+    with _migrate_lock:
+        if key in _migrated:
+            return
+        with transaction(path) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_versions (
+                    component TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    updated_at REAL
+                )
+                """
+            )
+            row = conn.execute("SELECT version FROM schema_versions WHERE component = ?", (component,)).fetchone()
+            current = row[0] if row else 0
+            for version in range(current, len(migrations)):
+                migrations[version](conn)
+            if len(migrations) > current:
+                conn.execute(
+                    "INSERT OR REPLACE INTO schema_versions (component, version, updated_at) VALUES (?, ?, ?)",
+                    (component, len(migrations), time.time()),
+                )
+                logger.info("Migrated %s schema in %s from version %s to %s", component, path, current, len(migrations))
+        _migrated.add(key)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Energy/spectral-flatness voice activity detection used to skip long pauses before inference."""
+from __future__ import annotations
+
+import bisect
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import soundfile as sf
+
+logger = logging.getLogger(__name__)
+
+VAD_MIN_SILENCE_ENV = "XCAPTION_VAD_MIN_SILENCE_SECONDS"
+
+DEFAULT_MIN_SILENCE_SECONDS = 2.0
+_FRAME_SECONDS = 0.03
+_BLOCK_SECONDS = 30.0
+_PAD_SECONDS = 0.4
+_NOISE_FLOOR_PERCENTILE = 10.0
+_ENERGY_MARGIN_DB = 10.0
+_ENERGY_FLOOR_DB = -55.0
+_LOUD_MARGIN_DB = 15.0
+_FLATNESS_THRESHOLD = 0.45
+_MIN_REMOVED_SECONDS = 5.0
+_MIN_REMOVED_RATIO = 0.05
+_EPSILON = 1e-10
+_JOIN_TOLERANCE = 1e-3
+
+
+@dataclass(frozen=True)
+class KeptSpan:
+    """A stretch of source audio that survives VAD, placed on the compacted timeline."""
+
+    start: float
+    end: float
+    offset: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def min_silence_seconds() -> float:
+    try:
+        return max(0.5, float(os.environ.get(VAD_MIN_SILENCE_ENV) or DEFAULT_MIN_SILENCE_SECONDS))
+    except (TypeError, ValueError):
+        return DEFAULT_MIN_SILENCE_SECONDS
+
+
+def frame_features(path: Path, frame_seconds: float = _FRAME_SECONDS) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Return per-frame energy (dBFS), spectral flatness and the frame length in seconds."""
+    info = sf.info(str(path))
+    frame_len = max(1, int(round(info.samplerate * frame_seconds)))
+    block_len = frame_len * max(1, int(_BLOCK_SECONDS / frame_seconds))
+    window = np.hanning(frame_len).astype(np.float32)
+    energies: List[np.ndarray] = []
+    flatness: List[np.ndarray] = []
+    for block in sf.blocks(str(path), blocksize=block_len, dtype="float32", always_2d=True):
+        mono = block.mean(axis=1)
+        usable = (mono.shape[0] // frame_len) * frame_len
+        if usable == 0:
+            continue
+        frames = mono[:usable].reshape(-1, frame_len)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        energies.append(20.0 * np.log10(rms + _EPSILON))
+        power = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2 + _EPSILON
+        flatness.append(np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1))
+    seconds = frame_len / info.samplerate
+    if not energies:
+        empty = np.zeros(0, dtype=np.float32)
+        return empty, empty, seconds
+    return (
+        np.concatenate(energies).astype(np.float32),
+        np.concatenate(flatness).astype(np.float32),
+        seconds,
+    )
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """Return ``[start, end)`` index pairs for each run of ``True`` in *mask*."""
+    if mask.size == 0:
+        return []
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return list(zip(edges[0::2].tolist(), edges[1::2].tolist()))
+
+
+def detect_speech(path: Path, min_silence: Optional[float] = None) -> Optional[List[KeptSpan]]:
+    """Return the spans worth transcribing, or ``None`` when dropping pauses would not pay off."""
+    energies, flatness, frame_seconds = frame_features(path)
+    if energies.size == 0:
+        return None
+    total = energies.size * frame_seconds
+
+    noise_floor = float(np.percentile(energies, _NOISE_FLOOR_PERCENTILE))
+    threshold = max(noise_floor + _ENERGY_MARGIN_DB, _ENERGY_FLOOR_DB)
+    # Voiced speech is tonal (low flatness); very loud frames count regardless so
+    # fricatives and shouted words are never dropped.
+    speech = (energies > threshold) & (
+        (flatness < _FLATNESS_THRESHOLD) | (energies > threshold + _LOUD_MARGIN_DB)
+    )
+    if not speech.any():
+        return None
+
+    pad = int(round(_PAD_SECONDS / frame_seconds))
+    if pad:
+        speech = np.convolve(speech.astype(np.int8), np.ones(2 * pad + 1, dtype=np.int8), mode="same") > 0
+
+    min_frames = int(round((min_silence or min_silence_seconds()) / frame_seconds))
+    dropped = [(start, end) for start, end in _runs(~speech) if end - start >= min_frames]
+    removed = sum(end - start for start, end in dropped) * frame_seconds
+    if removed < max(_MIN_REMOVED_SECONDS, total * _MIN_REMOVED_RATIO):
+        return None
+
+    spans: List[KeptSpan] = []
+    cursor = 0
+    offset = 0.0
+    for start, end in [*dropped, (energies.size, energies.size)]:
+        if start > cursor:
+            span = KeptSpan(round(cursor * frame_seconds, 3), round(start * frame_seconds, 3), round(offset, 3))
+            spans.append(span)
+            offset += span.duration
+        cursor = end
+    if spans:
+        # Let the last span run to the real end of the file rather than the last full frame.
+        last = spans[-1]
+        if last.end >= (energies.size * frame_seconds) - 1e-6:
+            spans[-1] = KeptSpan(last.start, float(sf.info(str(path)).duration), last.offset)
+    return spans or None
+
+
+def write_compacted(source: Path, spans: Sequence[KeptSpan], output_path: Path) -> Path:
+    """Copy only *spans* of *source* into *output_path* (16-bit WAV, source rate and channels)."""
+    info = sf.info(str(source))
+    block_frames = int(info.samplerate * _BLOCK_SECONDS)
+    with sf.SoundFile(str(source)) as reader, sf.SoundFile(
+        str(output_path), "w", samplerate=info.samplerate, channels=info.channels, subtype="PCM_16", format="WAV"
+    ) as writer:
+        for span in spans:
+            start_frame = int(round(span.start * info.samplerate))
+            stop_frame = min(info.frames, int(round(span.end * info.samplerate)))
+            reader.seek(start_frame)
+            remaining = stop_frame - start_frame
+            while remaining > 0:
+                data = reader.read(min(block_frames, remaining), dtype="int16", always_2d=True)
+                if not len(data):
+                    break
+                writer.write(data)
+                remaining -= len(data)
+    return output_path
+
+
+def to_source_time(spans: Sequence[KeptSpan], value: float, *, is_end: bool = False) -> float:
+    """Map a time on the compacted timeline back onto the source timeline.
+
+    A time that falls exactly on a join belongs to the next span, unless it is
+    an end time, which stays with the span it closes.
+    """
+    if not spans:
+        return value
+    offsets = [span.offset for span in spans]
+    if is_end:
+        idx = max(0, bisect.bisect_left(offsets, value - _JOIN_TOLERANCE) - 1)
+    else:
+        idx = max(0, bisect.bisect_right(offsets, value + _JOIN_TOLERANCE) - 1)
+    span = spans[idx]
+    return span.start + min(max(0.0, value - span.offset), span.duration)
+
+
+def remap_segment(spans: Sequence[KeptSpan], segment: Dict[str, Any]) -> Dict[str, Any]:
+    updated = dict(segment)
+    updated["start"] = to_source_time(spans, float(segment.get("start", 0.0)))
+    updated["end"] = max(updated["start"], to_source_time(spans, float(segment.get("end", 0.0)), is_end=True))
+    words = segment.get("words")
+    if isinstance(words, list) and words:
+        remapped = []
+        for word in words:
+            if not isinstance(word, dict):
+                continue
+            new_word = dict(word)
+            if word.get("start") is not None:
+                new_word["start"] = to_source_time(spans, float(word["start"]))
+            if word.get("end") is not None:
+                new_word["end"] = to_source_time(spans, float(word["end"]), is_end=True)
+            remapped.append(new_word)
+        updated["words"] = remapped
+    return updated
+
+
+def remap_segments(spans: Sequence[KeptSpan], segments: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [remap_segment(spans, segment) for segment in segments]
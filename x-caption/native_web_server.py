@@ -27,6 +27,7 @@ import urllib.request
 from pathlib import Path
 from typing import Dict, Any, Optional, List, Callable
 from collections import defaultdict
+from datetime import datetime
 import threading
 
 try:
@@ -58,11 +59,18 @@ from native_config import (
 setup_environment()
 
 # Import native modules
-from native_job_queue import get_queue, start_worker
+from native_job_queue import find_job, get_dispatcher, get_queue, partial_result_delta, start_worker
+import native_cancellation
+import native_fingerprint
 import native_history
+import native_maintenance
+import native_result_cache
+import native_resources
+import native_storage
 from native_job_handlers import (
     process_full_pipeline_job,
     _prepare_audio_for_processing,
+    _steering_mode,
     _noise_suppression_backend,
     _normalized_audio_filename,
 )
@@ -78,7 +86,7 @@ from native_export_limits import (
 
 # Import model warmup event for readiness check
 from native_config import MODEL_WARMUP_EVENT
-from native_ffmpeg import setup_ffmpeg_environment, test_ffmpeg, get_ffmpeg_path
+from native_ffmpeg import setup_ffmpeg_environment, test_ffmpeg, get_ffmpeg_path, get_audio_duration
 
 # Configure logging
 logging.basicConfig(
@@ -978,16 +986,23 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def emit_update(room: str, event: str, data: Dict[str, Any]):
+def emit_update(room: str, event: str, data: Dict[str, Any], coalesce_key: Optional[str] = None):
     """
     Emulate socket.emit() by storing updates for polling
     room format: "job:job_id"
+
+    An update with a ``coalesce_key`` replaces the room's last unread update
+    when that one has the same key, so pollers get the latest state, not a backlog.
     """
     with job_update_lock:
+        pending = job_update_queues[room]
+        if coalesce_key is not None and pending and pending[-1].get('coalesce_key') == coalesce_key:
+            pending.pop()
         job_update_queues[room].append({
             'event': event,
             'data': data,
-            'timestamp': time.time()
+            'timestamp': time.time(),
+            'coalesce_key': coalesce_key,
         })
         # Keep only last 100 updates per job
         if len(job_update_queues[room]) > 100:
@@ -1004,8 +1019,10 @@ def publish_job_update(job_id: str, status: str, data: Dict[str, Any]):
             'timestamp': time.time(),
             'data': data
         }
-        emit_update(room, 'job_update', message)
-        logger.info(f"Published update for job {job_id}: {status}")
+        # Progress ticks of the same stage supersede each other until polled.
+        coalesce_key = f"progress:{data.get('stage')}" if status == 'progress' else None
+        emit_update(room, 'job_update', message, coalesce_key=coalesce_key)
+        logger.debug(f"Published update for job {job_id}: {status}")
     except Exception as e:
         logger.error(f"Failed to publish job update: {e}")
 
@@ -1380,6 +1397,22 @@ def _build_srt_text(segments: list[dict]) -> str:
     return "\n".join(blocks).strip()
 
 
+def _resolve_transcript_reference(result: Any) -> Optional[Dict[str, Any]]:
+    """Load the transcript a finished job's result stub points at.
+
+    Queue rows only keep a ``transcript_reference`` stub; returns ``None``
+    when the referenced record has no transcript.
+    """
+    if not isinstance(result, dict):
+        return None
+    reference = result.get("transcript")
+    if not isinstance(reference, dict):
+        # Rows written before results were stubbed carry the transcript itself.
+        return result if "segments" in result else None
+    record = native_history.get_job_record(reference.get("job_id")) if reference.get("job_id") else None
+    return record.get("transcript") if record else None
+
+
 def create_app():
     """Create and configure Flask application"""
 
@@ -1393,6 +1426,9 @@ def create_app():
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-x-caption-native')
     app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB max file size
 
+    # Apply pending schema migrations once, so requests only run their queries.
+    native_history.ensure_schema()
+
     # CORS support
     @app.after_request
     def after_request(response):
@@ -1404,6 +1440,12 @@ def create_app():
             response.headers['Vary'] = 'Origin'
         return response
 
+    # Request threads are short-lived: close the SQLite connections each one
+    # opened instead of leaving them to the garbage collector.
+    @app.teardown_appcontext
+    def close_db_connections(exc):
+        native_storage.close_thread_connections()
+
     # Health check endpoints
     @app.route('/health', methods=['GET'])
     def health_check():
@@ -1572,9 +1614,13 @@ def create_app():
 
     @app.route('/history', methods=['GET'])
     def history():
-        """Return persisted transcription history."""
+        """Return one page of persisted transcription history (``?limit=&cursor=``)."""
         try:
-            return jsonify({"jobs": native_history.load_history()}), 200
+            limit = request.args.get('limit', type=int) or native_history.HISTORY_PAGE_SIZE
+            jobs, next_cursor = native_history.load_history_page(limit, request.args.get('cursor') or None)
+            return jsonify({"jobs": jobs, "next_cursor": next_cursor}), 200
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
         except Exception as exc:
             logger.error("Failed to load job history: %s", exc)
             return jsonify({"error": "Failed to load history"}), 500
@@ -1874,35 +1920,20 @@ def create_app():
                     "success": False,
                     "error": "job_id, segment_id, and new_text are required"
                 }), 400
-            record = native_history.get_job_record(job_id)
-            transcription = record.get("transcript") if record else None
+            updated = native_history.edit_segment_text(job_id, segment_id, new_text)
 
-            if not transcription:
+            if updated is None:
                 return jsonify({
                     "success": False,
                     "error": "Transcription not found"
                 }), 404
 
-            segment_found = False
-            segments = transcription.get("segments") or []
-            for segment in segments:
-                if segment.get('id') == segment_id:
-                    segment['text'] = new_text
-                    segment['originalText'] = new_text
-                    segment_found = True
-                    break
-
-            if not segment_found:
+            if not updated:
                 return jsonify({
                     "success": False,
                     "error": f"Segment {segment_id} not found"
                 }), 404
 
-            full_text = " ".join([seg.get('text', '') for seg in segments if seg.get('text')])
-            transcription['text'] = full_text
-
-            native_history.update_job_transcript(job_id, transcription)
-
             logger.info("Updated segment %s in job %s", segment_id, job_id)
 
             return jsonify({
@@ -1950,31 +1981,19 @@ def create_app():
                     "error": "end must be greater than start"
                 }), 400
 
-            record = native_history.get_job_record(job_id)
-            transcription = record.get("transcript") if record else None
-            if not transcription:
+            updated = native_history.set_segment_timing(job_id, segment_id, start_val, end_val)
+            if updated is None:
                 return jsonify({
                     "success": False,
                     "error": "Transcription not found"
                 }), 404
 
-            segment_found = False
-            segments = transcription.get("segments") or []
-            for segment in segments:
-                if segment.get('id') == segment_id:
-                    segment['start'] = start_val
-                    segment['end'] = end_val
-                    segment_found = True
-                    break
-
-            if not segment_found:
+            if not updated:
                 return jsonify({
                     "success": False,
                     "error": f"Segment {segment_id} not found"
                 }), 404
 
-            native_history.update_job_transcript(job_id, transcription)
-
             return jsonify({
                 "success": True,
                 "message": "Segment timing updated"
@@ -2021,38 +2040,19 @@ def create_app():
                     "error": "end must be greater than start"
                 }), 400
 
-            record = native_history.get_job_record(job_id)
-            transcription = record.get("transcript") if record else None
-            if not transcription:
+            try:
+                new_segment = native_history.add_segment(job_id, start_val, end_val, text, segment_id)
+            except ValueError as exc:
+                return jsonify({
+                    "success": False,
+                    "error": str(exc)
+                }), 409
+            if new_segment is None:
                 return jsonify({
                     "success": False,
                     "error": "Transcription not found"
                 }), 404
 
-            segments = transcription.get("segments") or []
-            if segment_id is None:
-                max_id = 0
-                for seg in segments:
-                    try:
-                        max_id = max(max_id, int(seg.get("id", 0)))
-                    except Exception:
-                        continue
-                segment_id = max_id + 1
-
-            new_segment = {
-                "id": int(segment_id),
-                "start": start_val,
-                "end": end_val,
-                "text": text,
-                "originalText": text,
-            }
-            segments.append(new_segment)
-            segments.sort(key=lambda s: float(s.get("start", 0)))
-            transcription["segments"] = segments
-            transcription["text"] = " ".join([seg.get("text", "") for seg in segments if seg.get("text")]).strip()
-
-            native_history.update_job_transcript(job_id, transcription)
-
             return jsonify({
                 "success": True,
                 "message": "Segment added",
@@ -2090,27 +2090,19 @@ def create_app():
                     "error": "segment_id must be a number"
                 }), 400
 
-            record = native_history.get_job_record(job_id)
-            transcription = record.get("transcript") if record else None
-            if not transcription:
+            deleted = native_history.delete_segment(job_id, segment_id_val)
+            if deleted is None:
                 return jsonify({
                     "success": False,
                     "error": "Transcription not found"
                 }), 404
 
-            segments = transcription.get("segments") or []
-            next_segments = [seg for seg in segments if int(seg.get("id", -1)) != segment_id_val]
-
-            if len(next_segments) == len(segments):
+            if not deleted:
                 return jsonify({
                     "success": False,
                     "error": f"Segment {segment_id_val} not found"
                 }), 404
 
-            transcription["segments"] = next_segments
-            transcription["text"] = " ".join([seg.get("text", "") for seg in next_segments if seg.get("text")]).strip()
-            native_history.update_job_transcript(job_id, transcription)
-
             return jsonify({
                 "success": True,
                 "message": "Segment deleted"
@@ -2174,6 +2166,95 @@ def create_app():
             logger.error("Failed to load job record %s: %s", job_id, exc, exc_info=True)
             return jsonify({"success": False, "error": "Failed to load job record"}), 500
 
+    @app.route('/api/cache/stats', methods=['GET'])
+    def result_cache_stats():
+        """Report size and usage of the transcription result cache."""
+        try:
+            return jsonify({"success": True, "cache": native_result_cache.stats()}), 200
+        except Exception as exc:
+            logger.error("Failed to read result cache stats: %s", exc, exc_info=True)
+            return jsonify({"success": False, "error": "Failed to read cache stats"}), 500
+
+    @app.route('/api/cache/purge', methods=['POST'])
+    def purge_result_cache():
+        """Drop every cached transcription result."""
+        try:
+            removed = native_result_cache.purge()
+            logger.info("Purged result cache: %s entries, %s bytes", removed["entries"], removed["bytes"])
+            return jsonify({"success": True, "removed": removed}), 200
+        except Exception as exc:
+            logger.error("Failed to purge result cache: %s", exc, exc_info=True)
+            return jsonify({"success": False, "error": "Failed to purge cache"}), 500
+
+    @app.route('/api/resources', methods=['GET'])
+    def resource_limits():
+        """Report detected cores/memory and the current job concurrency limits."""
+        return jsonify({"success": True, "resources": native_resources.get_scheduler().snapshot()}), 200
+
+    @app.route('/api/resources', methods=['POST'])
+    def update_resource_limits():
+        """Change job concurrency, engine threads or the per-job memory cap at runtime."""
+        payload = request.get_json(silent=True) or {}
+        changes = {}
+        for key in ("max_jobs", "threads_per_job", "job_memory_limit_mb"):
+            if payload.get(key) is None:
+                continue
+            try:
+                changes[key] = int(payload[key])
+            except (TypeError, ValueError):
+                return jsonify({"success": False, "error": f"{key} must be an integer"}), 400
+        try:
+            resources = native_resources.get_scheduler().configure(**changes)
+            return jsonify({"success": True, "resources": resources}), 200
+        except Exception as exc:
+            logger.error("Failed to update resource limits: %s", exc, exc_info=True)
+            return jsonify({"success": False, "error": "Failed to update resource limits"}), 500
+
+    @app.route('/api/queue/stats', methods=['GET'])
+    def queue_stats():
+        """Report the scheduling policy and queue-wait times per priority class."""
+        return jsonify({"success": True, "scheduling": get_dispatcher().stats()}), 200
+
+    @app.route('/api/queue/policy', methods=['POST'])
+    def update_queue_policy():
+        """Switch between fifo/sjf ordering and strict/weighted sharing at runtime."""
+        payload = request.get_json(silent=True) or {}
+        aging = payload.get("aging")
+        try:
+            scheduling = get_dispatcher().configure(
+                policy=payload.get("policy"),
+                sharing=payload.get("sharing"),
+                aging=float(aging) if aging is not None else None,
+            )
+        except (TypeError, ValueError) as exc:
+            return jsonify({"success": False, "error": str(exc)}), 400
+        return jsonify({"success": True, "scheduling": scheduling}), 200
+
+    @app.route('/api/maintenance', methods=['GET'])
+    def maintenance_status():
+        """Report jobs.db size, retention settings and the last maintenance run."""
+        try:
+            return jsonify({
+                "success": True,
+                "database": native_maintenance.database_stats(),
+                "retention": native_maintenance.retention_settings(),
+                "last_run": native_maintenance.last_report(),
+            }), 200
+        except Exception as exc:
+            logger.error("Failed to read database stats: %s", exc, exc_info=True)
+            return jsonify({"success": False, "error": "Failed to read database stats"}), 500
+
+    @app.route('/api/maintenance', methods=['POST'])
+    def run_maintenance():
+        """Expire old jobs and compact jobs.db now; ``{"full": true}`` forces a full VACUUM."""
+        payload = request.get_json(silent=True) or {}
+        try:
+            report = native_maintenance.run_maintenance(full=bool(payload.get("full")))
+            return jsonify({"success": True, "report": report}), 200
+        except Exception as exc:
+            logger.error("jobs.db maintenance failed: %s", exc, exc_info=True)
+            return jsonify({"success": False, "error": "Maintenance failed"}), 500
+
     # Web UI - React
     @app.route('/', methods=['GET'])
     def index():
@@ -2266,18 +2347,8 @@ def create_app():
                 result = list(updates)
                 job_update_queues[room] = []
 
-            # Also get current job status from database
-            job = None
-            job_queue = None
-            for queue_name in ['high', 'default', 'low']:
-                try:
-                    queue = get_queue(queue_name)
-                    job = queue.fetch_job(job_id)
-                    if job:
-                        job_queue = queue
-                        break
-                except:
-                    continue
+            # Also get current job status (shared cache first, then the database)
+            job_queue, job = find_job(job_id)
 
             # Always include current job status in response
             if job:
@@ -2313,6 +2384,12 @@ def create_app():
                 for key, value in job_meta.items():
                     if key not in current_status_data:
                         current_status_data[key] = value
+                if 'partial_result' in current_status_data:
+                    # Only the streamed segments this poller does not have yet.
+                    current_status_data['partial_result'] = partial_result_delta(
+                        current_status_data['partial_result'],
+                        request.args.get('partial_version', type=int),
+                    )
 
                 current_status = {
                     'event': 'job_update',
@@ -2341,18 +2418,8 @@ def create_app():
     def get_job_status(job_id):
         """Get job status and results"""
         try:
-            # Try to find job in all queues
-            job = None
-            job_queue = None
-            for queue_name in ['high', 'default', 'low']:
-                try:
-                    queue = get_queue(queue_name)
-                    job = queue.fetch_job(job_id)
-                    if job:
-                        job_queue = queue
-                        break
-                except:
-                    continue
+            # Single lookup shared by every queue
+            job_queue, job = find_job(job_id)
 
             if not job:
                 record = native_history.get_job_record(job_id)
@@ -2424,6 +2491,10 @@ def create_app():
                 "created_at": job.created_at.isoformat() if job.created_at else None,
                 "started_at": job.started_at.isoformat() if job.started_at else None,
                 "ended_at": job.ended_at.isoformat() if job.ended_at else None,
+                "queue_wait_seconds": (
+                    round(((job.started_at or datetime.now()) - job.created_at).total_seconds(), 3)
+                    if job.created_at else None
+                ),
                 "meta": {
                     'progress': updates.get('progress', 0),
                     'message': updates.get('message', ''),
@@ -2431,13 +2502,20 @@ def create_app():
                     **updates
                 }
             }
+            if 'partial_result' in updates:
+                response["meta"]['partial_result'] = partial_result_delta(
+                    updates['partial_result'], request.args.get('partial_version', type=int)
+                )
 
             # Add result if completed
             if job.is_finished():
                 record = native_history.get_job_record(job_id)
                 result = record.get("transcript") if record else None
                 if not result:
-                    result = updates.get('result') or job.result
+                    result = _resolve_transcript_reference(job.result)
+                if result is None:
+                    # The transcript never reached its record; serve the live result.
+                    result = updates.get('result')
                 response["result"] = result
             elif job.is_failed():
                 response["error"] = str(job.exc_info)
@@ -2461,6 +2539,8 @@ def create_app():
                     if job:
                         job.cancel()
                         queue.update_job_status(job_id, 'canceled')
+                        # Kill the job's ffmpeg/whisper.cpp children and free its worker.
+                        native_cancellation.cancel_job(job_id)
 
                         # Emit termination event
                         emit_update(f"job:{job_id}", 'job_terminated', {
@@ -2525,6 +2605,7 @@ def create_app():
                     try:
                         if job.get_status() not in ('finished', 'failed', 'canceled', 'cancelled', 'deleted'):
                             job.cancel()
+                            native_cancellation.cancel_job(job_id)
                     except Exception as cancel_error:
                         logger.warning(f"Failed to cancel job {job_id}: {cancel_error}")
 
@@ -2538,7 +2619,7 @@ def create_app():
                     file_path = meta.get('file_path')
                     if file_path:
                         candidate_paths.add(file_path)
-                    for key in ('result', 'partial_result'):
+                    for key in ('result', 'result_ref', 'partial_result'):
                         nested = meta.get(key)
                         if isinstance(nested, dict):
                             nested_path = nested.get('file_path')
@@ -3032,6 +3113,9 @@ def create_app():
             vad_filter = request.form.get('vad_filter', 'True').lower() == 'true'
             noise_suppression = request.form.get("noise_suppression")
             requested_noise_backend = _noise_suppression_backend(noise_suppression)
+            steering_mode = _steering_mode(request.form.get("steering_mode"))
+            # Seconds to keep the finished job row; unset follows XCAPTION_JOB_TTL_HOURS.
+            result_ttl = request.form.get('result_ttl', type=int)
 
             second_caption_enabled = None
             if second_caption_enabled_raw is not None:
@@ -3087,9 +3171,13 @@ def create_app():
             media_size = None
             media_mtime = None
             media_hash = None
+            media_fingerprint = None
             if input_path:
                 media_size, media_mtime = native_history.get_file_meta(input_path)
-                media_hash = native_history.compute_file_hash(input_path)
+                # Fingerprint now; the full SHA-256 is only read by the job,
+                # for its result-cache lookup, unless it is already cached.
+                media_fingerprint = native_fingerprint.fingerprint(input_path)
+                media_hash = native_fingerprint.known_sha256(input_path)
 
             try:
                 native_history.upsert_job_record({
@@ -3099,6 +3187,7 @@ def create_app():
                     "media_path": input_path,
                     "media_kind": media_kind,
                     "media_hash": media_hash,
+                    "media_fingerprint": media_fingerprint,
                     "media_size": media_size,
                     "media_mtime": media_mtime,
                     "status": "processing",
@@ -3124,8 +3213,15 @@ def create_app():
                 'cleanup_paths': cleanup_paths,
                 'media_path': input_path,
                 'media_kind': media_kind,
+                'media_hash': media_hash,
+                'steering_mode': steering_mode,
             }
 
+            # Only shortest-job-first ranks by length; skip the ffprobe otherwise.
+            media_duration = None
+            if input_path and get_dispatcher().policy == 'sjf':
+                media_duration = get_audio_duration(input_path)
+
             # Submit job to queue
             queue = get_queue('default')
 
@@ -3134,7 +3230,8 @@ def create_app():
                 kwargs=job_args,
                 job_id=job_id,
                 timeout='1h',
-                result_ttl=-1
+                result_ttl=result_ttl,
+                media_duration=media_duration or None,
             )
 
             logger.info(f"Submitted job {job_id} to queue: {queue.name}")
@@ -3143,7 +3240,7 @@ def create_app():
                 playback_stat_size = None
                 with contextlib.suppress(OSError):
                     playback_stat_size = Path(input_path).stat().st_size
-                queue.update_job_meta(job_id, {
+                queue.update_job_progress(job_id, 0, "Job submitted successfully", {
                     "original_filename": filename,
                     "audio_file": {
                         "name": filename,
@@ -3154,8 +3251,6 @@ def create_app():
                     "language": language,
                     "device": device,
                     "model": model,
-                    "message": "Job submitted successfully",
-                    "progress": 0,
                 })
             except Exception as meta_error:
                 logger.warning("Failed to persist initial job metadata for %s: %s", job_id, meta_error)
@@ -3286,7 +3381,7 @@ if __name__ == '__main__':
     patch_job_handlers()
 
     # Start worker threads
-    start_worker(num_threads=2)
+    start_worker()
 
     # Create and start Flask app
     app = create_app()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Compare the audio-prefix and text-prompt steering modes on real media.
+
+Each input is transcribed once per mode with the same model and language; the
+script reports wall time, segment counts and how closely the prompt-mode text
+matches the audio-prefix output.
+
+Usage:
+    python scripts/benchmark_steering.py clip1.mp4 clip2.wav --style spoken
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import time
+import uuid
+from difflib import SequenceMatcher
+from pathlib import Path
+
+# Add the project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def _transcribe(handlers, audio_path, *, mode, kind, model, language, duration):
+    prefix_path = None
+    prefix_duration = 0.0
+    prompt = None
+    if mode == "audio":
+        if kind == "english_translate":
+            source = handlers._resolve_english_translate_prefix_path()
+        else:
+            source = handlers._resolve_prefix_path(kind)
+        prefix_audio = handlers._load_prefix_audio(source) if source else None
+        if prefix_audio is None:
+            raise SystemExit(f"Prefix audio for {kind!r} is not available")
+        prefix_path = prefix_audio.wav_path
+        prefix_duration = prefix_audio.duration
+    else:
+        prompt = handlers._resolve_steering_prompt(kind)
+
+    cleanup_paths = []
+    started = time.perf_counter()
+    try:
+        result = handlers._run_whisper_pass(
+            f"bench-{uuid.uuid4().hex[:8]}",
+            audio_path,
+            model_path=model,
+            language=language,
+            media_duration=duration,
+            prefix_path=prefix_path,
+            prefix_duration=prefix_duration,
+            cleanup_paths=cleanup_paths,
+            prompt=prompt,
+        )
+    finally:
+        for path in cleanup_paths:
+            target = Path(path)
+            if target.is_dir():
+                shutil.rmtree(target, ignore_errors=True)
+            else:
+                target.unlink(missing_ok=True)
+    elapsed = time.perf_counter() - started
+    segments = handlers._postprocess_caption_segments(result["segments"])
+    text = "".join(seg.get("text", "") for seg in segments)
+    return elapsed, segments, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("media", nargs="+", help="Audio or video files to transcribe")
+    parser.add_argument("--style", default="written", choices=["written", "spoken", "english_translate"])
+    parser.add_argument("--model", default="whisper", help="Model name or path (default: whisper)")
+    parser.add_argument("--language", default="yue", help="Whisper language (default: yue)")
+    parser.add_argument("--runs", type=int, default=1, help="Runs per mode; the fastest is reported")
+    parser.add_argument("--no-server", action="store_true", help="Use the one-shot engine instead of the resident server")
+    args = parser.parse_args()
+
+    if args.no_server:
+        os.environ["XCAPTION_WHISPER_SERVER"] = "0"
+
+    import native_job_handlers as handlers
+    from native_ffmpeg import get_audio_duration
+
+    print("=" * 70)
+    print(f"Steering benchmark ({args.style}, language={args.language})")
+    print("=" * 70)
+
+    totals = {"audio": 0.0, "prompt": 0.0}
+    render_dirs = []
+    try:
+        for media in args.media:
+            source = Path(media).resolve()
+            if not source.exists():
+                print(f"\n{source}: not found, skipped")
+                continue
+            prepared, _ = handlers._render_processing_audio(
+                f"bench-{uuid.uuid4().hex[:8]}",
+                source,
+                noise_backend="none",
+                cleanup_paths=render_dirs,
+            )
+            duration = get_audio_duration(str(prepared)) or None
+
+            outputs = {}
+            for mode in ("audio", "prompt"):
+                best = None
+                for _ in range(max(1, args.runs)):
+                    run = _transcribe(
+                        handlers,
+                        prepared,
+                        mode=mode,
+                        kind=args.style,
+                        model=args.model,
+                        language=args.language,
+                        duration=duration,
+                    )
+                    if best is None or run[0] < best[0]:
+                        best = run
+                outputs[mode] = best
+                totals[mode] += best[0]
+
+            audio_time, audio_segments, audio_text = outputs["audio"]
+            prompt_time, prompt_segments, prompt_text = outputs["prompt"]
+            parity = SequenceMatcher(None, audio_text, prompt_text).ratio() if audio_text or prompt_text else 1.0
+            print(f"\n{source.name} ({duration or 0:.1f}s)")
+            print(f"   audio prefix : {audio_time:7.2f}s  {len(audio_segments):4d} segments")
+            print(f"   text prompt  : {prompt_time:7.2f}s  {len(prompt_segments):4d} segments")
+            speedup = audio_time / prompt_time if prompt_time > 0 else 0.0
+            print(f"   speedup      : {speedup:7.2f}x   text parity {parity:.1%}")
+    finally:
+        for path in render_dirs:
+            shutil.rmtree(path, ignore_errors=True)
+
+    if totals["prompt"] > 0:
+        print("\n" + "-" * 70)
+        print(
+            f"Total: audio {totals['audio']:.2f}s, prompt {totals['prompt']:.2f}s "
+            f"({totals['audio'] / totals['prompt']:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
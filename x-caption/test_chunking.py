@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Tests for silence-aligned chunking and segment stitching."""
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from native_chunking import AudioChunk, find_chunks, stitch_segments
+
+SAMPLE_RATE = 8000
+
+
+def _write_tone(path: Path, seconds: float, silences) -> Path:
+    """A tone of *seconds* length with silent ``(start, end)`` gaps."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    audio = 0.5 * np.sin(2 * np.pi * 220 * t).astype(np.float32)
+    for start, end in silences:
+        audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)] = 0.0
+    sf.write(str(path), audio, SAMPLE_RATE, subtype="PCM_16")
+    return path
+
+
+def test_short_audio_is_one_chunk(tmp_path):
+    path = _write_tone(tmp_path / "short.wav", 80.0, [])
+    assert find_chunks(path, target_seconds=60.0) == [AudioChunk(0, 0.0, 80.0)]
+
+
+def test_cuts_land_in_nearby_silence(tmp_path):
+    path = _write_tone(tmp_path / "long.wav", 200.0, [(65.0, 66.0), (128.0, 129.0)])
+    chunks = find_chunks(path, target_seconds=60.0)
+
+    assert len(chunks) == 3
+    assert chunks[0].start == 0.0 and abs(chunks[-1].end - 200.0) < 1e-6
+    for left, right in zip(chunks, chunks[1:]):
+        assert left.end == right.start
+    assert 65.0 <= chunks[0].end <= 66.0
+    assert 128.0 <= chunks[1].end <= 129.0
+
+
+def test_chunks_respect_minimum_length(tmp_path):
+    # A silence right at the start must not produce a tiny first chunk.
+    path = _write_tone(tmp_path / "edge.wav", 200.0, [(5.0, 6.0)])
+    chunks = find_chunks(path, target_seconds=60.0)
+    assert all(chunk.duration >= 30.0 for chunk in chunks)
+
+
+def test_stitch_shifts_segments_and_words_onto_source_timeline():
+    chunks = [AudioChunk(0, 0.0, 60.0), AudioChunk(1, 60.0, 120.0)]
+    stitched = stitch_segments(chunks, [
+        [{"start": 1.0, "end": 2.0, "text": "first"}],
+        [{"start": 3.0, "end": 4.0, "text": "second", "words": [{"word": "second", "start": 3.0, "end": 3.5}]}],
+    ])
+
+    assert [(seg["id"], seg["start"], seg["end"], seg["text"]) for seg in stitched] == [
+        (0, 1.0, 2.0, "first"),
+        (1, 63.0, 64.0, "second"),
+    ]
+    assert stitched[1]["words"] == [{"word": "second", "start": 63.0, "end": 63.5}]
+
+
+def test_stitch_keeps_repeated_speech_at_seams():
+    chunks = [AudioChunk(0, 0.0, 60.0), AudioChunk(1, 60.0, 120.0)]
+    stitched = stitch_segments(chunks, [
+        [{"start": 58.0, "end": 59.8, "text": "yes, yes"}],
+        [{"start": 0.1, "end": 1.5, "text": "yes, yes"}],
+    ])
+    assert [seg["text"] for seg in stitched] == ["yes, yes", "yes, yes"]
+
+
+def test_stitch_clamps_ends_and_trims_seam_overlap():
+    chunks = [AudioChunk(0, 0.0, 60.0), AudioChunk(1, 60.0, 120.0)]
+    stitched = stitch_segments(chunks, [
+        [{"start": 58.0, "end": 62.0, "text": "runs past the cut"}],
+        [{"start": -0.5, "end": 1.0, "text": "starts early"}, {"start": 1.0, "end": 2.0, "text": "next"}],
+    ])
+
+    assert stitched[0]["end"] == 60.0
+    assert stitched[1]["start"] == 60.0
+    assert [seg["text"] for seg in stitched] == ["runs past the cut", "starts early", "next"]
+
+
+def test_stitch_drops_empty_segments():
+    chunks = [AudioChunk(0, 0.0, 60.0)]
+    stitched = stitch_segments(chunks, [[{"start": 61.0, "end": 62.0, "text": "beyond the chunk"}]])
+    assert stitched == []
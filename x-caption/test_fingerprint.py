@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Tests for media fingerprints and the persistent hash cache."""
+import hashlib
+import os
+import threading
+
+import native_fingerprint
+import native_history
+import native_storage
+
+
+def _write(path, data: bytes):
+    path.write_bytes(data)
+    return path
+
+
+def _cached_rows(data_dir) -> int:
+    conn = native_storage.connect(data_dir / "jobs.db")
+    return conn.execute("SELECT COUNT(*) FROM media_hashes").fetchone()[0]
+
+
+def _count_reads(monkeypatch) -> list:
+    reads = []
+    real = native_fingerprint._compute_sha256
+
+    def _counting(path):
+        reads.append(path)
+        return real(path)
+
+    monkeypatch.setattr(native_fingerprint, "_compute_sha256", _counting)
+    return reads
+
+
+def test_sha256_is_read_once_per_file_version(data_dir, monkeypatch):
+    media = _write(data_dir / "clip.wav", b"abc" * 1000)
+    reads = _count_reads(monkeypatch)
+
+    assert native_fingerprint.known_sha256(media) is None
+    digest = native_fingerprint.sha256(media)
+    assert digest == hashlib.sha256(b"abc" * 1000).hexdigest()
+    assert native_fingerprint.sha256(media) == digest
+    assert native_fingerprint.known_sha256(media) == digest
+    assert len(reads) == 1
+
+
+def test_cache_is_invalidated_by_size_change(data_dir):
+    media = _write(data_dir / "clip.wav", b"a" * 4096)
+    stat = media.stat()
+    before = native_fingerprint.fingerprint(media)
+    native_fingerprint.sha256(media)
+
+    _write(media, b"a" * 8192)
+    os.utime(media, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert native_fingerprint.known_sha256(media) is None
+    assert native_fingerprint.fingerprint(media) != before
+
+
+def test_cache_is_invalidated_by_mtime_change(data_dir, monkeypatch):
+    media = _write(data_dir / "clip.wav", b"a" * 4096)
+    native_fingerprint.sha256(media)
+    stat = media.stat()
+    # Same size, same bytes on disk, but a new mtime: the old entry no longer applies.
+    _write(media, b"b" * 4096)
+    os.utime(media, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert native_fingerprint.known_sha256(media) is None
+    reads = _count_reads(monkeypatch)
+    assert native_fingerprint.sha256(media) == hashlib.sha256(b"b" * 4096).hexdigest()
+    assert len(reads) == 1
+
+
+def test_cache_is_invalidated_by_inode_change(data_dir):
+    media = _write(data_dir / "clip.wav", b"a" * 4096)
+    native_fingerprint.sha256(media)
+    stat = media.stat()
+
+    # Replace the file by rename, keeping size and mtime: only the inode differs.
+    replacement = _write(data_dir / "clip.tmp", b"c" * 4096)
+    os.utime(replacement, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(replacement, media)
+    assert media.stat().st_ino != stat.st_ino
+
+    assert native_fingerprint.known_sha256(media) is None
+    assert native_fingerprint.sha256(media) == hashlib.sha256(b"c" * 4096).hexdigest()
+    # The row for the old version was replaced, not kept alongside.
+    assert _cached_rows(data_dir) == 1
+
+
+def test_fingerprint_samples_large_files(data_dir, monkeypatch):
+    monkeypatch.setattr(native_fingerprint, "_SAMPLE_BYTES", 16)
+    data = bytearray(b"x" * 160)
+    media = _write(data_dir / "big.wav", bytes(data))
+    before = native_fingerprint.fingerprint(media)
+
+    # A byte outside the head, middle and tail samples is not seen.
+    data[40] = ord("y")
+    unsampled = _write(data_dir / "unsampled.wav", bytes(data))
+    assert native_fingerprint.fingerprint(unsampled) == before
+    data[0] = ord("y")
+    sampled = _write(data_dir / "sampled.wav", bytes(data))
+    assert native_fingerprint.fingerprint(sampled) != before
+
+
+def test_concurrent_callers_share_one_read(data_dir, monkeypatch):
+    media = _write(data_dir / "clip.wav", b"z" * 4096)
+    started = threading.Event()
+    release = threading.Event()
+    reads = []
+    real = native_fingerprint._compute_sha256
+
+    def _slow(path):
+        reads.append(path)
+        started.set()
+        release.wait(5)
+        return real(path)
+
+    monkeypatch.setattr(native_fingerprint, "_compute_sha256", _slow)
+    results = []
+
+    def _hash():
+        results.append(native_fingerprint.sha256(media))
+        native_storage.close_thread_connections()
+
+    first = threading.Thread(target=_hash)
+    first.start()
+    assert started.wait(5)
+    second = threading.Thread(target=_hash)
+    second.start()
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert len(reads) == 1
+    assert results == [hashlib.sha256(b"z" * 4096).hexdigest()] * 2
+
+
+def test_prune_keeps_most_recent_entries(data_dir, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(native_fingerprint.time, "time", lambda: clock[0])
+    for index in range(5):
+        clock[0] += 1
+        native_fingerprint.fingerprint(_write(data_dir / f"clip{index}.wav", bytes([index]) * 64))
+
+    assert native_fingerprint.prune(max_rows=2) == 3
+    assert _cached_rows(data_dir) == 2
+    conn = native_storage.connect(data_dir / "jobs.db")
+    kept = sorted(os.path.basename(row[0]) for row in conn.execute("SELECT path FROM media_hashes"))
+    assert kept == ["clip3.wav", "clip4.wav"]
+    assert native_fingerprint.prune(max_rows=2) == 0
+
+
+def test_upsert_never_reads_the_whole_file(data_dir, monkeypatch):
+    media = _write(data_dir / "clip.wav", b"q" * 4096)
+    reads = _count_reads(monkeypatch)
+    native_history.upsert_job_record({"job_id": "job", "filename": "clip.wav", "media_path": str(media)})
+
+    record = native_history.get_job_record("job")
+    assert reads == []
+    assert record["media_hash"] is None and record["media_fingerprint"]
+
+    # Once the pipeline has hashed the file, the next write records it.
+    digest = native_fingerprint.sha256(media)
+    native_history.upsert_job_record({"job_id": "job", "status": "completed"})
+    assert native_history.get_job_record("job")["media_hash"] == digest
+
+
+def test_touched_copy_with_matching_samples_is_checked_by_full_hash(data_dir, monkeypatch):
+    monkeypatch.setattr(native_fingerprint, "_SAMPLE_BYTES", 16)
+    data = bytearray(b"m" * 160)
+    media = _write(data_dir / "clip.wav", bytes(data))
+    stat = media.stat()
+    fingerprint = native_fingerprint.fingerprint(media)
+    digest = native_fingerprint.sha256(media)
+    args = (str(media), digest, stat.st_size, stat.st_mtime, fingerprint)
+
+    os.utime(media, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert native_history.is_media_invalid(*args) is False
+
+    # Edited between the samples: the fingerprint still matches, the hash does not.
+    data[40] = ord("n")
+    _write(media, bytes(data))
+    assert native_fingerprint.fingerprint(media) == fingerprint
+    assert native_history.is_media_invalid(*args) is True
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""Tests for the job_records history store."""
+import json
+
+import pytest
+
+import native_history
+import native_storage
+
+STAMP = 1_700_000_000.0
+
+
+def _add_record(job_id, updated_at, **fields):
+    record = {
+        "job_id": job_id,
+        "filename": f"{job_id}.wav",
+        "status": "completed",
+        "created_at": updated_at,
+        "updated_at": updated_at,
+    }
+    record.update(fields)
+    native_history.upsert_job_record(record)
+
+
+def _page_through(limit):
+    seen, cursor = [], None
+    while True:
+        entries, cursor = native_history.load_history_page(limit=limit, cursor=cursor)
+        seen.extend(entry["job_id"] for entry in entries)
+        if cursor is None:
+            return seen
+
+
+@pytest.mark.parametrize("limit", [1, 3, 4, 7, 50])
+def test_history_cursor_has_no_gaps_or_duplicates_on_equal_timestamps(data_dir, limit):
+    for index in range(12):
+        _add_record(f"same-{index:02d}", STAMP)
+    for index in range(3):
+        _add_record(f"newer-{index}", STAMP + 10)
+        _add_record(f"older-{index}", STAMP - 10)
+    expected = (
+        sorted((f"newer-{index}" for index in range(3)), reverse=True)
+        + sorted((f"same-{index:02d}" for index in range(12)), reverse=True)
+        + sorted((f"older-{index}" for index in range(3)), reverse=True)
+    )
+
+    assert _page_through(limit) == expected
+
+
+def test_history_cursor_skips_nothing_added_behind_it(data_dir):
+    for index in range(6):
+        _add_record(f"job-{index}", STAMP)
+    first, cursor = native_history.load_history_page(limit=3)
+    # A job finishing while the user scrolls lands on top, not inside the next page.
+    _add_record("job-new", STAMP + 60)
+    rest, cursor = native_history.load_history_page(limit=10, cursor=cursor)
+
+    assert [entry["job_id"] for entry in first + rest] == [f"job-{index}" for index in range(5, -1, -1)]
+    assert cursor is None
+
+
+def test_history_rejects_malformed_cursor(data_dir):
+    with pytest.raises(ValueError):
+        native_history.load_history_page(limit=5, cursor="not-a-cursor")
+
+
+def test_history_entries_keep_the_result_preview(data_dir):
+    _add_record("job", STAMP, transcript_text="hello world", segment_count=2, language="en")
+    (entry,), _ = native_history.load_history_page(limit=5)
+    assert entry["result_preview"] == {"segment_count": 2, "text": "hello world", "language": "en"}
+
+
+def test_get_job_record_reads_media_validity_from_the_scanner(data_dir, monkeypatch):
+    media = data_dir / "clip.wav"
+    media.write_bytes(b"\0" * 1024)
+    scanner = native_history._MediaScanner()
+    monkeypatch.setattr(scanner, "_ensure_thread", lambda: None)
+    monkeypatch.setattr(native_history, "_media_scanner", scanner)
+
+    def _no_inline_check(*args, **kwargs):
+        raise AssertionError("get_job_record must not check media inline")
+
+    monkeypatch.setattr(native_history, "is_media_invalid", _no_inline_check)
+    _add_record("job", STAMP, media_path=str(media), media_hash="0" * 64)
+
+    record = native_history.get_job_record("job")
+    assert record["media_invalid"] is None
+    assert list(scanner._pending.values()) == ["job"]
+
+    key = next(iter(scanner._pending))
+    scanner.remember(key, True)
+    assert native_history.get_job_record("job")["media_invalid"] is True
+
+
+TRANSCRIPT = {
+    "job_id": "job",
+    "language": "en",
+    "text": "one two three",
+    "segments": [
+        {"id": 0, "start": 0.0, "end": 1.0, "text": "one", "words": [{"word": "one", "start": 0.0, "end": 0.5}]},
+        {"id": 1, "start": 1.0, "end": 2.0, "text": "two", "speaker": "A"},
+        {"id": 2, "start": 2.0, "end": 3.0, "text": "three"},
+    ],
+}
+
+
+def _store(transcript, job_id="job"):
+    native_history.upsert_job_record({
+        "job_id": job_id,
+        "filename": "clip.wav",
+        "status": "completed",
+        "transcript_json": transcript,
+    })
+
+
+def _transcript(job_id="job"):
+    record = native_history.get_job_record(job_id)
+    return record["transcript"], record
+
+
+def _texts(transcript):
+    return [segment["text"] for segment in transcript["segments"]]
+
+
+def test_transcript_round_trips_through_segment_rows(data_dir):
+    _store(TRANSCRIPT)
+    transcript, record = _transcript()
+
+    assert transcript == TRANSCRIPT
+    assert record["transcript_text"] == "one two three"
+    assert record["segment_count"] == 3
+
+
+def test_edit_segment_text_rewrites_one_segment_and_the_text(data_dir):
+    _store(TRANSCRIPT)
+    assert native_history.edit_segment_text("job", 1, "TWO") is True
+
+    transcript, record = _transcript()
+    assert _texts(transcript) == ["one", "TWO", "three"]
+    assert transcript["segments"][1] == {"id": 1, "start": 1.0, "end": 2.0, "text": "TWO",
+                                         "originalText": "TWO", "speaker": "A"}
+    assert transcript["text"] == record["transcript_text"] == "one TWO three"
+    assert transcript["segments"][0]["words"] == TRANSCRIPT["segments"][0]["words"]
+
+
+def test_edits_accept_numeric_ids_sent_as_strings(data_dir):
+    _store(TRANSCRIPT)
+    assert native_history.edit_segment_text("job", "2", "THREE") is True
+    assert native_history.edit_segment_text("job", 2.0, "3") is True
+    assert _texts(_transcript()[0]) == ["one", "two", "3"]
+
+
+def test_edits_report_unknown_segments_and_jobs(data_dir):
+    _store(TRANSCRIPT)
+    assert native_history.edit_segment_text("job", 9, "x") is False
+    assert native_history.edit_segment_text("job", "nine", "x") is False
+    assert native_history.set_segment_timing("job", 9, 0.0, 1.0) is False
+    assert native_history.delete_segment("job", 9) is False
+    assert native_history.edit_segment_text("missing", 0, "x") is None
+    assert native_history.add_segment("missing", 0.0, 1.0, "x") is None
+    assert _transcript()[0] == TRANSCRIPT
+
+
+def test_set_segment_timing_reorders_segments(data_dir):
+    _store(TRANSCRIPT)
+    assert native_history.set_segment_timing("job", 0, 2.5, 2.9) is True
+
+    transcript, record = _transcript()
+    assert [segment["id"] for segment in transcript["segments"]] == [1, 2, 0]
+    assert (transcript["segments"][2]["start"], transcript["segments"][2]["end"]) == (2.5, 2.9)
+    assert record["transcript_text"] == "two three one"
+
+
+def test_add_segment_takes_the_next_free_id(data_dir):
+    _store(TRANSCRIPT)
+    added = native_history.add_segment("job", 1.5, 1.8, "and a half")
+    assert added["id"] == 3
+    chosen = native_history.add_segment("job", 5.0, 6.0, "ten", segment_id="10")
+    assert chosen["id"] == 10
+
+    transcript, record = _transcript()
+    assert _texts(transcript) == ["one", "two", "and a half", "three", "ten"]
+    assert record["transcript_text"] == "one two and a half three ten"
+    assert record["segment_count"] == 5
+
+
+def test_add_segment_rejects_a_taken_id(data_dir):
+    _store(TRANSCRIPT)
+    with pytest.raises(ValueError):
+        native_history.add_segment("job", 3.5, 4.0, "four", segment_id=1)
+
+    transcript, record = _transcript()
+    assert transcript == TRANSCRIPT
+    assert record["segment_count"] == 3
+
+
+def test_edits_keep_the_job_status(data_dir):
+    native_history.upsert_job_record({
+        "job_id": "job", "filename": "clip.wav", "status": "failed", "transcript_json": TRANSCRIPT,
+    })
+    assert native_history.edit_segment_text("job", 0, "ONE") is True
+    assert native_history.add_segment("job", 4.0, 5.0, "four")["id"] == 3
+    assert native_history.get_job_record("job")["status"] == "failed"
+
+
+def test_delete_segment_removes_it_once(data_dir):
+    _store(TRANSCRIPT)
+    assert native_history.delete_segment("job", 1) is True
+    assert native_history.delete_segment("job", 1) is False
+
+    transcript, record = _transcript()
+    assert _texts(transcript) == ["one", "three"]
+    assert record["transcript_text"] == "one three"
+    assert record["segment_count"] == 2
+
+
+def test_transcript_saved_before_segment_rows_is_split_on_first_edit(data_dir):
+    _store(None)
+    with native_storage.transaction(data_dir / "jobs.db") as conn:
+        conn.execute(
+            "UPDATE job_records SET transcript_json = ?, transcript_text = ?, segment_store = 0, segment_count = 3 "
+            "WHERE job_id = 'job'",
+            (json.dumps(TRANSCRIPT), TRANSCRIPT["text"]),
+        )
+    assert _transcript()[0] == TRANSCRIPT
+
+    assert native_history.edit_segment_text("job", 0, "ONE") is True
+    transcript, record = _transcript()
+    assert _texts(transcript) == ["ONE", "two", "three"]
+    assert record["transcript_text"] == "ONE two three"
+    rows = native_storage.connect(data_dir / "jobs.db").execute(
+        "SELECT COUNT(*) FROM segments WHERE job_id = 'job'"
+    ).fetchone()[0]
+    assert rows == 3
+
+
+def test_transcript_whose_ids_cannot_be_rows_still_round_trips_and_edits(data_dir):
+    legacy = {
+        "job_id": "job",
+        "text": "alpha beta",
+        "segments": [
+            {"id": "a", "start": 0.0, "end": 1.0, "text": "alpha"},
+            {"id": "b", "start": 1.0, "end": 2.0, "text": "beta"},
+        ],
+    }
+    _store(legacy)
+    assert _transcript()[0] == legacy
+
+    assert native_history.edit_segment_text("job", "b", "BETA") is True
+    assert native_history.set_segment_timing("job", "a", 2.5, 3.0) is True
+    added = native_history.add_segment("job", 0.5, 0.8, "gamma")
+    assert added["id"] == 1
+    with pytest.raises(ValueError):
+        native_history.add_segment("job", 4.0, 5.0, "delta", segment_id=1)
+    assert native_history.delete_segment("job", "missing") is False
+
+    transcript, record = _transcript()
+    assert [segment["id"] for segment in transcript["segments"]] == [1, "b", "a"]
+    assert _texts(transcript) == ["gamma", "BETA", "alpha"]
+    assert transcript["text"] == record["transcript_text"] == "gamma BETA alpha"
+    assert record["segment_count"] == 3
+
+    assert native_history.delete_segment("job", "a") is True
+    transcript, record = _transcript()
+    assert _texts(transcript) == ["gamma", "BETA"]
+    assert record["transcript_text"] == "gamma BETA"
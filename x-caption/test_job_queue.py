@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""Tests for the scheduling, caching and progress pieces of the native job queue."""
+import json
+
+import pytest
+
+import native_job_queue
+import native_storage
+from native_job_queue import QUEUE_PRIORITIES, Job, JobCache, JobDispatcher, NativeJobQueue, ProgressBus
+
+HIGH = QUEUE_PRIORITIES['high']
+DEFAULT = QUEUE_PRIORITIES['default']
+LOW = QUEUE_PRIORITIES['low']
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock the test moves by hand."""
+    now = [1000.0]
+    monkeypatch.setattr(native_job_queue.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def _drain(dispatcher: JobDispatcher) -> list:
+    return [dispatcher.get() for _ in range(len(dispatcher))]
+
+
+def test_sjf_runs_shortest_media_first(clock):
+    dispatcher = JobDispatcher(policy='sjf', sharing='strict', aging=0.0)
+    dispatcher.put(DEFAULT, 'long', duration=900.0)
+    dispatcher.put(DEFAULT, 'short', duration=30.0)
+    dispatcher.put(DEFAULT, 'medium', duration=300.0)
+    assert _drain(dispatcher) == ['short', 'medium', 'long']
+
+
+def test_sjf_ranks_unknown_duration_as_ten_minutes(clock):
+    dispatcher = JobDispatcher(policy='sjf', sharing='strict', aging=0.0)
+    dispatcher.put(DEFAULT, 'hour', duration=3600.0)
+    dispatcher.put(DEFAULT, 'unknown')
+    dispatcher.put(DEFAULT, 'minute', duration=60.0)
+    assert _drain(dispatcher) == ['minute', 'unknown', 'hour']
+
+
+def test_sjf_aging_lets_a_long_wait_beat_a_shorter_job(clock):
+    dispatcher = JobDispatcher(policy='sjf', sharing='strict', aging=4.0)
+    dispatcher.put(DEFAULT, 'waited', duration=100.0)
+    clock[0] += 30.0
+    # 10 s of media, but the older job has aged by 4 * 30 = 120 s.
+    dispatcher.put(DEFAULT, 'newer', duration=10.0)
+    assert _drain(dispatcher) == ['waited', 'newer']
+
+
+def test_sjf_without_aging_lets_short_jobs_overtake(clock):
+    dispatcher = JobDispatcher(policy='sjf', sharing='strict', aging=0.0)
+    dispatcher.put(DEFAULT, 'waited', duration=100.0)
+    clock[0] += 30.0
+    dispatcher.put(DEFAULT, 'newer', duration=10.0)
+    assert _drain(dispatcher) == ['newer', 'waited']
+
+
+def test_sjf_ties_fall_back_to_arrival_order(clock):
+    dispatcher = JobDispatcher(policy='sjf', sharing='strict', aging=4.0)
+    for name in ('a', 'b', 'c'):
+        dispatcher.put(DEFAULT, name)
+    assert _drain(dispatcher) == ['a', 'b', 'c']
+
+
+def test_fifo_ignores_durations(clock):
+    dispatcher = JobDispatcher(policy='fifo', sharing='strict')
+    dispatcher.put(DEFAULT, 'long', duration=900.0)
+    clock[0] += 1.0
+    dispatcher.put(DEFAULT, 'short', duration=30.0)
+    assert _drain(dispatcher) == ['long', 'short']
+
+
+def test_configure_reranks_waiting_jobs(clock):
+    dispatcher = JobDispatcher(policy='fifo', sharing='strict', aging=0.0)
+    dispatcher.put(DEFAULT, 'long', duration=900.0)
+    clock[0] += 1.0
+    dispatcher.put(DEFAULT, 'short', duration=30.0)
+
+    dispatcher.configure(policy='sjf')
+    assert dispatcher.get() == 'short'
+    dispatcher.put(DEFAULT, 'shorter', duration=10.0)
+    dispatcher.configure(policy='fifo')
+    assert _drain(dispatcher) == ['long', 'shorter']
+
+
+def test_configure_rejects_unknown_policy():
+    dispatcher = JobDispatcher(policy='fifo', sharing='strict')
+    with pytest.raises(ValueError):
+        dispatcher.configure(policy='lifo')
+
+
+def test_get_returns_none_once_stopped():
+    dispatcher = JobDispatcher(policy='fifo', sharing='strict')
+    assert dispatcher.get(should_stop=lambda: True) is None
+
+
+def _job(job_id: str, status: str = 'queued') -> Job:
+    job = Job(job_id, print, {})
+    job._status = status
+    return job
+
+
+def test_job_cache_evicts_least_recently_used():
+    cache = JobCache(capacity=2)
+    cache.put_job(_job('a'))
+    cache.put_job(_job('b'))
+    cache.get_job('a')  # 'b' is now the least recently used
+    cache.put_job(_job('c'))
+
+    assert cache.get_job('b') is None
+    assert cache.get_job('a') is not None and cache.get_job('c') is not None
+    assert len(cache) == 2
+
+
+def test_job_cache_evicts_finished_jobs_before_running_ones():
+    cache = JobCache(capacity=2)
+    cache.put_job(_job('running', 'started'))
+    cache.put_job(_job('done', 'finished'))
+    cache.put_job(_job('new'))
+
+    assert cache.get_job('done') is None
+    assert cache.get_job('running') is not None
+
+
+def test_job_cache_evicts_update_only_entries_first():
+    cache = JobCache(capacity=2)
+    cache.put_job(_job('older'))
+    cache.merge_updates('polled', {'progress': 10})
+    cache.put_job(_job('new'))
+
+    assert cache.get_updates('polled') == {}
+    assert cache.get_job('older') is not None
+
+
+def test_job_cache_falls_back_to_lru_when_everything_runs():
+    cache = JobCache(capacity=1)
+    cache.put_job(_job('first', 'started'))
+    cache.put_job(_job('second', 'started'))
+    assert cache.get_job('first') is None
+    assert cache.get_job('second') is not None
+
+
+def test_job_cache_discard_drops_job_and_updates():
+    cache = JobCache(capacity=4)
+    cache.put_job(_job('a'))
+    cache.merge_updates('a', {'progress': 50})
+    cache.discard('a')
+    cache.discard('missing')
+
+    assert cache.get_job('a') is None
+    assert cache.get_updates('a') == {}
+    assert len(cache) == 0
+
+
+def test_job_cache_forget_keeps_live_updates():
+    cache = JobCache(capacity=4)
+    cache.put_job(_job('a'))
+    cache.merge_updates('a', {'progress': 50})
+    cache.forget_job('a')
+
+    assert cache.get_job('a') is None
+    assert cache.get_updates('a') == {'progress': 50}
+
+
+def test_job_cache_reset_clears_updates_of_a_reused_id():
+    cache = JobCache(capacity=4)
+    cache.merge_updates('a', {'progress': 100, 'stage': 'completed'})
+    cache.reset(_job('a'))
+    assert cache.get_updates('a') == {}
+
+
+def test_strict_sharing_drains_higher_priority_first():
+    dispatcher = JobDispatcher(policy='fifo', sharing='strict')
+    for index in range(3):
+        dispatcher.put(LOW, f'low{index}')
+        dispatcher.put(HIGH, f'high{index}')
+        dispatcher.put(DEFAULT, f'default{index}')
+    assert _drain(dispatcher) == [
+        'high0', 'high1', 'high2', 'default0', 'default1', 'default2', 'low0', 'low1', 'low2',
+    ]
+
+
+def test_weighted_sharing_interleaves_classes_by_weight(monkeypatch):
+    monkeypatch.delenv(native_job_queue.QUEUE_WEIGHTS_ENV, raising=False)
+    dispatcher = JobDispatcher(policy='fifo', sharing='weighted')
+    for index in range(8):
+        dispatcher.put(HIGH, f'high{index}')
+    for index in range(4):
+        dispatcher.put(DEFAULT, f'default{index}')
+    for index in range(2):
+        dispatcher.put(LOW, f'low{index}')
+
+    order = _drain(dispatcher)
+    # Weights 4:2:1, so every window of seven dispatches serves 4 high, 2 default and 1 low.
+    assert order == [
+        'high0', 'default0', 'low0', 'high1', 'high2', 'default1', 'high3',
+        'high4', 'default2', 'low1', 'high5', 'high6', 'default3', 'high7',
+    ]
+    first_window = [name.rstrip('0123456789') for name in order[:7]]
+    assert first_window.count('high') == 4 and first_window.count('default') == 2 and first_window.count('low') == 1
+
+
+def test_weighted_sharing_reads_weights_from_env(monkeypatch):
+    monkeypatch.setenv(native_job_queue.QUEUE_WEIGHTS_ENV, 'high=1,low=1')
+    dispatcher = JobDispatcher(policy='fifo', sharing='weighted')
+    for index in range(2):
+        dispatcher.put(HIGH, f'high{index}')
+        dispatcher.put(LOW, f'low{index}')
+    assert _drain(dispatcher) == ['high0', 'low0', 'high1', 'low1']
+
+
+def test_weighted_sharing_does_not_bank_idle_turns(monkeypatch):
+    monkeypatch.delenv(native_job_queue.QUEUE_WEIGHTS_ENV, raising=False)
+    dispatcher = JobDispatcher(policy='fifo', sharing='weighted')
+    for index in range(6):
+        dispatcher.put(HIGH, f'high{index}')
+    for _ in range(4):
+        dispatcher.get()
+    # Low was idle while high ran; it rejoins level with high instead of
+    # taking several turns in a row.
+    dispatcher.put(LOW, 'low0')
+    dispatcher.put(LOW, 'low1')
+    assert _drain(dispatcher) == ['high4', 'low0', 'high5', 'low1']
+
+
+def test_configure_switches_sharing_mode():
+    dispatcher = JobDispatcher(policy='fifo', sharing='weighted')
+    dispatcher.configure(sharing='strict')
+    dispatcher.put(LOW, 'low')
+    dispatcher.put(HIGH, 'high')
+    assert _drain(dispatcher) == ['high', 'low']
+    with pytest.raises(ValueError):
+        dispatcher.configure(sharing='round-robin')
+
+
+def test_stats_count_dispatches_per_class():
+    dispatcher = JobDispatcher(policy='fifo', sharing='strict')
+    dispatcher.put(HIGH, 'a')
+    dispatcher.put(LOW, 'b')
+    dispatcher.get()
+    stats = dispatcher.stats()['queues']
+    assert stats['high']['dispatched'] == 1 and stats['high']['waiting'] == 0
+    assert stats['low']['dispatched'] == 0 and stats['low']['waiting'] == 1
+
+
+@pytest.fixture
+def progress_queue(tmp_path):
+    """A queue on a temporary jobs.db with its own cache and a slow-flushing bus."""
+    queue = NativeJobQueue('default', db_path=str(tmp_path / 'jobs.db'), resume='manual')
+    queue.cache = JobCache(capacity=8)
+    queue.progress_bus = ProgressBus(interval=3600.0)
+    with native_storage.transaction(queue.db_path) as conn:
+        conn.execute(
+            "INSERT INTO jobs (job_id, queue_name, status, created_at, meta) VALUES ('job', 'default', 'started', 0, '{}')"
+        )
+    yield queue
+    queue.progress_bus.forget('job')
+    native_storage.close_thread_connections()
+
+
+def test_resume_requeues_only_checkpointed_jobs(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'jobs.db')
+    NativeJobQueue('default', db_path=db_path, resume='manual')
+    with native_storage.transaction(db_path) as conn:
+        for job_id, status in (('saved', 'started'), ('fresh', 'started'), ('waiting', 'queued')):
+            conn.execute(
+                "INSERT INTO jobs (job_id, queue_name, func_name, status, kwargs, created_at, meta) "
+                "VALUES (?, 'default', 'json.dumps', ?, '{}', 0, '{}')",
+                (job_id, status),
+            )
+    dispatcher = JobDispatcher(policy='fifo', sharing='strict')
+    monkeypatch.setattr(native_job_queue, 'get_dispatcher', lambda: dispatcher)
+    monkeypatch.setattr(native_job_queue, 'get_job_cache', lambda: JobCache(capacity=8))
+    monkeypatch.setattr(native_job_queue, 'get_progress_bus', lambda: ProgressBus(interval=0))
+    monkeypatch.setattr(native_job_queue.native_checkpoints, 'has_checkpoints', lambda job_id: job_id == 'saved')
+    monkeypatch.setattr(native_job_queue.native_checkpoints, 'clear', lambda job_id: None)
+
+    NativeJobQueue('default', db_path=db_path, resume='resume')
+
+    assert [job.id for _, job, _, _ in iter(lambda: dispatcher.get(should_stop=lambda: True), None)] == ['saved']
+    rows = dict(native_storage.connect(db_path).execute("SELECT job_id, status FROM jobs"))
+    assert rows == {'saved': 'queued', 'fresh': 'queued', 'waiting': 'queued'}
+    native_storage.close_thread_connections()
+
+
+def _stored_progress(queue):
+    return native_storage.connect(queue.db_path).execute(
+        "SELECT progress, message, stage FROM job_progress WHERE job_id = 'job'"
+    ).fetchone()
+
+
+def _stored_meta(queue):
+    row = native_storage.connect(queue.db_path).execute("SELECT meta FROM jobs WHERE job_id = 'job'").fetchone()
+    return json.loads(row[0])
+
+
+def test_progress_ticks_coalesce_and_last_update_wins(progress_queue):
+    bus = progress_queue.progress_bus
+    for progress in (10, 20, 30):
+        progress_queue.update_job_progress('job', progress, f'at {progress}', {'stage': 'transcription'})
+    # The first tick changed the stage and was written; the rest wait.
+    assert _stored_progress(progress_queue) == (10, 'at 10', 'transcription')
+    assert progress_queue.get_job_updates('job')['progress'] == 30
+
+    assert bus.flush() == 1
+    assert _stored_progress(progress_queue) == (30, 'at 30', 'transcription')
+    assert bus.stats()['updates'] == 3 and bus.stats()['writes'] == 2
+
+
+def test_coalesced_ticks_merge_their_meta(progress_queue):
+    progress_queue.update_job_progress('job', 5, 'a', {'stage': 'render'})
+    progress_queue.update_job_progress('job', 6, 'b', {'media_duration': 12.5})
+    progress_queue.update_job_progress('job', 7, 'c', {'device': 'cpu'})
+    progress_queue.progress_bus.flush()
+
+    assert _stored_meta(progress_queue) == {'media_duration': 12.5, 'device': 'cpu'}
+
+
+def test_stage_change_is_written_at_once(progress_queue):
+    progress_queue.update_job_progress('job', 10, 'render', {'stage': 'render'})
+    progress_queue.update_job_progress('job', 20, 'still rendering', {'stage': 'render'})
+    progress_queue.update_job_progress('job', 30, 'vad', {'stage': 'vad'})
+    assert _stored_progress(progress_queue) == (30, 'vad', 'vad')
+
+
+@pytest.mark.parametrize('progress, extra', [
+    (100, {}),
+    (-1, {}),
+    (50, {'error': 'boom'}),
+    (90, {'result': {'job_id': 'job', 'segments': [], 'text': ''}}),
+])
+def test_final_updates_are_written_immediately(progress_queue, progress, extra):
+    progress_queue.update_job_progress('job', 1, 'start', {'stage': 'transcription'})
+    progress_queue.update_job_progress('job', progress, 'final', dict(extra))
+
+    assert _stored_progress(progress_queue)[:2] == (progress, 'final')
+    assert progress_queue.progress_bus.stats()['pending_jobs'] == 0
+    if 'result' in extra:
+        # Only the stub reaches the database, never the transcript body.
+        assert _stored_meta(progress_queue)['result_ref']['transcript'] == {'table': 'job_records', 'job_id': 'job'}
+
+
+def test_zero_interval_writes_every_tick(progress_queue):
+    progress_queue.progress_bus = ProgressBus(interval=0.0)
+    progress_queue.update_job_progress('job', 10, 'a')
+    progress_queue.update_job_progress('job', 20, 'b')
+    assert _stored_progress(progress_queue)[:2] == (20, 'b')
+    assert progress_queue.progress_bus.stats()['writes'] == 2
+
+
+def test_forget_drops_pending_updates(progress_queue):
+    bus = progress_queue.progress_bus
+    progress_queue.update_job_progress('job', 1, 'start', {'stage': 'transcription'})
+    progress_queue.update_job_progress('job', 2, 'tick')
+    bus.forget('job')
+    assert bus.flush() == 0
+    assert _stored_progress(progress_queue)[:2] == (1, 'start')
+
+
+def _published(*lists):
+    """A partial_result after publishing each segment list in turn."""
+    changed_from, previous = [], []
+    for segments in lists:
+        unchanged = 0
+        while unchanged < min(len(previous), len(segments)) and previous[unchanged] == segments[unchanged]:
+            unchanged += 1
+        changed_from.append(unchanged)
+        previous = segments
+    return {'segments': previous, 'partial': True, 'version': len(changed_from), 'changed_from': changed_from}
+
+
+def test_partial_result_delta_sends_only_new_segments():
+    partial = _published(['a'], ['a', 'b'], ['a', 'b', 'c', 'd'])
+
+    assert native_job_queue.partial_result_delta(partial, 2) == {
+        'partial': True, 'version': 3, 'segments': ['c', 'd'], 'offset': 2,
+    }
+    assert native_job_queue.partial_result_delta(partial, 3)['segments'] == []
+    # A poller that missed several publishes gets everything it lacks.
+    assert native_job_queue.partial_result_delta(partial, 1)['offset'] == 1
+
+
+def test_partial_result_delta_resends_rewritten_segments():
+    # The third publish rewrote segment 1 (e.g. a merged line), so a poller at version 2 re-takes it.
+    partial = _published(['a'], ['a', 'b'], ['a', 'B', 'c'])
+    delta = native_job_queue.partial_result_delta(partial, 2)
+    assert (delta['offset'], delta['segments']) == (1, ['B', 'c'])
+
+
+@pytest.mark.parametrize('known', [None, 0, 7])
+def test_partial_result_delta_sends_everything_to_unknown_pollers(known):
+    partial = _published(['a'], ['a', 'b'])
+    delta = native_job_queue.partial_result_delta(partial, known)
+    assert (delta['offset'], delta['segments']) == (0, ['a', 'b'])
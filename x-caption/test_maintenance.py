@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Tests for jobs.db retention and compaction."""
+import pytest
+
+import native_maintenance
+import native_storage
+from native_job_queue import NativeJobQueue
+
+NOW = 1_700_000_000.0
+HOUR = 3600.0
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setenv(native_maintenance.JOB_TTL_HOURS_ENV, "24")
+    monkeypatch.setenv(native_maintenance.JOB_MAX_ROWS_ENV, "100")
+    path = tmp_path / "jobs.db"
+    # The queue creates the real jobs schema.
+    NativeJobQueue("default", db_path=str(path), resume="manual")
+    yield path
+    native_storage.close_thread_connections()
+
+
+def _add_job(db_path, job_id, status="finished", ended_hours_ago=None, result_ttl=None):
+    ended_at = None if ended_hours_ago is None else NOW - ended_hours_ago * HOUR
+    with native_storage.transaction(db_path) as conn:
+        conn.execute(
+            "INSERT INTO jobs (job_id, queue_name, status, created_at, ended_at, result_ttl) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, "default", status, NOW - 1000 * HOUR, ended_at, result_ttl),
+        )
+        conn.execute(
+            "INSERT INTO job_progress (job_id, progress, message, updated_at) VALUES (?, 100, '', ?)",
+            (job_id, NOW),
+        )
+
+
+def _job_ids(db_path, table="jobs"):
+    conn = native_storage.connect(db_path)
+    return sorted(row[0] for row in conn.execute(f"SELECT job_id FROM {table}"))
+
+
+def test_expire_jobs_applies_default_ttl(db_path):
+    _add_job(db_path, "old", ended_hours_ago=25)
+    _add_job(db_path, "recent", ended_hours_ago=23)
+    _add_job(db_path, "old-failure", status="failed", ended_hours_ago=48)
+
+    assert sorted(native_maintenance.expire_jobs(db_path, now=NOW)) == ["old", "old-failure"]
+    assert _job_ids(db_path) == ["recent"]
+    assert _job_ids(db_path, "job_progress") == ["recent"]
+
+
+def test_expire_jobs_never_removes_queued_or_running_jobs(db_path):
+    _add_job(db_path, "queued", status="queued")
+    _add_job(db_path, "running", status="started")
+
+    assert native_maintenance.expire_jobs(db_path, now=NOW) == []
+    assert _job_ids(db_path) == ["queued", "running"]
+
+
+def test_result_ttl_overrides_default(db_path):
+    _add_job(db_path, "short-ttl", ended_hours_ago=2, result_ttl=int(HOUR))
+    _add_job(db_path, "long-ttl", ended_hours_ago=48, result_ttl=int(72 * HOUR))
+    _add_job(db_path, "keep", ended_hours_ago=500, result_ttl=-1)
+
+    assert native_maintenance.expire_jobs(db_path, now=NOW) == ["short-ttl"]
+    assert _job_ids(db_path) == ["keep", "long-ttl"]
+
+
+def test_row_cap_removes_oldest_finished_jobs(db_path, monkeypatch):
+    monkeypatch.setenv(native_maintenance.JOB_MAX_ROWS_ENV, "3")
+    for hours in range(1, 5):
+        _add_job(db_path, f"kept-{hours}h", ended_hours_ago=hours, result_ttl=-1)
+    _add_job(db_path, "running", status="started")
+
+    # Five rows, a cap of three: the two oldest finished jobs go, even with result_ttl=-1.
+    assert native_maintenance.expire_jobs(db_path, now=NOW) == ["kept-4h", "kept-3h"]
+    assert _job_ids(db_path) == ["kept-1h", "kept-2h", "running"]
+
+
+def test_row_cap_counts_ttl_expiry_first(db_path, monkeypatch):
+    monkeypatch.setenv(native_maintenance.JOB_MAX_ROWS_ENV, "2")
+    _add_job(db_path, "expired", ended_hours_ago=30)
+    _add_job(db_path, "a", ended_hours_ago=2)
+    _add_job(db_path, "b", ended_hours_ago=1)
+
+    assert native_maintenance.expire_jobs(db_path, now=NOW) == ["expired"]
+    assert _job_ids(db_path) == ["a", "b"]
+
+
+def test_zero_disables_ttl_and_cap(db_path, monkeypatch):
+    monkeypatch.setenv(native_maintenance.JOB_TTL_HOURS_ENV, "0")
+    monkeypatch.setenv(native_maintenance.JOB_MAX_ROWS_ENV, "0")
+    _add_job(db_path, "ancient", ended_hours_ago=10_000)
+    assert native_maintenance.expire_jobs(db_path, now=NOW) == []
+
+
+def _auto_vacuum(db_path) -> int:
+    return native_storage.connect(db_path).execute("PRAGMA auto_vacuum").fetchone()[0]
+
+
+def test_scheduled_compaction_never_runs_a_full_vacuum(db_path):
+    _add_job(db_path, "done", ended_hours_ago=1)
+    assert native_maintenance._compact(db_path, full=False) == "skipped"
+    assert _auto_vacuum(db_path) != 2
+
+
+def test_scheduled_compaction_runs_incrementally_after_a_full_pass(db_path):
+    assert native_maintenance._compact(db_path, full=True) == "full"
+    assert _auto_vacuum(db_path) == 2
+
+    _add_job(db_path, "running", status="started")
+    assert native_maintenance._compact(db_path, full=False) == "incremental"
+
+
+def test_explicit_full_compaction_always_vacuums(db_path):
+    _add_job(db_path, "running", status="started")
+    assert native_maintenance._compact(db_path, full=True) == "full"
+    assert _auto_vacuum(db_path) == 2
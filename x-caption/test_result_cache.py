@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Tests for the transcription result cache's single-flight guard."""
+import threading
+
+import pytest
+
+import native_cancellation
+import native_result_cache
+import native_storage
+
+
+@pytest.fixture
+def fast_poll(monkeypatch):
+    monkeypatch.setattr(native_result_cache, "_FOLLOWER_POLL_SECONDS", 0.01)
+
+
+def _follow(key, outcome):
+    """Wait on *key* as job ``follower`` and record what came back."""
+    token = native_cancellation.begin("follower")
+    try:
+        with native_cancellation.bind(token):
+            with native_result_cache.single_flight(key) as cached:
+                outcome.append(cached)
+    except native_cancellation.JobCanceled as exc:
+        outcome.append(exc)
+    finally:
+        native_cancellation.end("follower", token)
+        native_storage.close_thread_connections()
+
+
+def test_follower_receives_the_leaders_result(data_dir, fast_poll):
+    outcome = []
+    with native_result_cache.single_flight("key") as cached:
+        assert cached is None
+        follower = threading.Thread(target=_follow, args=("key", outcome))
+        follower.start()
+        native_result_cache.store("key", {"text": "done", "segments": []})
+    follower.join(5)
+
+    assert outcome == [{"text": "done", "segments": []}]
+
+
+def test_canceled_follower_stops_waiting(data_dir, fast_poll):
+    outcome = []
+    with native_result_cache.single_flight("key"):
+        follower = threading.Thread(target=_follow, args=("key", outcome))
+        follower.start()
+        while native_cancellation.cancel_job("follower") is False:
+            pass
+        follower.join(5)
+        # The leader is still computing; the follower left without it.
+        assert not follower.is_alive()
+        assert native_result_cache.stats()["inflight"] == 1
+
+    assert len(outcome) == 1 and isinstance(outcome[0], native_cancellation.JobCanceled)
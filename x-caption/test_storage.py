@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Tests for the shared SQLite helpers in native_storage."""
+import sqlite3
+import threading
+
+import pytest
+
+import native_storage
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "jobs.db"
+    with native_storage.transaction(path) as conn:
+        conn.execute("CREATE TABLE items (name TEXT PRIMARY KEY)")
+    yield path
+    native_storage.close_thread_connections()
+
+
+def _names(path) -> list:
+    # A separate connection sees only what has been committed.
+    conn = sqlite3.connect(str(path))
+    try:
+        return [row[0] for row in conn.execute("SELECT name FROM items ORDER BY name")]
+    finally:
+        conn.close()
+
+
+def test_nested_transactions_commit_once(db_path):
+    with native_storage.transaction(db_path) as outer:
+        outer.execute("INSERT INTO items VALUES ('outer')")
+        with native_storage.transaction(db_path) as inner:
+            assert inner is outer
+            inner.execute("INSERT INTO items VALUES ('inner')")
+        # Leaving the inner block must not commit the outer one's writes.
+        assert _names(db_path) == []
+    assert _names(db_path) == ['inner', 'outer']
+
+
+def test_failure_in_nested_transaction_rolls_back_everything(db_path):
+    with pytest.raises(RuntimeError):
+        with native_storage.transaction(db_path) as outer:
+            outer.execute("INSERT INTO items VALUES ('outer')")
+            with native_storage.transaction(db_path) as inner:
+                inner.execute("INSERT INTO items VALUES ('inner')")
+                raise RuntimeError("boom")
+    assert _names(db_path) == []
+
+    # The thread's connection is usable again afterwards.
+    with native_storage.transaction(db_path) as conn:
+        conn.execute("INSERT INTO items VALUES ('after')")
+    assert _names(db_path) == ['after']
+
+
+def test_connections_are_per_thread_and_closable(db_path):
+    mine = native_storage.connect(db_path)
+    assert native_storage.connect(db_path) is mine
+
+    theirs = []
+    thread = threading.Thread(target=lambda: theirs.append(native_storage.connect(db_path)))
+    thread.start()
+    thread.join()
+    assert theirs[0] is not mine
+
+    native_storage.close_thread_connections()
+    with pytest.raises(sqlite3.ProgrammingError):
+        mine.execute("SELECT 1")
+    assert native_storage.connect(db_path) is not mine
@@ -66,15 +66,28 @@ export const {
 } = jobsApi;
 
 export async function apiGetHistory(): Promise<HistoryResponse> {
-  return request<HistoryResponse>("/history");
+  // /history is paged; follow the cursor so the job list stays complete.
+  const jobs: NonNullable<HistoryResponse["jobs"]> = [];
+  let cursor: string | null | undefined = null;
+  do {
+    const query: string = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+    const page: HistoryResponse = await request<HistoryResponse>(`/history${query}`);
+    if (Array.isArray(page.jobs)) {
+      jobs.push(...page.jobs);
+    }
+    cursor = page.next_cursor;
+  } while (cursor);
+  return { jobs, next_cursor: null };
 }
 
 export async function apiGetJob(jobId: string): Promise<JobStatusResponse> {
   return request<JobStatusResponse>(`/job/${jobId}`);
 }
 
-export async function apiPollJob(jobId: string): Promise<PollResponse> {
-  return request<PollResponse>(`/job/${jobId}/poll`);
+export async function apiPollJob(jobId: string, partialVersion?: number | null): Promise<PollResponse> {
+  // With the streamed-result version we already hold, the server sends only newer segments.
+  const query = typeof partialVersion === "number" ? `?partial_version=${partialVersion}` : "";
+  return request<PollResponse>(`/job/${jobId}/poll${query}`);
 }
 
 export async function apiRemoveJob(jobId: string): Promise<RemoveJobResponse> {
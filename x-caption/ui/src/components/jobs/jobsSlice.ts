@@ -27,6 +27,24 @@ const initialState: JobsState = {
   lastRestoreError: null
 };
 
+// Streamed results arrive as a tail: keep our first `offset` segments and append the rest.
+function mergePartialResult(existing: TranscriptResult | null | undefined, incoming: TranscriptResult): TranscriptResult {
+  const incomingSegments = Array.isArray(incoming.segments) ? incoming.segments : [];
+  const segments =
+    typeof incoming.offset === "number"
+      ? [...(existing?.segments ?? []).slice(0, incoming.offset), ...incomingSegments]
+      : incomingSegments;
+  return {
+    ...incoming,
+    segments,
+    text: segments
+      .map((segment) => segment.text)
+      .filter(Boolean)
+      .join(" ")
+      .trim()
+  };
+}
+
 function sortOrder(jobsById: Record<string, Job>): string[] {
   return Object.keys(jobsById).sort((a, b) => {
     const jobA = jobsById[a];
@@ -124,8 +142,9 @@ export const pollJobUpdates = createAsyncThunk<
   { jobId: string; updates: PollUpdate[] },
   { jobId: string },
   { state: RootState }
->("jobs/poll", async ({ jobId }) => {
-  const payload = await apiPollJob(jobId);
+>("jobs/poll", async ({ jobId }, { getState }) => {
+  const partialVersion = getState().jobs.jobsById[jobId]?.partialResult?.version ?? null;
+  const payload = await apiPollJob(jobId, partialVersion);
   const updates = Array.isArray(payload.updates) ? payload.updates : [];
   return { jobId, updates };
 });
@@ -433,8 +452,8 @@ const slice = createSlice({
         applyStreamingSegment(job, merged.segment, merged.total_segments);
       }
 
-      if (merged.partial_result) {
-        applyCompletion(job, merged.partial_result as TranscriptResult);
+      if (merged.partial_result && !merged.result && !["completed", "failed", "cancelled"].includes(job.status)) {
+        job.partialResult = mergePartialResult(job.partialResult, merged.partial_result as TranscriptResult);
       }
 
       if (merged.result) {
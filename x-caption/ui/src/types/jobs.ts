@@ -68,6 +68,7 @@ export type HistoryEntry = {
 
 export type HistoryResponse = {
   jobs?: HistoryEntry[];
+  next_cursor?: string | null;
 };
 
 export type JobStatusResponse = {
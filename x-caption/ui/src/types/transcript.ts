@@ -18,4 +18,7 @@ export type TranscriptResult = {
   total_processing_time?: number;
   normalized_audio_path?: string;
   original_audio_path?: string;
+  // Streamed partial results: publish number, and where the sent segments start.
+  version?: number;
+  offset?: number;
 };
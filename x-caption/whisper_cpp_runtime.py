@@ -1,15 +1,26 @@
 from __future__ import annotations
 
+import atexit
+import contextlib
+import http.client
 import json
 import logging
 import os
 import re
+import socket
 import subprocess
+import threading
+import time
+import urllib.request
+import uuid
+import wave
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 
 from native_config import get_models_dir, get_bundle_dir, get_data_dir, get_bundled_models_dir
 from model_manager import get_whisper_model_info
+import native_cancellation
+import native_resources
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +29,18 @@ _JSON_MARKER = "__XCAPTION_JSON__"
 _LEGACY_JSON_MARKER = "__XSUB_JSON__"
 _PROGRESS_REGEX = re.compile(r"(?i)progress[^0-9]{0,20}([0-9]{1,3}(?:\.[0-9]+)?)")
 _PERCENT_REGEX = re.compile(r"([0-9]{1,3}(?:\.[0-9]+)?)%")
+_SEGMENT_LINE_REGEX = re.compile(
+    r"^\s*\[\s*(\d+:\d{2}:\d{2}[.,]\d+)\s*-->\s*(\d+:\d{2}:\d{2}[.,]\d+)\s*\]\s?(.*)$"
+)
+
+_SERVER_MODE_ENV = "XCAPTION_WHISPER_SERVER"
+_SERVER_ENGINE_ENV = "XCAPTION_WHISPER_SERVER_ENGINE"
+_SERVER_IDLE_ENV = "XCAPTION_WHISPER_SERVER_IDLE_SECONDS"
+_SERVER_IDLE_SECONDS = 300.0
+_SERVER_START_TIMEOUT = 120.0
+_SERVER_HEALTH_TIMEOUT = 2.0
+_SERVER_UPLOAD_CHUNK = 1024 * 1024
+_SERVER_STREAMING_MAX_SECONDS = 60.0
 
 
 def _coerce_progress(value: str | float | int | None) -> Optional[int]:
@@ -48,22 +71,65 @@ def _extract_progress(line: str) -> Optional[int]:
     return None
 
 
+def _extract_segment(line: str) -> Optional[Dict[str, Any]]:
+    match = _SEGMENT_LINE_REGEX.match(line)
+    if not match:
+        return None
+    start = _parse_time_string(match.group(1))
+    end = _parse_time_string(match.group(2))
+    if start is None or end is None:
+        return None
+    return {"start": float(start), "end": float(end), "text": match.group(3).strip()}
+
+
 def _stream_process_output(
     cmd: list[str],
     *,
     progress_callback=None,
     progress_message: str = "Transcribing audio...",
     json_marker: Optional[str] = None,
+    segment_callback=None,
+    stdin_cmd: Optional[list[str]] = None,
 ) -> tuple[int, str, Optional[str]]:
-    proc = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        encoding='utf-8',
-        errors='replace',
-        bufsize=1,
-    )
+    feeder = None
+    # The job's memory cap holds from exec on, for the engine and its ffmpeg feeder.
+    memory_limit = native_resources.memory_limit_preexec()
+    if stdin_cmd:
+        feeder = native_cancellation.popen(
+            stdin_cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            preexec_fn=memory_limit,
+        )
+    try:
+        proc = native_cancellation.popen(
+            cmd,
+            preexec_fn=memory_limit,
+            stdin=feeder.stdout if feeder else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            bufsize=1,
+        )
+    except Exception:
+        if feeder:
+            feeder.kill()
+            feeder.wait()
+            native_cancellation.release(feeder)
+        raise
+    if feeder and feeder.stdout:
+        # Only the engine holds the read end now, so ffmpeg sees EPIPE if it exits.
+        feeder.stdout.close()
+    feeder_errors: list[bytes] = []
+    feeder_reader = None
+    if feeder and feeder.stderr:
+        feeder_reader = threading.Thread(
+            target=lambda: feeder_errors.append(feeder.stderr.read()),
+            daemon=True,
+        )
+        feeder_reader.start()
     output_lines: list[str] = []
     json_payload: Optional[str] = None
     last_progress: Optional[int] = None
@@ -79,12 +145,33 @@ def _stream_process_output(
                 if json_marker and json_marker in line:
                     json_payload = line.split(json_marker, 1)[-1].strip()
                     continue
+                if segment_callback:
+                    segment = _extract_segment(line)
+                    if segment is not None:
+                        try:
+                            segment_callback(segment)
+                        except Exception as exc:
+                            logger.debug("Segment callback failed: %s", exc)
+                        continue
                 progress = _extract_progress(line)
                 if progress_callback and progress is not None:
                     if last_progress is None or progress > last_progress:
                         last_progress = progress
                         progress_callback(progress, progress_message)
     return_code = proc.wait()
+    if feeder:
+        feeder_code = feeder.wait()
+        if feeder_reader:
+            feeder_reader.join(timeout=5)
+        if feeder_code != 0:
+            details = b"".join(feeder_errors).decode("utf-8", errors="replace").strip()
+            output_lines.append(f"Audio decoder failed ({feeder_code}): {details}")
+            if return_code == 0:
+                return_code = feeder_code
+        native_cancellation.release(feeder)
+    native_cancellation.release(proc)
+    # A killed engine exits non-zero; report the cancel rather than a failure.
+    native_cancellation.check()
     return return_code, "\n".join(output_lines), json_payload
 
 
@@ -175,6 +262,368 @@ def resolve_whisper_model(model_path: Optional[str] = None) -> Optional[Path]:
     return None
 
 
+def resolve_whisper_server() -> Optional[Path]:
+    env_path = os.environ.get(_SERVER_ENGINE_ENV)
+    candidates: List[Path] = []
+    if env_path:
+        candidates.append(Path(env_path))
+
+    for base in ("engine-server", "whisper-server"):
+        candidates.append(get_models_dir() / _platform_exe_name(base))
+        candidates.append(get_data_dir() / "models" / "whisper" / _platform_exe_name(base))
+        candidates.append(get_bundle_dir() / "whisper" / _platform_exe_name(base))
+        candidates.append(get_bundle_dir() / "Resources" / "whisper" / _platform_exe_name(base))
+
+    for candidate in candidates:
+        if candidate and candidate.exists() and candidate.is_file():
+            return candidate
+    return None
+
+
+def _server_mode_enabled() -> bool:
+    raw_value = (os.environ.get(_SERVER_MODE_ENV) or "on").strip().lower()
+    return raw_value not in {"0", "false", "no", "off", "disable", "disabled"}
+
+
+def _server_idle_seconds() -> float:
+    try:
+        return max(10.0, float(os.environ.get(_SERVER_IDLE_ENV) or _SERVER_IDLE_SECONDS))
+    except (TypeError, ValueError):
+        return _SERVER_IDLE_SECONDS
+
+
+def _wav_duration(path: Path) -> Optional[float]:
+    try:
+        with contextlib.closing(wave.open(str(path), "rb")) as handle:
+            rate = handle.getframerate()
+            return handle.getnframes() / float(rate) if rate else None
+    except Exception:
+        return None
+
+
+def _free_local_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+class ResidentWhisperServer:
+    """Long-lived whisper.cpp server process that keeps one model loaded.
+
+    Requests are served one at a time; callers that find the server busy are
+    expected to fall back to the one-shot CLI so parallel workers still run
+    concurrently.
+    """
+
+    def __init__(self, executable: Path, model_file: Path):
+        self.executable = executable
+        self.model_file = model_file
+        self.port: Optional[int] = None
+        self.process: Optional[subprocess.Popen] = None
+        self.restarts = 0
+        self.threads: Optional[int] = None
+        self.last_used = time.monotonic()
+        self._state_lock = threading.Lock()
+        self._busy = threading.Lock()
+        self._idle_timer: Optional[threading.Timer] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def is_healthy(self) -> bool:
+        if not self.is_alive():
+            return False
+        try:
+            with urllib.request.urlopen(f"{self.base_url}/health", timeout=_SERVER_HEALTH_TIMEOUT) as response:
+                return response.status == 200
+        except Exception:
+            return False
+
+    def start(self, threads: Optional[int] = None) -> None:
+        """Start the server, or restart it when a job needs more threads than it runs with.
+
+        Per-job core shares vary from job to job and chunk to chunk; a server
+        with at least the requested threads is reused rather than restarted
+        (and reloading the model) for every smaller share.
+        """
+        threads = int(threads) if threads and threads > 0 else native_resources.job_cores()
+        with self._state_lock:
+            if self.threads is not None and self.threads >= threads and self.is_healthy():
+                return
+            self._terminate_locked()
+            self.threads = threads
+            self.port = _free_local_port()
+            cmd = [
+                str(self.executable),
+                "-m",
+                str(self.model_file),
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(self.port),
+                "-t",
+                str(threads),
+            ]
+            logger.info("Starting resident whisper.cpp server: %s", " ".join(cmd))
+            self.process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            deadline = time.monotonic() + _SERVER_START_TIMEOUT
+            while time.monotonic() < deadline:
+                if not self.is_alive():
+                    break
+                if self.is_healthy():
+                    self.last_used = time.monotonic()
+                    self._schedule_idle_check()
+                    return
+                time.sleep(0.2)
+            self._terminate_locked()
+            raise RuntimeError("Resident transcription engine failed to become healthy")
+
+    def stop(self) -> None:
+        with self._state_lock:
+            self._terminate_locked()
+
+    def _terminate_locked(self) -> None:
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        proc = self.process
+        self.process = None
+        if proc is None or proc.poll() is not None:
+            return
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait(timeout=5)
+
+    def _schedule_idle_check(self) -> None:
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+        self._idle_timer = threading.Timer(_server_idle_seconds(), self._idle_check)
+        self._idle_timer.daemon = True
+        self._idle_timer.start()
+
+    def _idle_check(self) -> None:
+        # try_acquire takes the state lock too, so nobody can claim the server
+        # between this check and the stop.
+        with self._state_lock:
+            idle_for = time.monotonic() - self.last_used
+            if self._busy.locked() or idle_for < _server_idle_seconds():
+                if self.is_alive():
+                    self._schedule_idle_check()
+                return
+            logger.info("Stopping idle whisper.cpp server after %.0fs", idle_for)
+            self._terminate_locked()
+
+    def try_acquire(self) -> bool:
+        # Busy starting or stopping counts as busy: callers fall back to the CLI.
+        if not self._state_lock.acquire(blocking=False):
+            return False
+        try:
+            if not self._busy.acquire(blocking=False):
+                return False
+            self.last_used = time.monotonic()
+            return True
+        finally:
+            self._state_lock.release()
+
+    def release(self) -> None:
+        self.last_used = time.monotonic()
+        self._busy.release()
+
+    def _post_inference(self, audio_path: Path, fields: Dict[str, str]) -> Dict[str, Any]:
+        boundary = uuid.uuid4().hex
+        head = b""
+        for name, value in fields.items():
+            head += (
+                f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f"{value}\r\n"
+            ).encode("utf-8")
+        head += (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{audio_path.name}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("utf-8")
+        tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+        content_length = len(head) + audio_path.stat().st_size + len(tail)
+
+        def body():
+            yield head
+            with audio_path.open("rb") as handle:
+                while True:
+                    chunk = handle.read(_SERVER_UPLOAD_CHUNK)
+                    if not chunk:
+                        break
+                    yield chunk
+            yield tail
+
+        connection = http.client.HTTPConnection("127.0.0.1", self.port)
+        token = native_cancellation.current()
+
+        def abort() -> None:
+            # Shutting the socket down wakes the blocked read, but whisper.cpp
+            # would keep decoding the abandoned audio and hold up the next
+            # request; kill it and let the next request start a fresh server.
+            sock = connection.sock
+            if sock is not None:
+                with contextlib.suppress(OSError):
+                    sock.shutdown(socket.SHUT_RDWR)
+            proc = self.process
+            if proc is not None and proc.poll() is None:
+                logger.info("Killing whisper.cpp server to abandon a cancelled request")
+                with contextlib.suppress(OSError, subprocess.TimeoutExpired):
+                    proc.kill()
+                    proc.wait(timeout=5)
+                if self.process is proc:
+                    self.process = None
+
+        if token is not None:
+            token.add_callback(abort)
+        try:
+            native_cancellation.check()
+            connection.request(
+                "POST",
+                "/inference",
+                body=body(),
+                headers={
+                    "Content-Type": f"multipart/form-data; boundary={boundary}",
+                    "Content-Length": str(content_length),
+                },
+            )
+            response = connection.getresponse()
+            raw = response.read()
+        except (OSError, http.client.HTTPException):
+            native_cancellation.check()
+            raise
+        finally:
+            if token is not None:
+                token.remove_callback(abort)
+            connection.close()
+        if response.status != 200:
+            raise RuntimeError(f"Resident transcription engine returned HTTP {response.status}")
+        payload = json.loads(raw.decode("utf-8", errors="replace"))
+        if isinstance(payload, dict) and payload.get("error"):
+            raise RuntimeError(f"Resident transcription engine error: {payload.get('error')}")
+        return payload
+
+    def transcribe(
+        self,
+        audio_path: Path,
+        *,
+        language: Optional[str] = None,
+        prompt: Optional[str] = None,
+        threads: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Run one inference request, restarting the server once if it crashed.
+
+        Cancelling the job kills the server mid-request; the next request
+        starts a new one.
+        """
+        fields = {
+            "response_format": "verbose_json",
+            "temperature": "0.0",
+            "language": language if language and language not in {"auto", ""} else "auto",
+        }
+        if prompt:
+            fields["prompt"] = prompt
+        for attempt in range(2):
+            native_cancellation.check()
+            if not self.is_healthy():
+                if self.process is not None:
+                    self.restarts += 1
+                    logger.warning("Resident whisper.cpp server is down; restarting (restart #%s)", self.restarts)
+            self.start(threads)
+            try:
+                result = self._post_inference(audio_path, fields)
+                self.last_used = time.monotonic()
+                return result
+            except (OSError, http.client.HTTPException) as exc:
+                # A live server that rejected the request will not do better on retry.
+                if attempt or self.is_alive():
+                    raise
+                logger.warning("Resident whisper.cpp server crashed during request: %s", exc)
+        raise RuntimeError("Resident transcription engine unavailable")
+
+
+_resident_server: Optional[ResidentWhisperServer] = None
+_resident_server_lock = threading.Lock()
+
+
+def get_resident_server(model_file: Path) -> Optional[ResidentWhisperServer]:
+    """Return the shared resident server for *model_file*, if server mode is available."""
+    global _resident_server
+    if not _server_mode_enabled():
+        return None
+    executable = resolve_whisper_server()
+    if not executable:
+        return None
+    with _resident_server_lock:
+        server = _resident_server
+        if server is not None and (server.model_file != model_file or server.executable != executable):
+            server.stop()
+            server = None
+        if server is None:
+            server = ResidentWhisperServer(executable, model_file)
+            _resident_server = server
+        return server
+
+
+def shutdown_resident_server() -> None:
+    global _resident_server
+    with _resident_server_lock:
+        if _resident_server is not None:
+            _resident_server.stop()
+            _resident_server = None
+
+
+atexit.register(shutdown_resident_server)
+
+
+def _transcribe_with_resident_server(
+    server: ResidentWhisperServer,
+    audio_path: Path,
+    *,
+    language: Optional[str],
+    prompt: Optional[str] = None,
+    threads: Optional[int] = None,
+    progress_callback=None,
+) -> Dict[str, Any]:
+    if progress_callback:
+        progress_callback(15, "Transcribing audio...")
+    payload = server.transcribe(audio_path, language=language, prompt=prompt, threads=threads)
+    segments: List[Dict[str, Any]] = []
+    for seg in payload.get("segments") or []:
+        if not isinstance(seg, dict):
+            continue
+        segments.append({
+            "start": _coerce_time(seg.get("start", 0.0)),
+            "end": _coerce_time(seg.get("end", 0.0)),
+            "text": str(seg.get("text", "")).strip(),
+        })
+    if progress_callback:
+        progress_callback(90, "Finalizing transcript")
+    transcript_text = " ".join([seg["text"] for seg in segments]).strip() or str(payload.get("text") or "").strip()
+    duration = None
+    if segments:
+        duration = max(seg.get("end", 0.0) for seg in segments)
+    return {
+        "segments": segments,
+        "text": transcript_text,
+        "language": payload.get("language") or language or "auto",
+        "duration": duration,
+    }
+
+
 def _parse_srt_timestamp(value: str) -> Optional[float]:
     try:
         parts = value.replace(",", ":").split(":")
@@ -259,7 +708,17 @@ def transcribe_whisper_cpp(
     language: Optional[str] = None,
     output_dir: Optional[Path] = None,
     progress_callback=None,
+    threads: Optional[int] = None,
+    segment_callback=None,
+    audio_pipe_cmd: Optional[List[str]] = None,
+    prompt: Optional[str] = None,
 ) -> Dict[str, Any]:
+    """Transcribe *audio_path* with whisper.cpp.
+
+    When *audio_pipe_cmd* is given it must write a 16 kHz mono WAV stream to
+    stdout; that stream is piped into the engine and *audio_path* is only used
+    for naming. *prompt* is passed to the decoder as its initial prompt.
+    """
     engine = resolve_whisper_engine()
     if not engine:
         raise RuntimeError(
@@ -275,7 +734,9 @@ def transcribe_whisper_cpp(
         )
 
     audio_path = Path(audio_path)
-    if not audio_path.exists():
+    if audio_pipe_cmd and engine.suffix.lower() == ".mjs":
+        raise RuntimeError("Piped audio requires the native transcription engine")
+    if not audio_pipe_cmd and not audio_path.exists():
         raise FileNotFoundError(f"Audio file not found: {audio_path}")
 
     if output_dir is None:
@@ -307,6 +768,7 @@ const progressCallback = (progress) => {{
 const result = await transcribeAudio({json.dumps(str(audio_path))}, {{
   model: {json.dumps(str(model_file))},
   language: {json.dumps(language or 'auto')},
+  prompt: {json.dumps(prompt or '')},
   progress_callback: progressCallback
 }});
 console.log('{json_marker}' + JSON.stringify(result));
@@ -407,12 +869,37 @@ console.log('{json_marker}' + JSON.stringify(result));
             "duration": duration,
         }
 
+    server = get_resident_server(model_file) if not audio_pipe_cmd else None
+    if server is not None and segment_callback is not None:
+        # The server only answers once inference is done; long files stream
+        # captions sooner through the CLI than they save on model load.
+        audio_seconds = _wav_duration(audio_path)
+        if audio_seconds is None or audio_seconds > _SERVER_STREAMING_MAX_SECONDS:
+            server = None
+    if server is not None and server.try_acquire():
+        try:
+            return _transcribe_with_resident_server(
+                server,
+                audio_path,
+                language=language,
+                prompt=prompt,
+                threads=threads,
+                progress_callback=progress_callback,
+            )
+        except native_cancellation.JobCanceled:
+            raise
+        except Exception as exc:
+            native_cancellation.check()
+            logger.warning("Resident whisper.cpp server failed; falling back to one-shot engine: %s", exc)
+        finally:
+            server.release()
+
     cmd = [
         str(engine),
         "-m",
         str(model_file),
         "-f",
-        str(audio_path),
+        "-" if audio_pipe_cmd else str(audio_path),
         "-of",
         str(output_prefix),
         "-osrt",
@@ -421,12 +908,18 @@ console.log('{json_marker}' + JSON.stringify(result));
     ]
     if language and language not in {"auto", ""}:
         cmd.extend(["-l", language])
+    if threads and threads > 0:
+        cmd.extend(["-t", str(int(threads))])
+    if prompt:
+        cmd.extend(["--prompt", prompt])
 
     logger.info("Running whisper.cpp: %s", " ".join(cmd))
     return_code, output, _ = _stream_process_output(
         cmd,
         progress_callback=progress_callback,
         progress_message="Transcribing audio...",
+        segment_callback=segment_callback,
+        stdin_cmd=audio_pipe_cmd,
     )
     if return_code != 0 and "-oj" in cmd:
         fallback_cmd = [arg for arg in cmd if arg != "-oj"]
@@ -434,6 +927,8 @@ console.log('{json_marker}' + JSON.stringify(result));
             fallback_cmd,
             progress_callback=progress_callback,
             progress_message="Transcribing audio...",
+            segment_callback=segment_callback,
+            stdin_cmd=audio_pipe_cmd,
         )
 
     if return_code != 0:
@@ -21,6 +21,7 @@ import tempfile
 import warnings
 import base64
 import mimetypes
+import multiprocessing
 import platform
 import subprocess
 import uuid
@@ -363,8 +364,8 @@ def start_worker_threads():
 
     print("[WORKER] Starting worker threads...")
 
-    # Start 2 worker threads for processing jobs
-    worker = start_worker(num_threads=2)
+    # Thread count and job concurrency come from the resource scheduler
+    worker = start_worker()
 
     print("[OK] Workers started")
     print()
@@ -1905,4 +1906,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Job worker processes (XCAPTION_JOB_BACKEND=process) re-enter the frozen executable.
+    multiprocessing.freeze_support()
     main()